@@ -3,7 +3,7 @@ from .circuits.quantum_register import QuantumRegister, Qubit
 from .results.results import ExecResult, SimuResult
 from .tasks.tasks import Task
 from .users.userapi import User
-from .simulators.simulator import simulate
+from .simulators.simulator import simulate, simulate_amplitudes, simulate_batch, simulate_many
 
 __all__ = [
     "QuantumCircuit",
@@ -14,6 +14,9 @@ __all__ = [
     "User",
     "SimuResult",
     "simulate",
+    "simulate_amplitudes",
+    "simulate_batch",
+    "simulate_many",
     "get_version",
 ]
 
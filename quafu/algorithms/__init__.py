@@ -3,5 +3,6 @@
 from .hamiltonian import Hamiltonian
 from .ansatz import QAOAAnsatz, AlterLayeredAnsatz, QuantumNeuralNetwork
 from .estimator import Estimator
+from .kernel import fidelity_kernel
 from .templates.angle import AngleEmbedding
 from .templates.basic_entangle import BasicEntangleLayers
@@ -14,22 +14,78 @@
 """Pre-build wrapper to calculate expectation value"""
 import numpy as np
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from quafu import QuantumCircuit
 from quafu.simulators.simulator import simulate
+from quafu.simulators.cache import SimulationCache
+from quafu.simulators.lightcone import backward_light_cone
+from quafu.simulators.partition import split_circuit
 from quafu.tasks.tasks import Task
 from quafu.algorithms.hamiltonian import Hamiltonian
 
 
-def execute_circuit(circ: QuantumCircuit, observables: Hamiltonian):
-    """Execute circuit on quafu simulator"""
-    sim_state = simulate(circ, output="state_vector").get_statevector()
+# Prefix checkpoints shared by the estimators that do not bring their own cache
+_SHARED_CACHE = SimulationCache(memory_budget=2**27)
 
-    expectation = np.matmul(
-        np.matmul(sim_state.conj().T, observables.get_matrix()), sim_state
-    ).real
 
-    return expectation
+def _pauli_expectation(state: np.ndarray, paulis: Dict[int, str]) -> complex:
+    """Expectation of Paulis on qubits of a statevector in little endian, qubits beyond it being in |0>"""
+    num = int(np.log2(len(state)))
+    psi = state.reshape([2] * num) if num else state
+    phi = psi
+    for qubit, pauli in paulis.items():
+        if qubit >= num:
+            if pauli != "Z":
+                return 0.0
+            continue
+        axis = num - 1 - qubit
+        shape = [1] * num
+        shape[axis] = 2
+        if pauli in "XY":
+            phi = np.flip(phi, axis)
+        if pauli == "Y":
+            phi = phi * np.array([-1j, 1j]).reshape(shape)
+        elif pauli == "Z":
+            phi = phi * np.array([1, -1]).reshape(shape)
+    return np.vdot(psi, phi)
+
+
+def _statevector(circ: QuantumCircuit, cache: SimulationCache = None) -> np.ndarray:
+    """Statevector of circ, reused from the process-wide result cache when the same circuit was simulated before.
+
+    Statevectors resumed from the checkpoints of cache are not stored in the result cache.
+    """
+    return simulate(circ, output="state_vector", shots=0, cache=cache, result_cache=True).get_statevector()
+
+
+def execute_circuit(
+    circ: QuantumCircuit, observables: Hamiltonian, cache: SimulationCache = None
+):
+    """Execute circuit on quafu simulator.
+
+    Each Pauli term is evaluated on the light cone of its qubits, so local observables of wide and shallow
+    circuits only need small simulations. Terms whose light cone holds every qubit share one statevector,
+    which is also kept in the result cache for later calls with the same circuit and parameters if it is
+    simulated without prefix checkpoints.
+    """
+    expectation = 0.0
+    full_state = None
+    for pauli_str, coeff in zip(observables.pauli_list, observables.coeffs):
+        paulis = {q: p for q, p in enumerate(reversed(pauli_str.upper())) if p != "I"}
+        kept, gates = backward_light_cone(circ, list(paulis))
+        if len(kept) == circ.num:
+            if full_state is None:
+                full_state = _statevector(circ, cache)
+            expectation += coeff * _pauli_expectation(full_state, paulis)
+            continue
+        local = {kept.index(q): p for q, p in paulis.items()}
+        if gates:
+            state = _statevector(split_circuit(circ, kept, gates), cache)
+        else:
+            state = np.ones(1)
+        expectation += coeff * _pauli_expectation(state, local)
+
+    return np.real(expectation)
 
 
 class Estimator:
@@ -40,6 +96,7 @@ class Estimator:
         circ: QuantumCircuit,
         backend: str = "sim",
         task: Optional[Task] = None,
+        cache: Union[SimulationCache, bool] = True,
         **task_options
     ) -> None:
         """
@@ -47,11 +104,18 @@ class Estimator:
             circ: quantum circuit.
             backend: run on simulator (sim) or real machines (ScQ-PXX)
             task: task instance for real machine execution (should be none if backend is "sim")
+            cache: statevector checkpoints of circuit prefixes reused by consecutive runs. True shares one
+                cache of at most 128 MB between all estimators, False simulates every run from the start.
             task_options: options to config a task instance
         """
         self._circ = circ
         self._backend = backend
         self._task = None
+        # Consecutive runs differ in a few parameters, so reuse the common prefix of the circuit
+        if backend != "sim" or cache is False:
+            self._cache = None
+        else:
+            self._cache = _SHARED_CACHE if cache is True else cache
         if backend != "sim":
             if task is not None:
                 self._task = task
@@ -60,6 +124,16 @@ class Estimator:
             self._task.config(backend=self._backend)
             self._task.config(**task_options)
 
+    @property
+    def circ(self) -> QuantumCircuit:
+        """Circuit whose expectation values are estimated"""
+        return self._circ
+
+    @property
+    def backend(self) -> str:
+        """Simulator (sim) or name of the real machine"""
+        return self._backend
+
     def _run_real_machine(self, observables: Hamiltonian):
         """Submit to quafu service"""
         if not isinstance(self._task, Task):
@@ -78,7 +152,7 @@ class Estimator:
         #     np.matmul(sim_state.conj().T, observables.get_matrix()), sim_state
         # ).real
         # return expectation
-        return execute_circuit(self._circ, observables)
+        return execute_circuit(self._circ, observables, self._cache)
 
     def run(self, observables: Hamiltonian, params: List[float]):
         """Calculate estimation for given observables
@@ -13,4 +13,6 @@
 # limitations under the License.
 
 from .param_shift import ParamShift
-from .vjp import run_circ, compute_vjp, jacobian
+from .adjoint import Adjoint
+from .gradient import Gradient
+from .vjp import run_circ, run_circ_batch, compute_vjp, jacobian
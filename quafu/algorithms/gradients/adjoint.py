@@ -0,0 +1,80 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Quafu adjoint differentiation"""
+
+from typing import List
+import numpy as np
+
+from quafu.elements import QuantumGate, Measure
+from quafu.exceptions import QuafuError
+from ..estimator import Estimator
+from ..hamiltonian import Hamiltonian
+
+ADJOINT_GATES = {"rx", "ry", "rz", "rxx", "ryy", "rzz", "p", "cp"}
+
+
+class Adjoint:
+    """Adjoint differentiation to calculate gradients.
+
+    All gradients come from one forward simulation and one backward pass that
+    applies inverse gates, at the cost of about three simulations instead of
+    two per parameter for parameter shift.
+    """
+
+    def __init__(self, estimator: Estimator) -> None:
+        if estimator.backend != "sim":
+            raise QuafuError("Adjoint gradient is only supported on simulator")
+        self._est = estimator
+
+    def __call__(self, obs: Hamiltonian, params: List[float]):
+        """Calculate gradients using adjoint differentiation.
+
+        Args:
+            obs (Hamiltonian): observable
+            params (List[float]): params to optimize
+        """
+        return self.grad(obs, params)
+
+    def _check_circuit(self, circ):
+        measured = False
+        for ins in circ.instructions:
+            if isinstance(ins, Measure):
+                measured = True
+            elif not isinstance(ins, QuantumGate) and ins.name.lower() not in ["barrier", "delay"]:
+                raise QuafuError(f"Adjoint gradient does not support {ins.name}")
+            elif measured and isinstance(ins, QuantumGate):
+                raise QuafuError("Adjoint gradient only supports measurements at the end")
+        for gate in circ.parameterized_gates:
+            if gate.name.lower() not in ADJOINT_GATES:
+                raise QuafuError(f"Adjoint gradient does not support gate {gate.name}")
+
+    def grad(self, obs: Hamiltonian, params: List[float]):
+        """grad.
+
+        Args:
+            obs (Hamiltonian): obs
+            params (List[float]): params
+        """
+        from quafu.simulators.qfvm import adjoint_gradient
+
+        circ = self._est.circ
+        if obs.num_qubits != circ.num:
+            raise ValueError(
+                "The number of qubits in the observables does not match the circuit"
+            )
+        if params is not None:
+            circ.update_params(params)
+        self._check_circuit(circ)
+        _, grads = adjoint_gradient(circ, obs.pauli_list, np.asarray(obs.coeffs, dtype=complex))
+        return np.array(grads)
@@ -0,0 +1,52 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Quafu gradient with selectable method"""
+
+from typing import List
+
+from ..estimator import Estimator
+from ..hamiltonian import Hamiltonian
+from .param_shift import ParamShift
+from .adjoint import Adjoint
+
+GRADIENT_METHODS = {"param_shift": ParamShift, "adjoint": Adjoint}
+
+
+class Gradient:
+    """Calculate gradients of expectation values with respect to circuit parameters"""
+
+    def __init__(self, estimator: Estimator, method: str = "param_shift") -> None:
+        """
+        Args:
+            estimator (Estimator): estimator to calculate expectation values
+            method (str): `"param_shift"` or `"adjoint"`
+        """
+        if method not in GRADIENT_METHODS:
+            raise ValueError(
+                f"Unknown gradient method {method}, should be one of {list(GRADIENT_METHODS)}"
+            )
+        self.method = method
+        self._grad = GRADIENT_METHODS[method](estimator)
+
+    def __call__(self, obs: Hamiltonian, params: List[float]):
+        return self.grad(obs, params)
+
+    def grad(self, obs: Hamiltonian, params: List[float]):
+        """grad.
+
+        Args:
+            obs (Hamiltonian): obs
+            params (List[float]): params
+        """
+        return self._grad.grad(obs, params)
@@ -18,7 +18,9 @@ import numpy as np
 from quafu import QuantumCircuit
 from quafu.algorithms import Hamiltonian
 from quafu.algorithms.estimator import Estimator
-from quafu.algorithms.gradients import ParamShift
+from quafu.algorithms.gradients import Gradient
+from quafu.simulators.default_simulator import simulate_batch, z_expectations
+from quafu.simulators.simulator import simulate
 
 
 def _generate_expval_z(num_qubits: int):
@@ -38,27 +40,40 @@ def run_circ(circ: QuantumCircuit, params: Optional[List[float]] = None):
         circ (QuantumCircuit): circ
         params (Optional[List[float]]): params
     """
-    obs_list = _generate_expval_z(circ.num)
-    estimator = Estimator(circ)
-    if params is None:
-        params = [g.paras for g in circ.parameterized_gates]
-    output = [estimator.run(obs, params) for obs in obs_list]
-    return np.array(output)
+    if params is not None:
+        circ.update_params(params)
+    # the Z observables of all qubits are read from one statevector
+    psi = simulate(circ, output="state_vector", shots=0).get_statevector()
+    # observable i is Z on qubit num - 1 - i
+    return z_expectations(psi[None], list(range(circ.num))[::-1])[0]
+
+
+def run_circ_batch(circ: QuantumCircuit, params: np.ndarray) -> np.ndarray:
+    """Outputs of `run_circ` for every row of params, simulated at once by `simulate_batch`
+
+    Args:
+        circ (QuantumCircuit): circ
+        params (np.ndarray): params, with shape [batch_size, num_params]
+    """
+    psi = simulate_batch(circ, params, output="state_vector")
+    return z_expectations(psi, list(range(circ.num))[::-1])
 
 
-# TODO(zhaoyilun): support more gradient methods
-def jacobian(circ: QuantumCircuit, params_input: np.ndarray):
+def jacobian(
+    circ: QuantumCircuit, params_input: np.ndarray, method: str = "param_shift"
+):
     """Calculate Jacobian matrix
 
     Args:
         circ (QuantumCircuit): circ
         params_input (np.ndarray): params_input, with shape [batch_size, num_params]
+        method (str): gradient method, `"param_shift"` or `"adjoint"`
     """
     batch_size, num_params = params_input.shape
     obs_list = _generate_expval_z(circ.num)
     num_outputs = len(obs_list)
     estimator = Estimator(circ)
-    calc_grad = ParamShift(estimator)
+    calc_grad = Gradient(estimator, method)
     output = np.zeros((batch_size, num_outputs, num_params))
     for i in range(batch_size):
         grad_list = [
@@ -17,7 +17,9 @@
 import torch
 import numpy as np
 from quafu import QuantumCircuit
-from ..gradients import compute_vjp, jacobian, run_circ
+from quafu.simulators.default_simulator import z_expectations
+from quafu.simulators.torch import torch_simulate
+from ..gradients import compute_vjp, jacobian, run_circ, run_circ_batch
 
 
 class TorchTransformer:
@@ -35,6 +37,9 @@ class ExecuteCircuits(torch.autograd.Function):
         ctx.run_fn = kwargs["run_fn"]
         ctx.circ = kwargs["circ"]
         ctx.save_for_backward(parameters)
+        if ctx.run_fn is run_circ and parameters.dim() == 2:
+            # rows share the circuit, all of them are simulated at once
+            return torch.from_numpy(run_circ_batch(ctx.circ, parameters.detach().numpy()))
         parameters = parameters.numpy().tolist()
         outputs = []
         for para in parameters:
@@ -53,6 +58,13 @@ class ExecuteCircuits(torch.autograd.Function):
         return vjp, None
 
 
+def run_circ_torch(circ: QuantumCircuit, parameters: torch.Tensor) -> torch.Tensor:
+    """Outputs of `run_circ` for parameters of shape (P,) or (B, P), differentiable by autograd"""
+    psi = torch_simulate(circ, parameters)
+    outputs = z_expectations(psi.reshape(-1, psi.shape[-1]), list(range(circ.num))[::-1], torch)
+    return outputs[0] if psi.dim() == 1 else outputs
+
+
 # TODO(zhaoyilun): doc
 def execute(
     circ: QuantumCircuit,
@@ -60,6 +72,7 @@ def execute(
     run_fn=run_circ,
     grad_fn=None,
     method="internal",
+    diff_method="backprop",
 ):
     """execute.
 
@@ -67,13 +80,21 @@ def execute(
         circ:
         run_fn:
         grad_fn:
+        diff_method: `"backprop"` to simulate `run_circ` with `torch_simulate` and get gradients from autograd
+            in one backward pass, `"param_shift"` to get them by parameter shift. Other run_fn always use
+            parameter shift.
     """
 
     kwargs = {"circ": circ, "run_fn": run_fn, "grad_fn": grad_fn}
 
     if method == "external":
-        return ExecuteCircuits.apply(parameters, kwargs)
+        params = parameters
     elif method == "internal":
-        return ExecuteCircuits.apply(circ.weights, kwargs)
+        params = circ.weights
     else:
         raise NotImplementedError(f"Unsupported execution method: {method}")
+    if diff_method == "backprop" and run_fn is run_circ:
+        return run_circ_torch(circ, params)
+    elif diff_method not in ["backprop", "param_shift"]:
+        raise NotImplementedError(f"Unsupported differentiation method: {diff_method}")
+    return ExecuteCircuits.apply(params, kwargs)
@@ -0,0 +1,91 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Fidelity quantum kernel of data embedding circuits"""
+import tempfile
+from typing import List, Optional, Union
+
+import numpy as np
+from quafu import QuantumCircuit
+
+
+def _column_states(circuits: List[QuantumCircuit], num: int, block_size: int, max_memory: int) -> np.ndarray:
+    """Statevectors of circuits as rows, simulated once tile by tile, in a temporary memmap if they exceed max_memory"""
+    from quafu.simulators.qfvm import batch_statevectors
+
+    shape = (len(circuits), 2**num)
+    if shape[0] * shape[1] * 16 <= max_memory:
+        states = np.empty(shape, dtype=complex)
+    else:
+        # the file is deleted once the memmap is released
+        states = np.memmap(tempfile.TemporaryFile(), dtype=complex, mode="w+", shape=shape)
+    for j in range(0, shape[0], block_size):
+        states[j : j + block_size] = batch_statevectors(list(circuits[j : j + block_size]), num)
+    return states
+
+
+def fidelity_kernel(
+    circuits_a: List[QuantumCircuit],
+    circuits_b: Optional[List[QuantumCircuit]] = None,
+    block_size: int = 512,
+    out: Union[str, np.ndarray, None] = None,
+    max_memory: int = 2**30,
+) -> np.ndarray:
+    """Kernel matrix K_ij = |<psi(a_i)|psi(b_j)>|^2 of embedding circuits.
+
+    The circuits are simulated in batches by qfvm and only the overlaps are returned.
+    Every circuit is simulated once: the statevectors of the columns are kept in memory,
+    or in a temporary memmap file beyond `max_memory` bytes, while the rows are simulated
+    one tile of `block_size` circuits at a time.
+
+    Args:
+        circuits_a: embedding circuits of the rows, e.g. built with `AngleEmbedding`.
+        circuits_b: embedding circuits of the columns, circuits_a if None. The kernel is
+            then symmetric and only the upper tiles are computed.
+        block_size: number of circuits in a tile.
+        out: array to write into, or the path of a memmap file created for the matrix.
+        max_memory: largest number of bytes of column statevectors held in memory.
+
+    Returns:
+        The kernel matrix, a memmap if `out` is a path.
+    """
+    from quafu.simulators.qfvm import batch_statevectors, fidelity_matrix
+
+    symmetric = circuits_b is None
+    if symmetric:
+        circuits_b = circuits_a
+    num = max(max(qc.used_qubits) + 1 for qc in list(circuits_a) + list(circuits_b))
+    shape = (len(circuits_a), len(circuits_b))
+    if out is None:
+        out = np.empty(shape)
+    elif isinstance(out, str):
+        out = np.lib.format.open_memmap(out, mode="w+", dtype=np.float64, shape=shape)
+    elif out.shape != shape:
+        raise ValueError(f"Output of shape {out.shape} for a kernel of shape {shape}")
+
+    cols = _column_states(circuits_b, num, block_size, max_memory)
+    for i in range(0, shape[0], block_size):
+        if symmetric:
+            rows = np.ascontiguousarray(cols[i : i + block_size])
+        else:
+            rows = batch_statevectors(list(circuits_a[i : i + block_size]), num)
+        start = i if symmetric else 0
+        for j in range(start, shape[1], block_size):
+            tile = fidelity_matrix(rows, cols[j : j + block_size])
+            out[i : i + block_size, j : j + block_size] = tile
+            if symmetric and j != i:
+                out[j : j + block_size, i : i + block_size] = tile.T
+    del cols
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
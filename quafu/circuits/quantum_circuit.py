@@ -13,14 +13,14 @@
 # limitations under the License.
 
 from contextlib import contextmanager
-from typing import Any, List
+from typing import Any, Dict, Iterable, List
 
 import numpy as np
 
 import quafu.elements.element_gates as qeg
 from quafu.elements.classical_element import Cif
 from quafu.elements.instruction import Instruction
-from quafu.elements import Measure, Reset
+from quafu.elements import Measure, Reset, Snapshot
 from quafu.elements.pulses import QuantumPulse
 from ..elements import (
     Barrier,
@@ -38,6 +38,92 @@ from ..exceptions import CircuitError
 import copy
 
 
+class CircuitIndex(object):
+    """
+    Metadata of a circuit kept up to date as gates, instructions and measures are appended.
+
+    Each entry of the gate, instruction and measure lists of the circuit is read once, so queries take
+    constant time. The index is rebuilt if one of these lists is replaced or shortened.
+    """
+
+    def __init__(self):
+        self.used = set()
+        self.frontier = {}
+        self.depth = 0
+        self.gate_counts = {}
+        self.parameterized_gates = []
+        self.measures = {}
+        self._used_qubits = []
+        self._sources = (None, None, None)
+        self._sizes = (0, 0, 0)
+
+    @property
+    def used_qubits(self) -> List[int]:
+        if self._used_qubits is None:
+            self._used_qubits = sorted(self.used)
+        return self._used_qubits
+
+    def sync(self, qc: "QuantumCircuit") -> "CircuitIndex":
+        """Read the entries appended to the lists of qc since the last call"""
+        sources = (qc.gates, qc.instructions, qc._measures)
+        if any(a is not b or len(a) < n for a, b, n in zip(sources, self._sources, self._sizes)):
+            self.__init__()
+        gates, instructions, measures = sources
+        for gate in gates[self._sizes[0]:]:
+            self._add_gate(gate)
+        for ins in instructions[self._sizes[1]:]:
+            if isinstance(ins, (Reset, Cif, Snapshot)):
+                self._use(_instruction_qubits([ins]))
+        for meas in measures[self._sizes[2]:]:
+            self.measures.update(zip(meas.qbits, meas.cbits))
+            self._use(meas.qbits)
+        self._sources = sources
+        self._sizes = tuple(len(source) for source in sources)
+        return self
+
+    def truncate_instructions(self, size: int):
+        """Forget the instructions after the first size ones, whose qubits are kept as used"""
+        self._sizes = (self._sizes[0], min(self._sizes[1], size), self._sizes[2])
+
+    def _use(self, qubits: Iterable[int]):
+        for q in qubits:
+            if q not in self.used:
+                self.used.add(q)
+                self._used_qubits = None
+
+    def _add_gate(self, gate: Instruction):
+        name = gate.name.lower()
+        self.gate_counts[name] = self.gate_counts.get(name, 0) + 1
+        if gate.paras is not None:
+            self.parameterized_gates.append(gate)
+        pos = list(gate.pos) if isinstance(gate.pos, Iterable) else [gate.pos]
+        if not pos:
+            return
+        if not isinstance(gate, Barrier):
+            self._use(pos)
+        # gates on several qubits take one layer on all the qubits between them, as in layered_circuit
+        span = range(min(pos), max(pos) + 1)
+        layer = max(self.frontier.get(q, 0) for q in span) + 1
+        for q in span:
+            self.frontier[q] = layer
+        self.depth = max(self.depth, layer)
+
+
+def _instruction_qubits(instructions) -> List[int]:
+    """Qubits of instructions, including those in `cif` blocks, barriers excluded"""
+    qubits = []
+    for ins in instructions:
+        if isinstance(ins, Cif):
+            qubits.extend(_instruction_qubits(ins.instructions or []))
+        elif isinstance(ins, Barrier):
+            continue
+        elif isinstance(ins.pos, Iterable):
+            qubits.extend(ins.pos)
+        else:
+            qubits.append(ins.pos)
+    return qubits
+
+
 class QuantumCircuit(object):
     """
     Representation of quantum circuit.
@@ -60,15 +146,15 @@ class QuantumCircuit(object):
         self.circuit = []
         self._measures = []
         self.executable_on_backend = True
-        self._used_qubits = []
-        self._parameterized_gates = []
+        self._index = CircuitIndex()
+
+    def _metadata(self) -> CircuitIndex:
+        return self._index.sync(self)
 
     @property
     def parameterized_gates(self):
         """Return the list of gates which the parameters are tunable"""
-        if not self._parameterized_gates:
-            self._parameterized_gates = [g for g in self.gates if g.paras is not None]
-        return self._parameterized_gates
+        return self._metadata().parameterized_gates
 
     @property
     def num(self):
@@ -80,15 +166,27 @@ class QuantumCircuit(object):
 
     @property
     def used_qubits(self) -> List:
-        self.layered_circuit()
-        return self._used_qubits
+        """Sorted qubits acted on by gates, resets, snapshots or measurements"""
+        return list(self._metadata().used_qubits)
+
+    @property
+    def depth(self) -> int:
+        """Number of layers of the circuit, a gate on several qubits taking a layer on all the qubits between them"""
+        return self._metadata().depth
+
+    @property
+    def frontier_depths(self) -> Dict[int, int]:
+        """Number of layers up to the last gate of each qubit"""
+        return dict(self._metadata().frontier)
+
+    @property
+    def gate_counts(self) -> Dict[str, int]:
+        """Number of gates of each name, barriers and delays included"""
+        return dict(self._metadata().gate_counts)
 
     @property
     def measures(self):
-        measures = {}
-        for meas in self._measures:
-            measures.update(dict(zip(meas.qbits, meas.cbits)))
-        return measures
+        return dict(self._metadata().measures)
 
     @measures.setter
     def measures(self, measures: dict):
@@ -128,6 +226,7 @@ class QuantumCircuit(object):
             #       Figure out better handling in the future.
             self.add_gate(ins)
         self.instructions.append(ins)
+        self._index.sync(self)
 
     def update_params(self, paras_list: List[Any]):
         """Update parameters of parameterized gates
@@ -148,7 +247,8 @@ class QuantumCircuit(object):
 
     def layered_circuit(self) -> np.ndarray:
         """
-        Make layered circuit from the gate sequence self.gates.
+        Make layered circuit from the gate sequence self.gates, only needed to draw the circuit.
+        Depth and used qubits are kept up to date by the circuit itself.
 
         Returns:
             A layered list with left justed circuit.
@@ -156,7 +256,6 @@ class QuantumCircuit(object):
         num = self.num
         gatelist = self.gates
         gateQlist = [[] for i in range(num)]
-        used_qubits = []
         for gate in gatelist:
             if (
                     isinstance(gate, SingleQubitGate)
@@ -164,13 +263,12 @@ class QuantumCircuit(object):
                     or isinstance(gate, QuantumPulse)
             ):
                 gateQlist[gate.pos].append(gate)
-                if gate.pos not in used_qubits:
-                    used_qubits.append(gate.pos)
 
             elif (
                     isinstance(gate, Barrier)
                     or isinstance(gate, MultiQubitGate)
                     or isinstance(gate, XYResonance)
+                    or isinstance(gate.pos, list)
             ):
                 pos1 = min(gate.pos)
                 pos2 = max(gate.pos)
@@ -178,11 +276,6 @@ class QuantumCircuit(object):
                 for j in range(pos1 + 1, pos2 + 1):
                     gateQlist[j].append(None)
 
-                if isinstance(gate, MultiQubitGate) or isinstance(gate, XYResonance):
-                    for pos in gate.pos:
-                        if pos not in used_qubits:
-                            used_qubits.append(pos)
-
                 maxlayer = max([len(gateQlist[j]) for j in range(pos1, pos2 + 1)])
                 for j in range(pos1, pos2 + 1):
                     layerj = len(gateQlist[j])
@@ -191,43 +284,12 @@ class QuantumCircuit(object):
                         for i in range(abs(layerj - maxlayer)):
                             gateQlist[j].insert(pos, None)
 
-        # Add support of used_qubits for Reset and Cif
-        def get_used_qubits(instructions):
-            used_q = []
-            for ins in instructions:
-                if (isinstance(ins, Cif)):
-                    used_q_h = get_used_qubits(ins.instructions)
-                    for pos in used_q_h:
-                        if pos not in used_q:
-                            used_q.append(pos)
-                elif (isinstance(ins, Barrier)):
-                    continue
-                elif (isinstance(ins.pos, int)):
-                    if ins.pos not in used_q:
-                        used_q.append(ins.pos)
-                elif (isinstance(ins.pos, list)):
-                    for pos in ins.pos:
-                        if pos not in used_q:
-                            used_q.append(pos)
-            return used_q
-
-        # Only consider of reset and cif
-        for ins in self.instructions:
-            if isinstance(ins, (Reset, Cif)):
-                used_q = get_used_qubits([ins])
-                for pos in used_q:
-                    if pos not in used_qubits:
-                        used_qubits.append(pos)
-
         maxdepth = max([len(gateQlist[i]) for i in range(num)])
 
         for gates in gateQlist:
             gates.extend([None] * (maxdepth - len(gates)))
 
-        for m in self.measures.keys():
-            if m not in used_qubits:
-                used_qubits.append(m)
-        used_qubits = np.sort(used_qubits)
+        used_qubits = np.array(self.used_qubits, dtype=int)
 
         new_gateQlist = []
         for old_qi in range(len(gateQlist)):
@@ -238,7 +300,6 @@ class QuantumCircuit(object):
         lc = np.array(new_gateQlist)
         lc = np.vstack((used_qubits, lc.T)).T
         self.circuit = lc
-        self._used_qubits = list(used_qubits)
         return self.circuit
 
     def draw_circuit(self, width: int = 4, return_str: bool = False):
@@ -801,6 +862,26 @@ class QuantumCircuit(object):
         """
         self.add_ins(qeg.MCZGate(ctrls, targ))
 
+    def permutation(self, table, qubits: List[int]) -> "QuantumCircuit":
+        """
+        Reversible classical gate mapping basis state |x> to |table[x]>, applied by qfvm in one pass.
+
+        Args:
+            table: list of the images of 0..2^k-1, or a function computing the image of x.
+            qubits: the k qubits, bit j of x counted from the most significant is qubit qubits[j].
+
+        Note: permutation only support for simulators of `qfvm`.
+        """
+        if callable(table):
+            table = [table(x) for x in range(2 ** len(qubits))]
+        try:
+            gate = qeg.PermutationGate(table, qubits)
+        except ValueError as e:
+            raise CircuitError(str(e))
+        self.add_ins(gate)
+        self.executable_on_backend = False
+        return self
+
     def unitary(self, matrix: np.ndarray, pos: List[int]):
         """
         Apply unitary to circuit on specified qubits.
@@ -839,6 +920,44 @@ class QuantumCircuit(object):
         self.executable_on_backend = False
         return self
 
+    def snapshot(self, label: str, kind: str = "statevector", observable=None, qubits: List[int] = None) -> "QuantumCircuit":
+        """
+        Record a quantity of the simulated state at this point without disturbing it.
+        Values are kept in `snapshots[label]` of the simulation result.
+
+        Args:
+            label: Key of the recorded value, unique in the circuit.
+            kind: `"statevector"`: The full statevector in little endian convention.
+                `"probabilities"`: Probabilities on qubits, ordered in big endian convention.
+                `"expval"`: Real expectation value of observable.
+            observable: Hamiltonian or list of (pauli string, coefficient), the rightmost character acts on qubit 0.
+            qubits: Qubits of `"probabilities"`, all qubits if None.
+
+        Note: snapshot only support for simulator `qfvm_circ` on cpu.
+        """
+        if any(isinstance(ins, Snapshot) and ins.label == label for ins in self.instructions):
+            raise CircuitError(f"Snapshot label {label} already exists.")
+        paulis, coeffs, pos = None, None, []
+        if kind == "probabilities":
+            pos = list(range(self.num)) if qubits is None else list(qubits)
+        elif kind == "expval":
+            if observable is None:
+                raise CircuitError("An observable is needed for expval snapshot.")
+            if hasattr(observable, "pauli_list"):
+                paulis, coeffs = list(observable.pauli_list), list(observable.coeffs)
+            else:
+                paulis, coeffs = [p for p, _ in observable], [c for _, c in observable]
+            coeffs = [complex(c) for c in coeffs]
+            pos = sorted({len(p) - 1 - i for p in paulis for i, c in enumerate(p) if c.upper() != "I"})
+            paulis = [p.upper() for p in paulis]
+        elif kind != "statevector":
+            raise CircuitError(f"Unknown snapshot kind {kind}.")
+        if np.any(np.array(pos, dtype=int) >= self.num):
+            raise CircuitError(f"Snapshot position out of range: {pos}")
+        self.add_ins(Snapshot(label, kind, pos, paulis, coeffs))
+        self.executable_on_backend = False
+        return self
+
     def measure(self, pos: List[int] = None, cbits: List[int] = None) -> None:
         """
         Measurement setting for experiment device.
@@ -918,9 +1037,12 @@ class QuantumCircuit(object):
         instructions = []
         for i in range(len(self.instructions) - 1, -1, -1):
             if isinstance(self.instructions[i], Cif) and self.instructions[i].instructions is None:
+                if any(isinstance(ins, Snapshot) for ins in instructions):
+                    raise CircuitError("Snapshot is not supported in cif.")
                 instructions.reverse()
                 self.instructions[i].set_ins(instructions)
-                self.instructions = self.instructions[0:i + 1]
+                del self.instructions[i + 1:]
+                self._index.truncate_instructions(i + 1)
                 return
             else:
                 instructions.append(self.instructions[i])
@@ -0,0 +1,143 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Search wire cuts that split a circuit into narrow fragments"""
+
+from typing import List, Tuple
+
+import networkx as nx
+from networkx.algorithms.community import greedy_modularity_communities, kernighan_lin_bisection
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from quafu.dagcircuits.circuit_dag import circuit_to_dag
+from quafu.exceptions import CircuitError
+
+from .fragments import cut_wires
+
+
+def _interaction_graph(qc: QuantumCircuit, num: int) -> nx.Graph:
+    """Qubits linked by edges weighted by the number of multi-qubit gates acting on both"""
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num))
+    for gate in qc.gates:
+        if gate.name.lower() in ["barrier", "delay"] or not isinstance(gate.pos, list):
+            continue
+        for i, q1 in enumerate(gate.pos):
+            for q2 in gate.pos[i + 1 :]:
+                weight = graph.get_edge_data(q1, q2, {"weight": 0})["weight"]
+                graph.add_edge(q1, q2, weight=weight + 1)
+    return graph
+
+
+def _communities(graph: nx.Graph, size: int) -> List[set]:
+    """Split the qubits into weighted modularity communities, splitting again those above size qubits.
+
+    Communities are not forced to equal sizes, so blocks of qubits linked by few gates stay whole.
+    A community that modularity leaves whole is bisected along its minimum-weight cut.
+    """
+    if graph.number_of_nodes() <= size:
+        return [set(graph.nodes)]
+    if graph.number_of_edges() == 0:
+        return [{q} for q in graph.nodes]
+    parts = greedy_modularity_communities(graph, weight="weight")
+    if len(parts) == 1:
+        parts = kernighan_lin_bisection(graph, weight="weight", seed=0)
+    return [c for part in parts for c in _communities(graph.subgraph(part), size)]
+
+
+def _clusters(graph: nx.Graph, size: int) -> List[List[int]]:
+    """Clusters of at most size qubits, merging the communities linked by the most gates first"""
+    clusters = _communities(graph, size)
+    while True:
+        best = None
+        for i in range(len(clusters)):
+            for j in range(i + 1, len(clusters)):
+                if len(clusters[i]) + len(clusters[j]) > size:
+                    continue
+                weight = nx.cut_size(graph, clusters[i], clusters[j], weight="weight")
+                if weight > 0 and (best is None or weight > best[0]):
+                    best = (weight, i, j)
+        if best is None:
+            break
+        _, i, j = best
+        clusters[i] = clusters[i] | clusters.pop(j)
+    return sorted(sorted(c) for c in clusters)
+
+
+def _wire_cuts(qc: QuantumCircuit, clusters: List[List[int]]) -> List[Tuple[int, int]]:
+    """Assign every gate to a cluster and cut the DAG edges between gates of different clusters.
+
+    A gate goes to the cluster holding most of its qubits, ties going to the cluster most of them
+    belong to so that displaced qubits return. Each qubit is held by the cluster of its last gate,
+    starting from the one it belongs to.
+    """
+    home = {q: c for c, cluster in enumerate(clusters) for q in cluster}
+    dag = circuit_to_dag(qc, measure_flag=False)
+    nodes = sorted((n for n in dag.nodes if not isinstance(n, (int, float))), key=lambda n: n.label)
+    location = dict(home)
+    assigned = {}
+    for node in nodes:
+        if node.name.lower() in ["barrier", "delay"]:
+            continue
+        votes = [location[q] for q in node.pos]
+        homes = [home[q] for q in node.pos]
+        assigned[node] = max(votes + homes, key=lambda c: (votes.count(c), homes.count(c), -c))
+        for q in node.pos:
+            location[q] = assigned[node]
+
+    def source(node, qubit):
+        # gate before node on the wire of qubit, looking through barriers and delays
+        while True:
+            preds = [u for u, _, label in dag.in_edges(node, data="label") if label == f"q{qubit}"]
+            node = preds[0]
+            if isinstance(node, (int, float)) or node in assigned:
+                return node
+
+    cuts = set()
+    for node in assigned:
+        for q in node.pos:
+            prev = source(node, q)
+            if not isinstance(prev, (int, float)) and assigned[prev] != assigned[node]:
+                cuts.add((q, prev.label))
+    return sorted(cuts)
+
+
+def find_cuts(qc: QuantumCircuit, max_width: int) -> List[Tuple[int, int]]:
+    """Wire cuts splitting qc into fragments of at most max_width qubits.
+
+    Qubits are split into clusters along the few gates linking them, then the edges of the circuit
+    DAG leaving a cluster are cut. Every cluster size up to max_width is tried, and the cuts whose
+    fragments fit with the fewest variants `4**in_cuts * 3**out_cuts` are returned.
+
+    Args:
+        qc: Circuit to cut.
+        max_width: Largest number of qubits of a fragment.
+
+    Returns:
+        (qubit, gate index) pairs, the wire of the qubit is cut right after `qc.gates[gate index]`.
+    """
+    num = max(qc.used_qubits) + 1
+    graph = _interaction_graph(qc, num)
+    best = None
+    for size in range(min(max_width, num), 0, -1):
+        cuts = _wire_cuts(qc, _clusters(graph, size))
+        fragments = cut_wires(qc, cuts)
+        if max(f.width for f in fragments) > max_width:
+            continue
+        variants = sum(4 ** len(f.in_cuts) * 3 ** len(f.out_cuts) for f in fragments)
+        if best is None or variants < best[0]:
+            best = (variants, cuts)
+    if best is None:
+        raise CircuitError(f"Could not cut the circuit into fragments of {max_width} qubits")
+    return best[1]
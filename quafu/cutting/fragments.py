@@ -0,0 +1,220 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fragments of a circuit whose wires are cut"""
+
+import copy
+import itertools
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from quafu.elements import QuantumGate
+from quafu.exceptions import CircuitError
+
+# States prepared after a cut and bases measured before it, the identity is read from the Z basis
+INIT_STATES = ["0", "1", "+", "+i"]
+MEASURE_BASES = ["Z", "X", "Y"]
+
+
+def _remap(gate: QuantumGate, mapping: dict) -> QuantumGate:
+    def map_pos(pos):
+        if isinstance(pos, Iterable):
+            return [mapping[p] for p in pos]
+        return mapping[pos]
+
+    gate_ = copy.copy(gate)
+    for key, val in gate.named_pos.items():
+        setattr(gate_, key, map_pos(val))
+    gate_.pos = map_pos(gate.pos)
+    return gate_
+
+
+def _rotate_to_z(qc: QuantumCircuit, qubit: int, basis: str):
+    if basis == "X":
+        qc.h(qubit)
+    elif basis == "Y":
+        qc.sdg(qubit)
+        qc.h(qubit)
+
+
+class Fragment:
+    """Part of a cut circuit simulated on its own.
+
+    Every wire segment between two cuts becomes a local qubit, in the order of `segments`.
+
+    Attributes:
+        segments (list): (qubit, segment number) of the local qubits.
+        gates (list): Gates acting on local qubits.
+        in_cuts (list): (cut index, local qubit) of the segments starting after a cut.
+        out_cuts (list): (cut index, local qubit) of the segments ending before a cut.
+        finals (dict): Local qubit of the last segment of each qubit ending in the fragment.
+    """
+
+    def __init__(self, segments: List[Tuple[int, int]]):
+        self.segments = segments
+        self.gates = []
+        self.in_cuts = []
+        self.out_cuts = []
+        self.finals = {}
+
+    @property
+    def width(self) -> int:
+        return len(self.segments)
+
+    def variants(self, outputs: List[int], bases: dict = None) -> List[QuantumCircuit]:
+        """Circuits of all preparations of in_cuts and measurements of out_cuts.
+
+        Variants are ordered as `itertools.product(INIT_STATES, ..., MEASURE_BASES, ...)`.
+        The measured bits are the outputs followed by the out_cuts.
+
+        Args:
+            outputs: Local qubits measured at the end.
+            bases: Pauli letter in which local qubits of outputs are measured, Z if missing.
+        """
+        bases = bases or {}
+        measured = list(outputs) + [q for _, q in self.out_cuts]
+        variants = []
+        for inits in itertools.product(INIT_STATES, repeat=len(self.in_cuts)):
+            for meas in itertools.product(MEASURE_BASES, repeat=len(self.out_cuts)):
+                qc = QuantumCircuit(self.width, max(len(measured), 1))
+                for (_, q), state in zip(self.in_cuts, inits):
+                    if state == "1":
+                        qc.x(q)
+                    elif state in ["+", "+i"]:
+                        qc.h(q)
+                        if state == "+i":
+                            qc.s(q)
+                for gate in self.gates:
+                    qc.add_ins(gate)
+                for q in outputs:
+                    _rotate_to_z(qc, q, bases.get(q, "Z"))
+                for (_, q), basis in zip(self.out_cuts, meas):
+                    _rotate_to_z(qc, q, basis)
+                qc.measure(measured, list(range(len(measured))))
+                variants.append(qc)
+        return variants
+
+    def tensor(self, probabilities: np.ndarray, num_outputs: int) -> np.ndarray:
+        """Turn the probabilities of the variants into the fragment tensor.
+
+        Args:
+            probabilities: Probabilities of the measured bits of each variant, shape (variants, 2**measured).
+            num_outputs: Number of outputs measured before the out_cuts.
+
+        Returns:
+            Tensor of shape (2**num_outputs,) + (4,) * (len(in_cuts) + len(out_cuts)), the cut axes
+            running over the Pauli operators I, X, Y, Z.
+        """
+        m, k = len(self.in_cuts), len(self.out_cuts)
+        tensor = probabilities.reshape((4,) * m + (3,) * k + (2,) * (num_outputs + k))
+        for _ in range(m):
+            tensor = np.tensordot(tensor, _INIT_TO_PAULI, axes=([0], [0]))
+        for j in range(k):
+            tensor = np.tensordot(tensor, _MEASURE_TO_PAULI, axes=([0, k - j + num_outputs], [0, 1]))
+        return tensor.reshape((2**num_outputs,) + (4,) * (m + k))
+
+
+def cut_wires(qc: QuantumCircuit, cuts: List[Tuple[int, int]]) -> List[Fragment]:
+    """Split qc at wire cuts.
+
+    Args:
+        qc: Circuit of gates with measurements at the end.
+        cuts: (qubit, gate index) pairs, the wire of the qubit is cut right after `qc.gates[gate index]`.
+            Barriers and delays are ignored.
+
+    Returns:
+        The fragments, which are the connected components of the wire segments.
+    """
+    num = max(qc.used_qubits) + 1
+    gates = [(k, gate) for k, gate in enumerate(qc.gates) if _is_gate(gate)]
+    wires = [[] for _ in range(num)]
+    for k, gate in gates:
+        for q in _positions(gate):
+            wires[q].append(k)
+    cuts = sorted(set(cuts))
+    for q, k in cuts:
+        if q >= num or k not in wires[q]:
+            raise CircuitError(f"Gate {k} does not act on qubit {q}")
+        if k == wires[q][-1]:
+            raise CircuitError(f"Cut after the last gate of qubit {q}")
+
+    def segment(q, k):
+        return q, sum(1 for c in cuts if c[0] == q and c[1] < k)
+
+    parent = {}
+
+    def find(s):
+        while parent[s] != s:
+            parent[s] = parent[parent[s]]
+            s = parent[s]
+        return s
+
+    for q in range(num):
+        for s in range(sum(1 for c in cuts if c[0] == q) + 1):
+            parent[(q, s)] = (q, s)
+    for k, gate in gates:
+        roots = [find(segment(q, k)) for q in _positions(gate)]
+        for r in roots[1:]:
+            parent[r] = roots[0]
+
+    groups = {}
+    for s in sorted(parent):
+        groups.setdefault(find(s), []).append(s)
+    fragments = [Fragment(segs) for segs in groups.values()]
+    owner = {}
+    for f, fragment in enumerate(fragments):
+        for j, s in enumerate(fragment.segments):
+            owner[s] = (f, j)
+
+    for k, gate in gates:
+        pos = _positions(gate)
+        f = owner[segment(pos[0], k)][0]
+        fragments[f].gates.append(_remap(gate, {q: owner[segment(q, k)][1] for q in pos}))
+    for c, (q, k) in enumerate(cuts):
+        f, j = owner[segment(q, k)]
+        fragments[f].out_cuts.append((c, j))
+        f, j = owner[segment(q, k + 1)]
+        fragments[f].in_cuts.append((c, j))
+    for q in range(num):
+        f, j = owner[segment(q, len(qc.gates))]
+        fragments[f].finals[q] = j
+    return fragments
+
+
+def _is_gate(ins) -> bool:
+    return isinstance(ins, QuantumGate) and ins.name.lower() not in ["barrier", "delay", "id"]
+
+
+def _positions(gate: QuantumGate) -> List[int]:
+    return list(gate.pos) if isinstance(gate.pos, Iterable) else [gate.pos]
+
+
+# Pauli operator of each prepared state, O = sum_s weight * |s><s|
+_INIT_TO_PAULI = np.array(
+    [
+        [1.0, -1.0, -1.0, 1.0],  # 0
+        [1.0, -1.0, -1.0, -1.0],  # 1
+        [0.0, 2.0, 0.0, 0.0],  # +
+        [0.0, 0.0, 2.0, 0.0],  # +i
+    ]
+)
+
+# Expectation of each Pauli operator from the basis and outcome of a measurement
+_MEASURE_TO_PAULI = np.zeros((3, 2, 4))
+_MEASURE_TO_PAULI[0, :, 0] = 1.0
+_MEASURE_TO_PAULI[0, :, 3] = [1.0, -1.0]
+_MEASURE_TO_PAULI[1, :, 1] = [1.0, -1.0]
+_MEASURE_TO_PAULI[2, :, 2] = [1.0, -1.0]
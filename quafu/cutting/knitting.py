@@ -0,0 +1,164 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Knit the results of circuit fragments back together"""
+
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from quafu.algorithms.hamiltonian import Hamiltonian
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from quafu.exceptions import CircuitError
+from quafu.simulators.cache import SimulationCache
+from quafu.tasks.tasks import Task
+
+from .cuts import find_cuts
+from .fragments import cut_wires
+
+
+class CutCircuit:
+    """Circuit cut into fragments that are simulated or executed separately.
+
+    A cut wire carries the state `rho = sum_O Tr(O rho) O / 2` over the Paulis O. The fragment
+    before the cut measures Tr(O rho) in the X, Y and Z bases and the fragment after it
+    prepares O from the states 0, 1, + and +i. Results are summed over the 4**cuts Pauli
+    assignments by contracting the fragment tensors.
+
+    Args:
+        qc: Circuit of gates with measurements at the end.
+        cuts: (qubit, gate index) pairs, the wire of the qubit is cut right after `qc.gates[gate index]`.
+        task: Execute the fragments with task instead of simulating them with `qfvm_circ`.
+    """
+
+    def __init__(self, qc: QuantumCircuit, cuts: List[Tuple[int, int]], task: Task = None):
+        if not SimulationCache.supports(qc):
+            raise CircuitError("Only circuits with measurements at the end can be cut")
+        self.qc = qc
+        self.cuts = sorted(set(cuts))
+        self.task = task
+        self.fragments = cut_wires(qc, self.cuts)
+        measures = qc.measures
+        num = max(qc.used_qubits) + 1
+        self.measured = sorted(measures, key=lambda q: measures[q]) if measures else list(range(num))
+
+    @property
+    def num_variants(self) -> int:
+        """Number of circuits executed for the probabilities"""
+        return sum(4 ** len(f.in_cuts) * 3 ** len(f.out_cuts) for f in self.fragments)
+
+    def _run(self, circuits: List[QuantumCircuit]) -> List[np.ndarray]:
+        if self.task is None:
+            from quafu.simulators.simulator import simulate_many
+
+            return [res.probabilities for res in simulate_many(circuits)]
+        results = []
+        for qc in circuits:
+            probabilities = np.zeros(2**qc.cbits_num)
+            for bitstr, prob in self.task.send(qc).probabilities.items():
+                probabilities[int(bitstr, 2)] = prob
+            results.append(probabilities)
+        return results
+
+    def _tensors(self, outputs: List[List[int]], bases: List[dict]) -> List[np.ndarray]:
+        """Tensors of the fragments measuring outputs in bases, all fragment variants run in one batch"""
+        batch, spans = [], []
+        for fragment, outs, bases_ in zip(self.fragments, outputs, bases):
+            if len(outs) + len(fragment.out_cuts) == 0:
+                spans.append(None)
+                continue
+            variants = fragment.variants(outs, bases_)
+            spans.append((len(batch), len(batch) + len(variants)))
+            batch += variants
+        probabilities = self._run(batch) if batch else None
+
+        tensors = []
+        for fragment, outs, span in zip(self.fragments, outputs, spans):
+            if span is None:
+                # nothing is measured, every variant has probability 1
+                probs = np.ones(4 ** len(fragment.in_cuts))
+            else:
+                probs = np.stack(probabilities[span[0] : span[1]])
+            tensors.append(fragment.tensor(probs, len(outs)))
+        return tensors
+
+    def _contract(self, tensors: List[np.ndarray], output: bool) -> np.ndarray:
+        """Sum over the cut indices, keeping the leading output axis of every fragment if output"""
+        nf = len(self.fragments)
+        operands = []
+        for f, (fragment, tensor) in enumerate(zip(self.fragments, tensors)):
+            labels = [nf + c for c, _ in fragment.in_cuts + fragment.out_cuts]
+            operands += [tensor, [f] + labels if output else labels]
+        result = np.einsum(*operands, list(range(nf)) if output else [], optimize=True)
+        return result / 2 ** len(self.cuts)
+
+    def probabilities(self) -> np.ndarray:
+        """Probabilities of the measured qubits, in the order of `simulate`"""
+        outputs = [[] for _ in self.fragments]
+        order = []
+        for p, q in enumerate(self.measured):
+            for f, fragment in enumerate(self.fragments):
+                if q in fragment.finals:
+                    outputs[f].append(fragment.finals[q])
+                    order.append((f, p))
+        positions = []
+        for f in range(len(self.fragments)):
+            positions += [p for f_, p in order if f_ == f]
+        tensors = self._tensors(outputs, [{} for _ in self.fragments])
+        probs = self._contract(tensors, True).reshape((2,) * len(positions))
+        return np.transpose(probs, np.argsort(positions)).reshape(-1)
+
+    def expectation(self, obs: Union[str, Hamiltonian]) -> float:
+        """Expectation value of a Pauli string or a Hamiltonian at the end of the circuit.
+
+        Pauli strings have qubit 0 as their rightmost letter. Measurements of qc are ignored.
+        """
+        if isinstance(obs, Hamiltonian):
+            return float(
+                np.real(sum(c * self.expectation(p) for p, c in zip(obs.pauli_list, obs.coeffs)))
+            )
+        paulis = {q: s for q, s in enumerate(reversed(obs.upper())) if s != "I"}
+        if any(all(q not in f.finals for f in self.fragments) for q in paulis):
+            raise CircuitError(f"Observable {obs} acts on qubits outside the circuit")
+        outputs, bases = [], []
+        for fragment in self.fragments:
+            local = {fragment.finals[q]: s for q, s in paulis.items() if q in fragment.finals}
+            outputs.append(sorted(local))
+            bases.append(local)
+        tensors = []
+        for tensor, outs in zip(self._tensors(outputs, bases), outputs):
+            parity = np.array([(-1) ** bin(i).count("1") for i in range(2 ** len(outs))])
+            tensors.append(np.tensordot(parity, tensor, axes=([0], [0])))
+        return float(self._contract(tensors, False))
+
+
+def cut_circuit(
+    qc: QuantumCircuit,
+    max_width: int = None,
+    cuts: List[Tuple[int, int]] = None,
+    task: Task = None,
+) -> CutCircuit:
+    """Cut qc into fragments of at most max_width qubits, or at the given cuts.
+
+    Args:
+        qc: Circuit of gates with measurements at the end.
+        max_width: Largest number of qubits of a fragment when cuts are searched with `find_cuts`.
+        cuts: (qubit, gate index) pairs, the wire of the qubit is cut right after `qc.gates[gate index]`.
+        task: Execute the fragments with task instead of simulating them with `qfvm_circ`.
+    """
+    if cuts is None:
+        if max_width is None:
+            raise ValueError("Either max_width or cuts must be given")
+        cuts = find_cuts(qc, max_width)
+    return CutCircuit(qc, cuts, task)
@@ -1,4 +1,4 @@
-from .instruction import Instruction, Barrier, Measure, Reset
+from .instruction import Instruction, Barrier, Measure, Reset, Snapshot
 from .pulses import Delay, XYResonance, QuantumPulse
 from .quantum_gate import QuantumGate, ControlledGate, MultiQubitGate, SingleQubitGate
 from .classical_element import Cif
@@ -5,6 +5,7 @@ from .swap import SwapGate, ISwapGate
 from .c11 import CXGate, CYGate, CZGate, CSGate, CTGate, CPGate
 from .c12 import FredkinGate
 from .cm1 import MCXGate, MCYGate, MCZGate, ToffoliGate
+from .permutation import PermutationGate
 from .unitary import UnitaryDecomposer
 
 __all__ = [
@@ -30,6 +31,7 @@ __all__ = [
     "RXXGate",
     "RYYGate",
     "RZZGate",
+    "PhaseGate",
     "SwapGate",
     "ISwapGate",
     "CXGate",
@@ -43,5 +45,6 @@ __all__ = [
     "MCXGate",
     "MCYGate",
     "MCZGate",
+    "PermutationGate",
     "UnitaryDecomposer",
 ]
@@ -0,0 +1,122 @@
+from typing import Dict, List
+
+import numpy as np
+
+from ..quantum_gate import FixedGate, MultiQubitGate, QuantumGate
+from .c11 import CXGate
+from .cm1 import MCXGate, ToffoliGate
+from .pauli import XGate
+from quafu.elements.matrices.mat_utils import reorder_matrix
+
+__all__ = ['PermutationGate']
+
+
+class PermutationGate(FixedGate, MultiQubitGate):
+    """Reversible classical gate mapping basis state |x> to |table[x]>.
+
+    Bit j of x, counted from the most significant, is the state of qubit pos[j].
+    """
+    name = "Permutation"
+
+    def __init__(self, table, pos: List[int]):
+        table = np.asarray(table, dtype=np.int64).ravel()
+        if len(table) != 2 ** len(pos):
+            raise ValueError(f"Permutation of {len(pos)} qubits needs a table of size {2 ** len(pos)}")
+        if not np.array_equal(np.sort(table), np.arange(len(table))):
+            raise ValueError("Permutation table is not a bijection")
+        super().__init__(list(pos))
+        self.table = table
+        self.symbol = "perm"
+
+    @property
+    def matrix(self):
+        return reorder_matrix(self._pos_matrix(), self.pos)
+
+    def _pos_matrix(self):
+        dim = len(self.table)
+        mat = np.zeros((dim, dim), dtype=complex)
+        mat[self.table, np.arange(dim)] = 1.
+        return mat
+
+    def get_targ_matrix(self, reverse_order=False):
+        mat = self._pos_matrix()
+        if reverse_order and len(self.pos) > 1:
+            qnum = len(self.pos)
+            order = np.array(range(qnum)[::-1])
+            order = np.concatenate([order, order + qnum])
+            mat = np.transpose(mat.reshape([2] * 2 * qnum), order).reshape(mat.shape)
+        return mat
+
+    @property
+    def named_pos(self) -> Dict:
+        return {'pos': self.pos}
+
+    def decompose(self) -> List[QuantumGate]:
+        """Equivalent sequence of X, CX, CCX and MCX gates.
+
+        Each cycle of the table is split into transpositions, and the transposition of two basis
+        states is a cascade of multi-controlled X flipping one bit at a time along a Gray path,
+        controls on 0 being conjugated by X.
+        """
+        gates = []
+        seen = np.zeros(len(self.table), dtype=bool)
+        for start in range(len(self.table)):
+            cycle = []
+            x = start
+            while not seen[x]:
+                seen[x] = True
+                cycle.append(x)
+                x = int(self.table[x])
+            for x in cycle[1:]:
+                self._transposition(cycle[0], x, gates)
+        return gates
+
+    def _transposition(self, a: int, b: int, gates: List[QuantumGate]):
+        bits = [i for i in range(len(self.pos)) if (a ^ b) >> i & 1]
+        path = [a]
+        for i in bits:
+            path.append(path[-1] ^ (1 << i))
+        flips = list(zip(path[:-1], bits))
+        for state, bit in flips + flips[-2::-1]:
+            self._flip(state, bit, gates)
+
+    def _flip(self, state: int, bit: int, gates: List[QuantumGate]):
+        """Gates exchanging basis state `state` with the one differing in bit `bit`"""
+        num = len(self.pos)
+        qubit = {i: self.pos[num - 1 - i] for i in range(num)}
+        ctrls = [qubit[i] for i in range(num - 1, -1, -1) if i != bit]
+        zeros = [qubit[i] for i in range(num) if i != bit and not state >> i & 1]
+        for q in zeros:
+            _add_x(gates, q)
+        targ = qubit[bit]
+        if not ctrls:
+            gates.append(XGate(targ))
+        elif len(ctrls) == 1:
+            gates.append(CXGate(ctrls[0], targ))
+        elif len(ctrls) == 2:
+            gates.append(ToffoliGate(ctrls[0], ctrls[1], targ))
+        else:
+            gates.append(MCXGate(ctrls, targ))
+        for q in zeros:
+            _add_x(gates, q)
+
+    def to_qasm(self):
+        gates = self.decompose()
+        if not gates:
+            # identity table, a statement is still needed
+            return "barrier " + ",".join("q[%d]" % p for p in self.pos)
+        return ";\n".join(gate.to_qasm() for gate in gates)
+
+
+def _add_x(gates: List[QuantumGate], pos: int):
+    """Append X on pos, cancelling an X on pos among the X gates it follows"""
+    for i in range(len(gates) - 1, -1, -1):
+        if not isinstance(gates[i], XGate):
+            break
+        if gates[i].pos == pos:
+            del gates[i]
+            return
+    gates.append(XGate(pos))
+
+
+FixedGate.register_gate(PermutationGate)
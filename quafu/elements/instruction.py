@@ -16,7 +16,7 @@ from abc import ABC, abstractmethod
 from typing import Union, List, Dict
 
 
-__all__ = ['Instruction', 'Barrier', 'Measure', 'PosType', 'ParaType', 'Reset']
+__all__ = ['Instruction', 'Barrier', 'Measure', 'PosType', 'ParaType', 'Reset', 'Snapshot']
 
 PosType = Union[int, List[int]]
 ParaType = Union[float, int, List]
@@ -182,6 +182,41 @@ class Measure(Instruction):
         return qasm
 
 
+class Snapshot(Instruction):
+    """
+    Snapshot instruction, recording a quantity of the simulated state without disturbing it.
+
+    Attributes:
+        label: Key of the recorded value in the simulation result.
+        kind: `"statevector"`, `"probabilities"` on the qubits in pos, or `"expval"` of the
+            observable given by paulis and coeffs.
+    """
+    name = "snapshot"
+
+    def __init__(self, label: str, kind: str = "statevector", pos: List[int] = None,
+                 paulis: List[str] = None, coeffs: List[complex] = None):
+        super().__init__([] if pos is None else list(pos))
+        self.label = label
+        self.kind = kind
+        self.paulis = paulis
+        self.coeffs = coeffs
+
+    @property
+    def named_pos(self):
+        return {'pos': self.pos}
+
+    @property
+    def named_paras(self):
+        return {'label': self.label, 'kind': self.kind}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.label}, {self.kind})"
+
+    def to_qasm(self):
+        return "// snapshot %s" % self.label
+
+
 Instruction.register_ins(Barrier)
 Instruction.register_ins(Measure)
+Instruction.register_ins(Snapshot)
 
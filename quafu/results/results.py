@@ -75,15 +75,27 @@ class SimuResult(Result):
     """
     Class that save the execute simulation results returned from classical simulator.
 
+    Sampled outcomes are kept as integer arrays, the bitstrings of `count` being built on first access.
+
     Attributes:
         num (int): Numbers of measured qubits.
-        probabilities (ndarray): Calculated probabilities on each bitstring.
+        probabilities (ndarray): Calculated probabilities on each bitstring, None if only counts are sampled.
         rho (ndarray): Simulated density matrix of measured qubits.
-        count_dict: The num of cbits measured. Only support for `qfvm_circuit`.
+        unitary (ndarray): Unitary of the circuit, ordered in big endian convention.
+        outcomes (ndarray): Sampled outcomes as integers, the first measured bit being the most significant one.
+        counts (ndarray): Shots of each outcome.
+        count (dict): Shots of each sampled bitstring. Only support for `qfvm_circuit`.
+        truncation_error (float): Accumulated discarded weight of bond truncations. Only nonzero for `mps`.
+        snapshots (dict): Values recorded by snapshot instructions keyed by label.
     """
 
     def __init__(self, input, input_form, count_dict:dict=None):
-        self.num = int(np.log2(input.shape[0]))
+        if input is None:
+            self.num = len(next(iter(count_dict))) if count_dict else 0
+        else:
+            self.num = int(np.log2(input.shape[0]))
+        self.truncation_error = 0.0
+        self.snapshots = {}
         if input_form == "density_matrix":
             self.rho = np.array(input)
             self.probabilities = np.diag(input)
@@ -91,13 +103,80 @@ class SimuResult(Result):
             self.probabilities = input
         elif input_form == "state_vector":
             self.state_vector = input
+        elif input_form == "unitary":
+            self.unitary = input
         # come form c++ simulator
         # TODO: add count for py_simu
+        self.outcomes, self.counts, self._count = None, None, None
         if count_dict is not None:
-            self.count = {}
-            for key,value in count_dict.items():
-                bitstr = bin(key)[2:].zfill(self.num)
-                self.count[bitstr] = value               
+            self.count = count_dict
+
+    @property
+    def count(self):
+        if self.outcomes is None:
+            raise AttributeError("no sampled counts")
+        if self._count is None:
+            self._count = dict(zip(self.bitstrings.tolist(), self.counts.tolist()))
+        return self._count
+
+    @count.setter
+    def count(self, count_dict: dict):
+        """Shots keyed by bitstrings or by integer outcomes"""
+        keys = [int(key, 2) if isinstance(key, str) else int(key) for key in count_dict]
+        # counts of mid-circuit measurements may have more bits than the final measured qubits
+        lengths = [len(key) if isinstance(key, str) else int(key).bit_length() for key in count_dict]
+        self._width = max([self.num] + lengths)
+        self.outcomes = np.array(keys, dtype=_outcome_dtype(self._width))
+        self.counts = np.fromiter(count_dict.values(), dtype=np.int64, count=len(count_dict))
+        self._count = None
+        self._bitstrings = None
+
+    @property
+    def bitstrings(self) -> np.ndarray:
+        """Bitstrings of the sampled outcomes"""
+        if self._bitstrings is None:
+            self._bitstrings = _bitstrings(self.outcomes, self._width)
+        return self._bitstrings
+
+    @property
+    def probability_dict(self) -> dict:
+        """Nonzero probabilities keyed by bitstrings"""
+        inds = np.flatnonzero(self.probabilities > 1e-14)
+        return dict(zip(_bitstrings(inds, self.num).tolist(), self.probabilities[inds].tolist()))
+
+    def marginal(self, qubits) -> np.ndarray:
+        """
+        Probabilities of some measured bits, from the probabilities or else from the sampled counts.
+
+        Args:
+            qubits (list[int]): Positions in the measured bitstring, the first one being the most significant bit.
+        """
+        qubits = list(qubits)
+        if getattr(self, "probabilities", None) is not None:
+            from ..simulators.default_simulator import marginal_probabilities
+
+            return marginal_probabilities(self.probabilities, qubits)
+        index = np.zeros(len(self.outcomes), dtype=np.int64)
+        for q in qubits:
+            index = (index << 1) | ((self.outcomes >> (self._width - 1 - q)) & 1).astype(np.int64)
+        marginal = np.bincount(index, weights=self.counts, minlength=2 ** len(qubits))
+        return marginal / self.counts.sum()
+
+    def expectation(self, pauli_z_mask: int) -> float:
+        """
+        Expectation of a product of Z, from the probabilities or else from the sampled counts.
+
+        Args:
+            pauli_z_mask (int): Bits of the measured outcomes acted on by Z, bit 0 being the last measured bit.
+        """
+        if getattr(self, "probabilities", None) is not None:
+            positions = [self.num - 1 - b for b in range(self.num) if pauli_z_mask >> b & 1]
+            return float(np.dot(self.marginal(positions), get_baselocal(len(positions))))
+        parity = np.zeros(len(self.outcomes), dtype=np.int64)
+        for b in range(self._width):
+            if pauli_z_mask >> b & 1:
+                parity ^= ((self.outcomes >> b) & 1).astype(np.int64)
+        return float(np.dot(1 - 2 * parity, self.counts) / self.counts.sum())
 
     def plot_probabilities(
         self, full: bool = False, reverse_basis: bool = False, sort: bool = None
@@ -112,14 +191,12 @@ class SimuResult(Result):
         """
 
         probs = self.probabilities
-        inds = range(len(probs))
+        inds = np.arange(len(probs))
         if not full:
-            inds = np.where(self.probabilities > 1e-14)[0]
+            inds = np.flatnonzero(self.probabilities > 1e-14)
             probs = self.probabilities[inds]
 
-        basis = np.array([bin(i)[2:].zfill(self.num) for i in inds])
-        if reverse_basis:
-            basis = np.array([bin(i)[2:].zfill(self.num)[::-1] for i in inds])
+        basis = _bitstrings(inds, self.num, reverse_basis)
 
         if sort == "ascend":
             orders = np.argsort(probs)
@@ -140,11 +217,110 @@ class SimuResult(Result):
 
     def calculate_obs(self, pos):
         "Calculate observables Z on input position using probabilities"
-        inds = np.where(self.probabilities > 1e-14)[0]
-        probs = self.probabilities[inds]
-        basis = np.array([bin(i)[2:].zfill(self.num) for i in inds])
-        res_reduced = dict(zip(basis, probs))
-        return measure_obs(pos, res_reduced)
+        return np.dot(self.marginal(pos), get_baselocal(len(pos)))
+
+
+class ProductSimuResult(SimuResult):
+    """
+    Simulation result of a circuit made of independent qubit clusters, kept as one result per cluster.
+
+    Attributes:
+        factors (list): Pairs of the bit positions of a cluster in the measured bitstring and its SimuResult.
+        probabilities (ndarray): Tensor product of the probabilities of the clusters, built on first access.
+            None if a cluster only has sampled counts.
+        count (dict): Shots of the clusters paired at random, each cluster being sampled independently.
+    """
+
+    def __init__(self, factors, num: int, seed: int = None):
+        self.factors = factors
+        self.num = num
+        self.truncation_error = 0.0
+        self.snapshots = {}
+        self._probabilities = None
+        self.outcomes, self.counts, self._count = None, None, None
+        if all(getattr(res, "outcomes", None) is not None for _, res in factors):
+            self._pair_counts(np.random.default_rng(seed))
+
+    def _pair_counts(self, rng):
+        """Pair the shuffled shots of the clusters into outcomes of all measured bits"""
+        dtype = _outcome_dtype(self.num)
+        samples = [rng.permutation(np.repeat(res.outcomes, res.counts)) for _, res in self.factors]
+        shots = min(len(sample) for sample in samples)
+        outcomes = np.zeros(shots, dtype=dtype)
+        for (positions, res), sample in zip(self.factors, samples):
+            sample = sample[:shots].astype(dtype)
+            for j, p in enumerate(positions):
+                outcomes |= ((sample >> (res._width - 1 - j)) & 1) << (self.num - 1 - p)
+        self._width = self.num
+        self.outcomes, self.counts = np.unique(outcomes, return_counts=True)
+        self.counts = self.counts.astype(np.int64)
+        self._count = None
+        self._bitstrings = None
+
+    @property
+    def probabilities(self):
+        """Tensor product of the probabilities of the clusters, None if a cluster only has sampled counts"""
+        if self._probabilities is None:
+            if any(getattr(res, "probabilities", None) is None for _, res in self.factors):
+                return None
+            probs = np.ones(1)
+            positions = []
+            for pos, res in self.factors:
+                probs = np.kron(probs, res.probabilities)
+                positions.extend(pos)
+            probs = probs.reshape([2] * self.num).transpose(np.argsort(positions))
+            self._probabilities = probs.reshape(-1)
+        return self._probabilities
+
+    def calculate_obs(self, pos):
+        "Calculate observables Z on input position, factorized over the clusters"
+        value = 1.0
+        for positions, res in self.factors:
+            local = [positions.index(p) for p in pos if p in positions]
+            if local:
+                value *= res.calculate_obs(local)
+        return value
+
+    def marginal(self, qubits) -> np.ndarray:
+        """Probabilities of some measured bits, as the tensor product of the marginals of the clusters"""
+        qubits = list(qubits)
+        probs = np.ones(1)
+        order = []
+        for positions, res in self.factors:
+            local = [positions.index(q) for q in qubits if q in positions]
+            if local:
+                probs = np.kron(probs, res.marginal(local))
+                order.extend(positions[j] for j in local)
+        if not order:
+            return probs
+        axes = [order.index(q) for q in qubits]
+        return probs.reshape([2] * len(order)).transpose(axes).reshape(-1)
+
+    def expectation(self, pauli_z_mask: int) -> float:
+        """Expectation of a product of Z, factorized over the clusters"""
+        value = 1.0
+        for positions, res in self.factors:
+            local_mask = 0
+            for j, p in enumerate(positions):
+                if pauli_z_mask >> (self.num - 1 - p) & 1:
+                    local_mask |= 1 << (len(positions) - 1 - j)
+            if local_mask:
+                value *= res.expectation(local_mask)
+        return value
+
+
+def _outcome_dtype(num: int):
+    """Integer outcomes of num bits fit in int64 up to 62 bits, Python integers are kept beyond"""
+    return np.int64 if num < 63 else object
+
+
+def _bitstrings(outcomes: np.ndarray, num: int, reverse: bool = False) -> np.ndarray:
+    """Bitstrings of integer outcomes, the most significant bit first unless reverse"""
+    if num == 0:
+        return np.full(len(outcomes), "")
+    shifts = np.arange(num) if reverse else np.arange(num - 1, -1, -1)
+    bits = ((np.asarray(outcomes)[:, None] >> shifts) & 1).astype(np.uint8) + ord("0")
+    return np.ascontiguousarray(bits).view(f"S{num}").ravel().astype(str)
 
 
 def intersec(a, b):
@@ -0,0 +1,130 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Statevector checkpoints of circuit prefixes for incremental re-simulation"""
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from .result_cache import update_digest
+
+# Instructions dropped by qfvm before simulation
+_SKIPPED = {"barrier", "delay", "id"}
+
+
+def prefix_digests(num: int, instructions):
+    """Running digest of the qubit number and the instructions up to each instruction, updated in place"""
+    digest = hashlib.blake2b(str(num).encode(), digest_size=16)
+    for ins in instructions:
+        update_digest(digest, ins)
+        yield digest
+
+
+def simulated_instructions(qc: QuantumCircuit) -> list:
+    """Instructions of qc in the order indexed by `simulate_circuit_from`"""
+    return [ins for ins in qc.instructions if ins.name.lower() not in _SKIPPED]
+
+
+class SimulationCache:
+    """Keep statevectors of circuit prefixes to re-simulate circuits differing in a few gates.
+
+    Checkpoints are taken after every `interval` instructions and keyed by the qubit number and
+    the names, positions and parameters of all instructions before them. A circuit is resumed
+    from its longest cached prefix, so consecutive runs of an ansatz changing one parameter only
+    simulate the gates after the last checkpoint before the changed gate. Checkpoints are evicted
+    in least recently used order once they take more than `memory_budget` bytes.
+    """
+
+    def __init__(self, interval: int = None, memory_budget: int = 2**29):
+        """
+        Args:
+            interval: number of instructions between checkpoints, chosen to keep about 16
+                checkpoints of each circuit if None.
+            memory_budget: largest number of bytes taken by the checkpoints.
+        """
+        self.interval = interval
+        self.memory_budget = memory_budget
+        self.hits = 0
+        self.misses = 0
+        self._checkpoints = OrderedDict()
+        self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    def clear(self):
+        self._checkpoints.clear()
+        self._nbytes = 0
+
+    @staticmethod
+    def supports(qc: QuantumCircuit) -> bool:
+        """Whether qc is unitary up to measurements at the end and has no snapshot"""
+        measured = False
+        for ins in qc.instructions:
+            name = ins.name.lower()
+            if name == "measure":
+                measured = True
+            elif name in _SKIPPED:
+                continue
+            elif measured or name in ["reset", "cif", "snapshot"]:
+                return False
+        return True
+
+    def _prefix_keys(self, num: int, instructions, interval: int):
+        """Key of the prefix ending at instruction i for every checkpoint index i"""
+        keys = {}
+        for i, digest in enumerate(prefix_digests(num, instructions)):
+            if (i + 1) % interval == 0 and i + 1 < len(instructions):
+                keys[i] = digest.hexdigest()
+        return keys
+
+    def _store(self, key: str, state: np.ndarray):
+        if state.nbytes > self.memory_budget:
+            return
+        self._checkpoints[key] = state
+        self._nbytes += state.nbytes
+        while self._nbytes > self.memory_budget:
+            _, old = self._checkpoints.popitem(last=False)
+            self._nbytes -= old.nbytes
+
+    def statevector(self, qc: QuantumCircuit) -> np.ndarray:
+        """Final statevector of qc in little endian convention, measurements are ignored"""
+        from .qfvm import simulate_circuit_from
+
+        num = max(qc.used_qubits) + 1
+        instructions = simulated_instructions(qc)
+        interval = self.interval or max(1, len(instructions) // 16)
+        keys = self._prefix_keys(num, instructions, interval)
+
+        start, psi = 0, np.array([], dtype=complex)
+        for i in sorted(keys, reverse=True):
+            if keys[i] in self._checkpoints:
+                self._checkpoints.move_to_end(keys[i])
+                start, psi = i + 1, self._checkpoints[keys[i]]
+                break
+        if start > 0:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        save_at = [i for i in sorted(keys) if i >= start and keys[i] not in self._checkpoints]
+        psi, states = simulate_circuit_from(qc, psi, start, save_at)
+        for i, state in zip(save_at, states):
+            self._store(keys[i], state)
+        return psi
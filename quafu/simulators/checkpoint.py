@@ -0,0 +1,137 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Statevector checkpoints on disk to resume long simulations and share intermediate states"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from ..exceptions import QuafuError
+from .cache import prefix_digests, simulated_instructions
+
+_FORMAT = 1
+_META_FILE = "checkpoint.json"
+# Amplitudes copied by one writer thread at a time, 256 MB of complex128
+_CHUNK = 2**24
+
+
+def _write_state(filename: str, state: np.ndarray, workers: int = None):
+    """Write state in .npy format, chunks being copied to a memory map of the file in parallel"""
+    out = np.lib.format.open_memmap(filename, mode="w+", dtype=state.dtype, shape=state.shape)
+
+    def copy(start):
+        out[start : start + _CHUNK] = state[start : start + _CHUNK]
+
+    with ThreadPoolExecutor(workers or min(8, os.cpu_count() or 1)) as pool:
+        list(pool.map(copy, range(0, len(state), _CHUNK)))
+    out.flush()
+    del out
+
+
+def _write_json(filename: str, data: dict):
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def save_checkpoint(path: str, state: np.ndarray, index: int, digest: str, workers: int = None):
+    """Write the statevector after the first `index` simulated instructions to the directory path.
+
+    The state is written to a new file before the metadata points to it, so the previous checkpoint
+    stays valid until the new one is complete.
+
+    Args:
+        path: Checkpoint directory, created if needed.
+        state: Statevector in little endian convention.
+        index: Number of simulated instructions before state, barriers and identities excluded.
+        digest: Hex digest of these instructions given by `prefix_digests`.
+        workers: Threads writing the state, up to 8 by default.
+    """
+    os.makedirs(path, exist_ok=True)
+    meta_file = os.path.join(path, _META_FILE)
+    old = load_checkpoint_meta(path)
+    state_file = f"state-{index}.npy"
+    if old is not None and old["state"] == state_file:
+        state_file = f"state-{index}-1.npy"
+    _write_state(os.path.join(path, state_file), state, workers)
+    num = int(np.log2(len(state)))
+    _write_json(meta_file, {"format": _FORMAT, "num": num, "index": index, "digest": digest, "state": state_file})
+    if old is not None:
+        try:
+            os.remove(os.path.join(path, old["state"]))
+        except FileNotFoundError:
+            pass
+
+
+def load_checkpoint_meta(path: str) -> Optional[dict]:
+    """Metadata of the checkpoint in path, None if there is none"""
+    try:
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    if meta.get("format") != _FORMAT:
+        raise QuafuError(f"Unknown checkpoint format in {path}")
+    return meta
+
+
+def load_checkpoint(path: str) -> Optional[Tuple[np.ndarray, dict]]:
+    """Statevector of the checkpoint in path, memory mapped read only, and its metadata, None if there is none"""
+    meta = load_checkpoint_meta(path)
+    if meta is None:
+        return None
+    state = np.load(os.path.join(path, meta["state"]), mmap_mode="r")
+    if state.shape != (2 ** meta["num"],):
+        raise QuafuError(f"Checkpoint state in {path} does not have {meta['num']} qubits")
+    return state, meta
+
+
+def simulate_checkpointed(qc: QuantumCircuit, path: str, every: int = None, resume: bool = False) -> np.ndarray:
+    """Final statevector of qc in little endian convention, measurements are ignored.
+
+    The state is written to path after every `every` simulated instructions. With `resume`, the
+    simulation restarts from the checkpoint in path if there is one, which may have been written by
+    another circuit starting with the same instructions.
+    """
+    from .qfvm import simulate_circuit_from
+
+    num = max(qc.used_qubits) + 1
+    instructions = simulated_instructions(qc)
+    digests = [digest.hexdigest() for digest in prefix_digests(num, instructions)]
+    start, psi = 0, np.array([], dtype=complex)
+    if resume:
+        checkpoint = load_checkpoint(path)
+        if checkpoint is not None:
+            state, meta = checkpoint
+            index = meta["index"]
+            if meta["num"] != num or not 0 < index <= len(instructions) or digests[index - 1] != meta["digest"]:
+                raise QuafuError(f"Checkpoint in {path} was not taken on a prefix of this circuit")
+            start, psi = index, state
+
+    # one simulation over all the instructions, the live state is written at every stop without copies
+    stops = list(range(start + every, len(instructions), every)) if every else []
+
+    def write(k, state):
+        save_checkpoint(path, state, k + 1, digests[k])
+
+    psi, _ = simulate_circuit_from(qc, psi, start, [stop - 1 for stop in stops], write)
+    return psi
@@ -14,53 +14,36 @@
 
 """default circuit simulator for state vector"""
 
-from typing import Iterable, List, Union
+from typing import Iterable, List
 from quafu.circuits.quantum_circuit import QuantumCircuit
 from ..results.results import SimuResult
-from ..elements import (
-    Barrier,
-    Delay,
-    QuantumGate,
-    SingleQubitGate,
-    MultiQubitGate,
-    XYResonance,
-)
+from ..elements import QuantumGate
+from ..exceptions import QuafuError
+from .cache import SimulationCache
 import numpy as np
-from functools import reduce
-from sparse import COO, SparseArray
-from scipy.sparse import kron, eye, coo_matrix
 
 import copy
 
+# Largest number of amplitudes copied at once by ptrace, 64 MB of complex128
+_PTRACE_CHUNK = 2**22
 
-def global_op(gate: QuantumGate, global_qubits: List) -> coo_matrix:
-    """Local operators to global operators"""
-    num = len(global_qubits)
-    if isinstance(gate, SingleQubitGate):
-        local_mat = coo_matrix(gate.matrix)
-        pos = global_qubits.index(gate.pos)
-        local_mat = kron(kron(eye(2**pos), local_mat), eye(2 ** (num - pos - 1)))
-        return local_mat
-
-    elif isinstance(gate, MultiQubitGate):
-        local_mat = coo_matrix(gate.matrix)
-        pos = [global_qubits.index(p) for p in gate.pos]
-        num_left = min(pos)
-        num_right = num - max(pos) - 1
-        num_center = max(pos) - min(pos) + 1
-        center_mat = kron(local_mat, eye(2 ** (num_center - len(pos))))
-        origin_order = sorted(pos)
-        origin_order.extend([p for p in range(min(pos), max(pos) + 1) if p not in pos])
-        new_order = np.argsort(origin_order)
-        center_mat = COO.from_scipy_sparse(center_mat)
-        center_mat = permutebits(center_mat, new_order).to_scipy_sparse()
-        center_mat = kron(kron(eye(2**num_left), center_mat), eye(2**num_right))
-        return center_mat
-
-
-def permutebits(
-    mat: Union[SparseArray, np.ndarray], order: Iterable
-) -> Union[SparseArray, np.ndarray]:
+
+def apply_gate(psi: np.ndarray, gate: QuantumGate, order: List) -> np.ndarray:
+    """Apply gate to a state tensor with one axis per qubit, order giving the qubit of each axis.
+
+    The axes of the qubits of the gate are moved to the front of the result and order is updated in place,
+    so the tensor is only transposed once at the end of the simulation.
+    """
+    pos = sorted(gate.pos) if isinstance(gate.pos, Iterable) else [gate.pos]
+    k = len(pos)
+    mat = np.reshape(gate.matrix, [2] * 2 * k)
+    axes = [order.index(p) for p in pos]
+    psi = np.tensordot(mat, psi, axes=(list(range(k, 2 * k)), axes))
+    order[:] = pos + [p for p in order if p not in pos]
+    return psi
+
+
+def permutebits(mat: np.ndarray, order: Iterable) -> np.ndarray:
     """permute qubits for operators or states"""
     num = len(order)
     order = np.array(order)
@@ -72,28 +55,61 @@ def permutebits(
     return mat
 
 
-def ptrace(psi, ind_A: List, diag: bool = True) -> np.ndarray:
-    """partial trace on a state vector"""
+def _blocks(arr: np.ndarray, axes_a: List, chunk: int):
+    """Blocks of a tensor flattened from arr, as matrices with one row per index of axes_a.
+
+    The traced out axes are split into leading axes, fixed in turn, and the others, summed within a block,
+    so that a block holds at most max(chunk, 2**len(axes_a)) entries. Only one block is copied at a time.
+    """
+    num = int(np.log2(arr.shape[0]))
+    tensor = np.reshape(arr, [2] * num)
+    traced = [a for a in range(num) if a not in axes_a]
+    # fixing the most significant traced axes selects the largest contiguous blocks
+    outer = traced[: min(len(traced), max(0, num - int(np.log2(chunk))))]
+    inner = [a for a in traced if a not in outer]
+    remaining = [a for a in range(num) if a not in outer]
+    order = [remaining.index(a) for a in list(axes_a) + inner]
+    for index in np.ndindex(*[2] * len(outer)):
+        sel = [slice(None)] * num
+        for a, i in zip(outer, index):
+            sel[a] = i
+        yield np.transpose(tensor[tuple(sel)], order).reshape(2 ** len(axes_a), -1)
+
+
+def ptrace(psi, ind_A: List, diag: bool = True, little_endian: bool = False, chunk: int = _PTRACE_CHUNK) -> np.ndarray:
+    """partial trace on a state vector, accumulated over blocks of at most chunk amplitudes
+
+    Args:
+        psi: state vector.
+        ind_A: kept qubits, the first one being the most significant bit of the result.
+        diag: return the probabilities of the kept qubits instead of their reduced density matrix.
+        little_endian: whether qubit 0 is the least significant bit of psi, the most significant one otherwise.
+        chunk: largest number of amplitudes copied at once.
+    """
     num = int(np.log2(psi.shape[0]))
-    order = copy.deepcopy(ind_A)
-    order.extend([p for p in range(num) if p not in ind_A])
-
-    psi = permutebits(psi, order)
-    if diag:
-        psi = np.abs(psi) ** 2
-        psi = np.reshape(psi, [2 ** len(ind_A), 2 ** (num - len(ind_A))])
-        psi = np.sum(psi, axis=1)
-        return psi
-    else:
-        psi = np.reshape(psi, [2 ** len(ind_A), 2 ** (num - len(ind_A))])
-        rho = psi @ np.conj(np.transpose(psi))
-        return rho
+    axes_a = [num - 1 - q if little_endian else q for q in ind_A]
+    dim = 2 ** len(axes_a)
+    out = np.zeros(dim) if diag else np.zeros((dim, dim), dtype=complex)
+    for block in _blocks(psi, axes_a, chunk):
+        if diag:
+            out += np.sum(block.real**2 + block.imag**2, axis=1)
+        else:
+            out += block @ np.conj(block.T)
+    return out
+
+
+def marginal_probabilities(probs: np.ndarray, bits: List, chunk: int = _PTRACE_CHUNK) -> np.ndarray:
+    """Probabilities of some bits of a big endian distribution, summed over blocks as in `ptrace`"""
+    out = np.zeros(2 ** len(bits))
+    for block in _blocks(probs, bits, chunk):
+        out += np.sum(block, axis=1)
+    return out
 
 
 def py_simulate(
     qc: QuantumCircuit, state_ini: np.ndarray = np.array([]), output: str = "amplitudes"
 ) -> SimuResult:
-    """Simulate quantum circuit
+    """Simulate quantum circuit by contracting the matrix of each gate with the state tensor
     Args:
         qc: quantum circuit need to be simulated.
         state_ini (numpy.ndarray): Input state vector
@@ -106,20 +122,161 @@ def py_simulate(
 
     used_qubits = qc.used_qubits
     num = len(used_qubits)
-    if not state_ini:
-        psi = np.zeros(2**num)
-        psi[0] = 1
+    if len(state_ini) == 0:
+        psi = np.zeros([2] * num, dtype=complex)
+        psi[(0,) * num] = 1
+    else:
+        psi = np.reshape(np.asarray(state_ini, dtype=complex), [2] * num)
+
+    # qubits of the axes of psi, the first used qubit being the most significant bit
+    order = list(used_qubits)
+    for gate in qc.gates:
+        if isinstance(gate, QuantumGate):
+            psi = apply_gate(psi, gate, order)
+
+    return np.transpose(psi, [order.index(q) for q in used_qubits]).reshape(-1)
 
+
+def parametric_matrices(gate: QuantumGate, theta, xp=np):
+    """Matrices of a RX, RY, RZ, P, CP, RXX, RYY or RZZ gate for every angle of theta, shape (B, d, d), in the order
+    of sorted(gate.pos), None for other gates.
+
+    theta is a complex array of the array module xp, numpy or torch, whose operations keep the matrices
+    differentiable with torch.
+    """
+    name = gate.name.lower()
+    c, s, e = xp.cos(theta / 2), xp.sin(theta / 2), xp.exp(-0.5j * theta)
+    if name == "rx":
+        rows = [[c, -1j * s], [-1j * s, c]]
+    elif name == "ry":
+        rows = [[c, -s], [s, c]]
+    elif name == "rz":
+        rows = [[e, 0], [0, e.conj()]]
+    elif name == "p":
+        rows = [[1, 0], [0, xp.exp(1j * theta)]]
+    elif name == "cp":
+        rows = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, xp.exp(1j * theta)]]
+    elif name == "rxx":
+        rows = [[c, 0, 0, -1j * s], [0, c, -1j * s, 0], [0, -1j * s, c, 0], [-1j * s, 0, 0, c]]
+    elif name == "ryy":
+        rows = [[c, 0, 0, 1j * s], [0, c, -1j * s, 0], [0, -1j * s, c, 0], [1j * s, 0, 0, c]]
+    elif name == "rzz":
+        rows = [[e, 0, 0, 0], [0, e.conj(), 0, 0], [0, 0, e.conj(), 0], [0, 0, 0, e]]
     else:
-        psi = state_ini
+        return None
+    entries = [xp.full_like(theta, x) if isinstance(x, int) else x for row in rows for x in row]
+    return xp.reshape(xp.stack(entries, -1), tuple(theta.shape) + (len(rows), len(rows)))
+
+
+def batch_matrices(gate: QuantumGate, theta: np.ndarray) -> np.ndarray:
+    """Matrices of gate for every angle of theta, shape (len(theta), d, d), in the order of sorted(gate.pos)"""
+    mats = parametric_matrices(gate, np.asarray(theta, dtype=complex))
+    if mats is not None:
+        return mats
+    # other parametric gates are rebuilt row by row
+    mats = []
+    for t in theta:
+        row_gate = copy.copy(gate)
+        row_gate.update_params(float(t))
+        mats.append(row_gate.matrix)
+    return np.array(mats, dtype=complex)
+
 
+def _permute(xp):
+    return getattr(xp, "permute", xp.transpose)
+
+
+def move_to_end(psi, pos: List, order: List, xp=np):
+    """States of shape (B, rest, 2**k) with the qubits pos last, from states of shape (B, 2, ..., 2) of the array
+    module xp.
+
+    order gives the qubit of each axis after the batch axis, it is updated in place.
+    """
+    rest = [p for p in order if p not in pos]
+    psi = _permute(xp)(psi, [0] + [1 + order.index(p) for p in rest + pos])
+    order[:] = rest + pos
+    return xp.reshape(psi, (psi.shape[0], -1, 2 ** len(pos)))
+
+
+def apply_batch(psi, mat, pos: List, order: List, xp=np):
+    """Apply a matrix of shape (d, d), or one matrix per row of shape (B, d, d), to states of shape (B, 2, ..., 2).
+
+    order gives the qubit of each axis after the batch axis. The qubits of the gate become the last axes,
+    and order is updated in place.
+    """
+    flat = move_to_end(psi, pos, order, xp)
+    return xp.reshape(flat @ xp.swapaxes(mat, -1, -2), psi.shape)
+
+
+def batch_output(psi, order: List, measured: List, output: str, xp=np):
+    """Rows of statevectors in little endian convention, or of probabilities of the measured qubits in order, from
+    states of shape (B, 2, ..., 2) whose axes after the batch axis hold the qubits of order"""
+    permute = _permute(xp)
+    num = len(order)
+    if output == "state_vector":
+        # the last qubit on the first axis gives little endian indices
+        return xp.reshape(permute(psi, [0] + [1 + order.index(q) for q in range(num)[::-1]]), (psi.shape[0], -1))
+    rest = [q for q in range(num) if q not in measured]
+    probs = permute(xp.abs(psi) ** 2, [0] + [1 + order.index(q) for q in measured + rest])
+    return xp.reshape(probs, (psi.shape[0], 2 ** len(measured), -1)).sum(-1)
+
+
+def z_expectations(psi, qubits: List[int], xp=np):
+    """Expectations of Z on each of qubits for states of shape (B, 2**n) in little endian convention.
+
+    Qubits beyond the states are in |0>, with expectation 1. psi is an array of the module xp, numpy or torch.
+    """
+    num = int(np.log2(psi.shape[-1]))
+    probs = xp.abs(psi) ** 2
+    values = []
+    for q in qubits:
+        if q >= num:
+            values.append(xp.ones_like(probs[:, 0]))
+            continue
+        marginal = xp.reshape(probs, (-1, 2 ** (num - 1 - q), 2, 2**q)).sum((1, 3))
+        values.append(marginal[:, 0] - marginal[:, 1])
+    return xp.stack(values, -1)
+
+
+def simulate_batch(qc: QuantumCircuit, params: np.ndarray, output: str = "probabilities") -> np.ndarray:
+    """Simulate copies of a circuit differing in the parameters of its parameterized gates, without the C++ extension.
+
+    The states of all copies are kept in one array of shape (B, 2, ..., 2). Gates without parameters are applied to
+    the whole batch at once, and RX, RY, RZ, P, CP, RXX, RYY and RZZ gates with one matrix per copy built from the
+    column of their angles.
+
+    Args:
+        qc: Template circuit, measured at the end only. The parameters of its `parameterized_gates` are ignored.
+        params: Array of shape (B, P), row b giving the parameters of the P parameterized gates of copy b.
+        output: `"probabilities"` or `"state_vector"`, with the conventions of `simulate_many`.
+
+    Returns:
+        Probabilities of the measured qubits, or the statevectors in little endian convention, one row per copy.
+    """
+    if output not in ["probabilities", "state_vector"]:
+        raise ValueError("simulate_batch only support output 'probabilities' or 'state_vector'")
+    if not SimulationCache.supports(qc):
+        raise QuafuError("simulate_batch only supports circuits with measurements at the end")
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    columns = {id(gate): j for j, gate in enumerate(qc.parameterized_gates)}
+    if params.ndim != 2 or params.shape[1] != len(columns):
+        raise ValueError(f"params must have shape (batch, {len(columns)})")
+
+    num = max(qc.used_qubits) + 1
+    batch = params.shape[0]
+    psi = np.zeros((batch,) + (2,) * num, dtype=complex)
+    psi[(slice(None),) + (0,) * num] = 1
+    order = list(range(num))
     for gate in qc.gates:
-        if not (
-            (isinstance(gate, Delay))
-            or (isinstance(gate, Barrier))
-            or isinstance(gate, XYResonance)
-        ):
-            op = global_op(gate, used_qubits)
-            psi = op @ psi
+        if not isinstance(gate, QuantumGate) or gate.name.lower() == "id":
+            continue
+        pos = sorted(gate.pos) if isinstance(gate.pos, Iterable) else [gate.pos]
+        if id(gate) in columns:
+            mat = batch_matrices(gate, params[:, columns[id(gate)]])
+        else:
+            mat = gate.matrix
+        psi = apply_batch(psi, mat, pos, order)
 
-    return psi
+    measures = qc.measures
+    measured = sorted(measures, key=lambda q: measures[q]) if measures else list(range(num))
+    return batch_output(psi, order, measured, output)
@@ -0,0 +1,179 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Schrödinger-Feynman simulation of a few amplitudes of wide circuits"""
+
+import copy
+from typing import Iterable, List, Union
+
+import numpy as np
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from ..elements import QuantumGate
+from ..exceptions import QuafuError
+from .cache import SimulationCache
+
+# Largest number of paths, each gate across the cut multiplies them by its Schmidt rank (2 for CZ, 4 for SWAP)
+_MAX_PATHS = 2**24
+
+
+def _schmidt_terms(gate: QuantumGate, part: set, atol: float = 1e-12):
+    """Operator Schmidt decomposition of gate = sum_j A_j (x) B_j across part and the other qubits.
+
+    Returns the qubits of the gate in part and out of it, both sorted, and the list of (A_j, B_j),
+    matrices in big endian order of their qubits.
+    """
+    pos = sorted(gate.pos)
+    k = len(pos)
+    in_a = [i for i, q in enumerate(pos) if q in part]
+    in_b = [i for i, q in enumerate(pos) if q not in part]
+    tensor = np.asarray(gate.matrix, dtype=complex).reshape([2] * 2 * k)
+    axes = in_a + [k + i for i in in_a] + in_b + [k + i for i in in_b]
+    ka, kb = len(in_a), len(in_b)
+    mat = np.transpose(tensor, axes).reshape(4**ka, 4**kb)
+    u, s, vh = np.linalg.svd(mat)
+    terms = [
+        ((u[:, j] * s[j]).reshape(2**ka, 2**ka), vh[j].reshape(2**kb, 2**kb))
+        for j in range(len(s))
+        if s[j] > atol
+    ]
+    return [pos[i] for i in in_a], [pos[i] for i in in_b], terms
+
+
+def _apply_matrix(psi: np.ndarray, mat: np.ndarray, qubits: List[int], num: int) -> np.ndarray:
+    """Apply a matrix in big endian order of qubits to a statevector in little endian order"""
+    k = len(qubits)
+    axes = [num - 1 - q for q in qubits]
+    out = np.tensordot(mat.reshape([2] * 2 * k), psi.reshape([2] * num), axes=(list(range(k, 2 * k)), axes))
+    return np.moveaxis(out, list(range(k)), axes).reshape(-1)
+
+
+class _Part:
+    """Qubits of one side of the cut, with their gates between cut gates and their Schmidt operators"""
+
+    def __init__(self, qubits: List[int]):
+        self.qubits = qubits
+        self.local = {q: i for i, q in enumerate(qubits)}
+        self.segments = [QuantumCircuit(max(len(qubits), 1))]
+        self.operators = []
+
+    def add_gate(self, gate: QuantumGate):
+        def map_pos(pos):
+            if isinstance(pos, Iterable):
+                return [self.local[p] for p in pos]
+            return self.local[pos]
+
+        gate_ = copy.copy(gate)
+        for key, val in gate.named_pos.items():
+            setattr(gate_, key, map_pos(val))
+        gate_.pos = map_pos(gate.pos)
+        self.segments[-1].add_ins(gate_)
+
+    def add_cut(self, qubits: List[int], matrices: List[np.ndarray]):
+        self.operators.append(([self.local[q] for q in qubits], matrices))
+        self.segments.append(QuantumCircuit(max(len(self.qubits), 1)))
+
+    def path_amplitudes(self, indices: np.ndarray) -> np.ndarray:
+        """Amplitudes at indices of the final state of every path, paths in lexicographic order of the branches"""
+        from .qfvm import simulate_circuit
+
+        num = len(self.qubits)
+        results = []
+
+        def run(segment, psi):
+            if not segment.gates:
+                return psi
+            return simulate_circuit(segment, psi, 1, 0)[1]
+
+        def walk(k, psi):
+            # the prefix up to segment k is simulated once for all the paths sharing it
+            psi = run(self.segments[k], psi)
+            if k == len(self.operators):
+                results.append(psi[indices])
+                return
+            qubits, matrices = self.operators[k]
+            for mat in matrices:
+                walk(k + 1, _apply_matrix(psi, mat, qubits, num))
+
+        psi = np.zeros(2**num, dtype=complex)
+        psi[0] = 1.0
+        walk(0, psi)
+        return np.array(results)
+
+
+def simulate_amplitudes(
+    qc: QuantumCircuit,
+    bitstrings: List[Union[str, int]],
+    qubits: List[int] = None,
+) -> np.ndarray:
+    """Amplitudes of a few basis states at the end of a circuit, without its full statevector.
+
+    The qubits are cut in two parts and every gate acting on both is written as a sum of products
+    of operators on each part. Each part is simulated with `qfvm_circ` once per path through these
+    sums, paths sharing a prefix sharing its simulation, and the amplitude is the sum over paths of
+    the product of the amplitudes of the parts. Memory holds a few states of 2^(n/2) amplitudes while
+    the time grows with the number of paths, about 2 to 4 per gate across the cut.
+
+    Args:
+        qc: Circuit of gates, measurements at the end are ignored.
+        bitstrings: Basis states over the `qc.num` qubits, qubit 0 first as the bitstrings of `simulate`,
+            or their indices in big endian order.
+        qubits: Qubits of the first part, the first half of the qubits by default.
+
+    Returns:
+        Complex amplitudes of the bitstrings.
+    """
+    if not SimulationCache.supports(qc):
+        raise QuafuError("simulate_amplitudes only supports circuits with measurements at the end")
+    num = qc.num
+    part_a = sorted(range(num // 2) if qubits is None else qubits)
+    part_b = [q for q in range(num) if q not in part_a]
+    parts = [_Part(part_a), _Part(part_b)]
+    members = set(part_a)
+
+    paths = 1
+    for ins in qc.instructions:
+        if not isinstance(ins, QuantumGate):
+            continue
+        pos = ins.pos if isinstance(ins.pos, Iterable) else [ins.pos]
+        sides = {q in members for q in pos}
+        if len(sides) == 1:
+            parts[0 if True in sides else 1].add_gate(ins)
+            continue
+        qubits_a, qubits_b, terms = _schmidt_terms(ins, members)
+        parts[0].add_cut(qubits_a, [a for a, _ in terms])
+        parts[1].add_cut(qubits_b, [b for _, b in terms])
+        paths *= len(terms)
+        if paths > _MAX_PATHS:
+            raise QuafuError(f"More than {_MAX_PATHS} paths across the cut, choose other qubits")
+
+    bits = np.zeros((len(bitstrings), num), dtype=np.int64)
+    for i, b in enumerate(bitstrings):
+        if isinstance(b, str):
+            if len(b) != num:
+                raise ValueError(f"Bitstring {b} does not have {num} bits")
+            bits[i] = [int(c) for c in b]
+        else:
+            bits[i] = [(int(b) >> (num - 1 - q)) & 1 for q in range(num)]
+
+    values = []
+    for part in parts:
+        if not part.qubits:
+            continue
+        # index of each bitstring in the little endian state of the part
+        indices = sum(bits[:, q] << i for i, q in enumerate(part.qubits))
+        values.append(part.path_amplitudes(indices))
+    if len(values) == 1:
+        return values[0][0]
+    return np.einsum("pi,pi->i", values[0], values[1])
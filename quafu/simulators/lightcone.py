@@ -0,0 +1,59 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Drop the gates that cannot affect some qubits at the end of a circuit"""
+
+from typing import Iterable, List, Tuple
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from ..elements import QuantumGate
+from .partition import split_circuit
+
+
+def backward_light_cone(qc: QuantumCircuit, qubits: List[int]) -> Tuple[List[int], List[QuantumGate]]:
+    """Qubits and gates of qc in the backward light cone of qubits.
+
+    The circuit is walked from the end, keeping the gates that touch a qubit already in the cone
+    and adding their qubits to it.
+
+    Args:
+        qc: Circuit of gates with measurements at the end.
+        qubits: Qubits whose final state is needed.
+
+    Returns:
+        The sorted qubits of the cone and its gates in circuit order.
+    """
+    cone = set(qubits)
+    gates = []
+    for ins in reversed(qc.instructions):
+        if not isinstance(ins, QuantumGate):
+            continue
+        pos = ins.pos if isinstance(ins.pos, Iterable) else [ins.pos]
+        if cone.intersection(pos):
+            cone.update(pos)
+            gates.append(ins)
+    return sorted(cone), gates[::-1]
+
+
+def light_cone_circuit(qc: QuantumCircuit, qubits: List[int]) -> Tuple[QuantumCircuit, List[int]]:
+    """Circuit of the gates of qc in the backward light cone of qubits.
+
+    The qubits of the cone are renumbered in order from 0, and measurements of qc on them keep
+    the order of their cbits, see `backward_light_cone`.
+
+    Returns:
+        The circuit and the original qubit of each of its qubits.
+    """
+    kept, gates = backward_light_cone(qc, qubits)
+    return split_circuit(qc, kept, gates), kept
@@ -0,0 +1,257 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Matrix product state simulator for low-entanglement circuits"""
+
+from typing import Dict, List
+import numpy as np
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from ..elements import Barrier, Delay, QuantumGate, Measure
+from ..exceptions import QuafuError
+
+_PAULI = {
+    "I": np.eye(2, dtype=complex),
+    "X": np.array([[0, 1], [1, 0]], dtype=complex),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+    "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+}
+_SWAP = np.eye(4, dtype=complex)[[0, 2, 1, 3]]
+
+
+class MPSState:
+    """Matrix product state kept in mixed canonical form.
+
+    Site tensors have shape (left bond, 2, right bond). Qubits are not pinned to
+    sites: gates on distant qubits are applied after moving them together with
+    adjacent swaps, and the qubits stay where the swaps left them.
+
+    Bitstrings are ordered in big endian convention, i.e. the first character
+    is the first qubit given.
+    """
+
+    def __init__(
+        self,
+        num: int,
+        max_bond_dim: int = None,
+        truncation_threshold: float = 1e-12,
+    ):
+        """
+        Args:
+            num: number of qubits.
+            max_bond_dim: largest bond dimension kept after a gate, unlimited if None.
+            truncation_threshold: largest total weight of the discarded singular values of one bond.
+        """
+        self.num = num
+        self.max_bond_dim = max_bond_dim
+        self.truncation_threshold = truncation_threshold
+        self.truncation_error = 0.0
+        self.tensors = [np.array([1, 0], dtype=complex).reshape(1, 2, 1) for _ in range(num)]
+        self._sites = list(range(num))
+        self._qubits = list(range(num))
+        self._center = 0
+
+    @property
+    def bond_dims(self) -> List[int]:
+        """Bond dimensions between neighbouring sites"""
+        return [t.shape[2] for t in self.tensors[:-1]]
+
+    def _move_center(self, site: int):
+        while self._center < site:
+            c = self._center
+            left, _, right = self.tensors[c].shape
+            q, r = np.linalg.qr(self.tensors[c].reshape(left * 2, right))
+            self.tensors[c] = q.reshape(left, 2, -1)
+            self.tensors[c + 1] = np.tensordot(r, self.tensors[c + 1], axes=1)
+            self._center += 1
+        while self._center > site:
+            c = self._center
+            left, _, right = self.tensors[c].shape
+            q, r = np.linalg.qr(self.tensors[c].reshape(left, 2 * right).T)
+            self.tensors[c] = q.T.reshape(-1, 2, right)
+            self.tensors[c - 1] = np.tensordot(self.tensors[c - 1], r.T, axes=1)
+            self._center -= 1
+
+    def _truncate(self, s: np.ndarray) -> int:
+        weights = s**2 / np.sum(s**2)
+        keep = len(s)
+        if self.max_bond_dim is not None:
+            keep = min(keep, self.max_bond_dim)
+        tail = np.cumsum(weights[::-1])[::-1]
+        while keep > 1 and tail[keep - 1] <= self.truncation_threshold:
+            keep -= 1
+        if keep < len(s):
+            self.truncation_error += float(tail[keep])
+        return keep
+
+    def _apply_block(self, mat: np.ndarray, start: int, k: int):
+        """Apply a k-qubit matrix on the contiguous sites [start, start + k)"""
+        self._move_center(start)
+        theta = self.tensors[start]
+        for j in range(1, k):
+            theta = np.tensordot(theta, self.tensors[start + j], axes=([-1], [0]))
+        left, right = theta.shape[0], theta.shape[-1]
+        theta = np.einsum("ij,ajb->aib", mat, theta.reshape(left, 2**k, right))
+        for j in range(k - 1):
+            u, s, vh = np.linalg.svd(theta.reshape(left * 2, -1), full_matrices=False)
+            keep = self._truncate(s)
+            s = s[:keep] / np.linalg.norm(s[:keep])
+            self.tensors[start + j] = u[:, :keep].reshape(left, 2, keep)
+            theta = (s[:, None] * vh[:keep]).reshape(keep, -1, right)
+            left = keep
+        self.tensors[start + k - 1] = theta.reshape(left, 2, right)
+        self._center = start + k - 1
+
+    def _swap_sites(self, site: int):
+        """Exchange the qubits on site and site + 1"""
+        self._apply_block(_SWAP, site, 2)
+        qa, qb = self._qubits[site], self._qubits[site + 1]
+        self._qubits[site], self._qubits[site + 1] = qb, qa
+        self._sites[qa], self._sites[qb] = site + 1, site
+
+    def apply_matrix(self, mat: np.ndarray, qubits: List[int]):
+        """Apply a unitary on qubits, the first qubit is the most significant bit of the matrix"""
+        k = len(qubits)
+        if k == 1:
+            site = self._sites[qubits[0]]
+            self.tensors[site] = np.einsum("ij,ajb->aib", mat, self.tensors[site])
+            return
+
+        sites = sorted(self._sites[q] for q in qubits)
+        for j in range(1, k):
+            for site in range(sites[j] - 1, sites[0] + j - 1, -1):
+                self._swap_sites(site)
+        start = sites[0]
+        block = [self._qubits[start + j] for j in range(k)]
+        perm = [list(qubits).index(q) for q in block]
+        mat = np.reshape(mat, [2] * 2 * k)
+        mat = np.transpose(mat, perm + [p + k for p in perm]).reshape(2**k, 2**k)
+        self._apply_block(mat, start, k)
+
+    def apply_gate(self, gate: QuantumGate):
+        if isinstance(gate, (Barrier, Delay)) or gate.name.lower() == "id":
+            return
+        if not isinstance(gate, QuantumGate):
+            raise QuafuError(f"{gate.name} is not supported by mps simulator")
+        if isinstance(gate.pos, int):
+            self.apply_matrix(gate.matrix, [gate.pos])
+        else:
+            self.apply_matrix(gate.matrix, sorted(gate.pos))
+
+    def _contract(self, ops: Dict[int, np.ndarray]) -> complex:
+        """<psi| prod ops |psi> with single-site operators keyed by site"""
+        lo = min(list(ops) + [self._center])
+        hi = max(list(ops) + [self._center])
+        env = np.eye(self.tensors[lo].shape[0], dtype=complex)
+        for site in range(lo, hi + 1):
+            a = self.tensors[site]
+            b = np.einsum("ij,ajb->aib", ops[site], a) if site in ops else a
+            env = np.einsum("ac,asb,csd->bd", env, a.conj(), b)
+        return np.trace(env)
+
+    def amplitude(self, bitstring: str) -> complex:
+        """Amplitude of a computational basis state on all qubits"""
+        vec = np.ones(1, dtype=complex)
+        for site, tensor in enumerate(self.tensors):
+            vec = vec @ tensor[:, int(bitstring[self._qubits[site]]), :]
+        return complex(vec[0])
+
+    def probability(self, bitstring: str, qubits: List[int] = None) -> float:
+        """Probability to measure bitstring on qubits, all qubits if None"""
+        if qubits is None:
+            qubits = range(self.num)
+        ops = {}
+        for bit, q in zip(bitstring, qubits):
+            proj = np.zeros((2, 2), dtype=complex)
+            proj[int(bit), int(bit)] = 1
+            ops[self._sites[q]] = proj
+        return float(self._contract(ops).real)
+
+    def expectation(self, paulis: str, qubits: List[int]) -> float:
+        """Expectation of a Pauli string, paulis[i] acts on qubits[i]"""
+        ops = {self._sites[q]: _PAULI[p.upper()] for p, q in zip(paulis, qubits)}
+        if not ops:
+            return 1.0
+        return float(self._contract(ops).real)
+
+    def probabilities(self, qubits: List[int]) -> np.ndarray:
+        """Marginal distribution of qubits as a dense array of size 2**len(qubits)"""
+        sites = {self._sites[q] for q in qubits}
+        lo = min(list(sites) + [self._center])
+        hi = max(list(sites) + [self._center])
+        env = np.eye(self.tensors[lo].shape[0], dtype=complex)[None]
+        order = []
+        for site in range(lo, hi + 1):
+            a = self.tensors[site]
+            if site in sites:
+                env = np.einsum("kac,asb,csd->ksbd", env, a.conj(), a)
+                env = env.reshape(-1, a.shape[2], a.shape[2])
+                order.append(self._qubits[site])
+            else:
+                env = np.einsum("kac,asb,csd->kbd", env, a.conj(), a)
+        probs = np.einsum("kbb->k", env).real
+        perm = [order.index(q) for q in qubits]
+        return np.transpose(probs.reshape([2] * len(qubits)), perm).reshape(-1)
+
+    def sample(self, shots: int, qubits: List[int] = None, seed: int = None) -> Dict[str, int]:
+        """Sample measurement outcomes of qubits, all qubits if None"""
+        if qubits is None:
+            qubits = range(self.num)
+        rng = np.random.default_rng(seed)
+        self._move_center(0)
+        bits = np.zeros((shots, self.num), dtype=np.int8)
+        vec = np.ones((shots, 1), dtype=complex)
+        for site, tensor in enumerate(self.tensors):
+            branch = np.einsum("na,asb->nsb", vec, tensor)
+            probs = np.sum(np.abs(branch) ** 2, axis=2)
+            outcome = (rng.random(shots) * probs.sum(axis=1) >= probs[:, 0]).astype(np.int8)
+            vec = branch[np.arange(shots), outcome]
+            vec /= np.linalg.norm(vec, axis=1, keepdims=True)
+            bits[:, self._qubits[site]] = outcome
+        rows, counts = np.unique(bits[:, list(qubits)], axis=0, return_counts=True)
+        return {"".join(map(str, row)): int(c) for row, c in zip(rows, counts)}
+
+    def to_statevector(self) -> np.ndarray:
+        """Full state vector ordered in big endian convention"""
+        psi = self.tensors[0]
+        for tensor in self.tensors[1:]:
+            psi = np.tensordot(psi, tensor, axes=([-1], [0]))
+        psi = psi.reshape([2] * self.num)
+        psi = np.transpose(psi, [self._sites[q] for q in range(self.num)])
+        return psi.reshape(-1)
+
+
+def mps_simulate(
+    qc: QuantumCircuit, max_bond_dim: int = None, truncation_threshold: float = 1e-12
+) -> MPSState:
+    """Simulate quantum circuit with matrix product state
+    Args:
+        qc: quantum circuit with measurements only at the end.
+        max_bond_dim: largest bond dimension kept after a gate, unlimited if None.
+        truncation_threshold: largest total weight of the discarded singular values of one bond.
+    Returns:
+        The final MPSState.
+    """
+    measured = False
+    for ins in qc.instructions:
+        if isinstance(ins, Measure):
+            measured = True
+        elif isinstance(ins, (Barrier, Delay)):
+            continue
+        elif measured or not isinstance(ins, QuantumGate):
+            raise QuafuError("mps simulator only supports quantum gates with measurements at the end")
+
+    state = MPSState(max(qc.used_qubits) + 1, max_bond_dim, truncation_threshold)
+    for gate in qc.gates:
+        state.apply_gate(gate)
+    return state
@@ -0,0 +1,178 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Noise model for quantum trajectory simulation"""
+
+from typing import List, Union
+import numpy as np
+from ..exceptions import QuafuError
+
+
+class QuantumChannel:
+    """Base class of single-qubit error channels"""
+
+    @property
+    def kraus(self) -> List[np.ndarray]:
+        raise NotImplementedError
+
+
+class PauliChannel(QuantumChannel):
+    """Stochastic Pauli channel, applies X, Y or Z with given probabilities.
+
+    Pauli channels are sampled independently of the state and inserted as plain
+    Pauli gates, so they are much cheaper than general Kraus channels.
+    """
+
+    def __init__(self, px: float = 0.0, py: float = 0.0, pz: float = 0.0):
+        """
+        Args:
+            px: probability of an X error.
+            py: probability of a Y error.
+            pz: probability of a Z error.
+        """
+        probs = np.array([px, py, pz], dtype=float)
+        if np.any(probs < 0) or probs.sum() > 1 + 1e-12:
+            raise QuafuError("Invalid probabilities for Pauli channel")
+        self.probs = np.concatenate([[max(1 - probs.sum(), 0.0)], probs])
+
+    @property
+    def kraus(self) -> List[np.ndarray]:
+        paulis = [
+            np.eye(2),
+            np.array([[0, 1], [1, 0]]),
+            np.array([[0, -1j], [1j, 0]]),
+            np.array([[1, 0], [0, -1]]),
+        ]
+        return [np.sqrt(p) * mat.astype(complex) for p, mat in zip(self.probs, paulis)]
+
+
+class KrausChannel(QuantumChannel):
+    """General single-qubit channel given by Kraus operators"""
+
+    def __init__(self, kraus: List[np.ndarray]):
+        """
+        Args:
+            kraus: list of 2x2 Kraus operators with sum K^dagger K = I.
+        """
+        kraus = [np.asarray(k, dtype=complex) for k in kraus]
+        if any(k.shape != (2, 2) for k in kraus):
+            raise QuafuError("Only single-qubit Kraus operators are supported")
+        if not np.allclose(sum(k.conj().T @ k for k in kraus), np.eye(2)):
+            raise QuafuError("Kraus operators are not trace preserving")
+        self._kraus = kraus
+
+    @property
+    def kraus(self) -> List[np.ndarray]:
+        return self._kraus
+
+
+def bit_flip(p: float) -> PauliChannel:
+    """Bit flip channel with flip probability p"""
+    return PauliChannel(px=p)
+
+
+def phase_flip(p: float) -> PauliChannel:
+    """Phase flip channel with flip probability p"""
+    return PauliChannel(pz=p)
+
+
+def depolarizing(p: float) -> PauliChannel:
+    """Depolarizing channel, each of X, Y, Z occurs with probability p/3"""
+    return PauliChannel(p / 3, p / 3, p / 3)
+
+
+def amplitude_damping(gamma: float) -> KrausChannel:
+    """Amplitude damping channel with decay probability gamma"""
+    k0 = np.array([[1, 0], [0, np.sqrt(1 - gamma)]])
+    k1 = np.array([[0, np.sqrt(gamma)], [0, 0]])
+    return KrausChannel([k0, k1])
+
+
+def phase_damping(lam: float) -> KrausChannel:
+    """Phase damping channel with damping parameter lam"""
+    k0 = np.array([[1, 0], [0, np.sqrt(1 - lam)]])
+    k1 = np.array([[0, 0], [0, np.sqrt(lam)]])
+    return KrausChannel([k0, k1])
+
+
+class NoiseModel:
+    """Gate and readout errors for noisy simulation.
+
+    For example::
+
+        noise = NoiseModel()
+        noise.add_gate_error(depolarizing(0.01), gates=["cx"])
+        noise.add_readout_error(0.02, 0.05)
+        res = simulate(qc, noise_model=noise, shots=1000)
+    """
+
+    def __init__(self):
+        self._gate_errors = []
+        self._readout_errors = []
+
+    def add_gate_error(
+        self,
+        channel: QuantumChannel,
+        gates: Union[str, List[str]] = None,
+        qubits: List[int] = None,
+    ) -> "NoiseModel":
+        """Apply a channel on every qubit a gate acts on, right after the gate.
+
+        Args:
+            channel: single-qubit error channel.
+            gates: gate names the error is attached to, all gates if None.
+            qubits: qubits the error is attached to, all qubits if None.
+        """
+        if not isinstance(channel, QuantumChannel):
+            raise QuafuError("channel must be a QuantumChannel")
+        if gates is None:
+            gates = [""]
+        elif isinstance(gates, str):
+            gates = [gates]
+        qubits = [] if qubits is None else list(qubits)
+        for gate in gates:
+            self._gate_errors.append((gate.lower(), qubits, channel))
+        return self
+
+    def add_readout_error(
+        self, p01: float, p10: float, qubits: List[int] = None
+    ) -> "NoiseModel":
+        """Flip measured bits with given probabilities.
+
+        Args:
+            p01: probability to read 1 when the qubit is in 0.
+            p10: probability to read 0 when the qubit is in 1.
+            qubits: qubits with this readout error, all qubits if None.
+        """
+        if qubits is None:
+            qubits = [-1]
+        for q in qubits:
+            self._readout_errors.append((q, float(p01), float(p10)))
+        return self
+
+    @property
+    def gate_errors(self):
+        """Gate errors as (gate, qubits, pauli_probs, kraus) for the C++ simulator"""
+        res = []
+        for gate, qubits, channel in self._gate_errors:
+            if isinstance(channel, PauliChannel):
+                res.append((gate, qubits, channel.probs.tolist(), []))
+            else:
+                res.append((gate, qubits, [], channel.kraus))
+        return res
+
+    @property
+    def readout_errors(self):
+        """Readout errors as (qubit, p01, p10), qubit -1 means all qubits"""
+        return self._readout_errors
@@ -0,0 +1,80 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Split circuits into clusters of qubits that never interact"""
+
+import copy
+from typing import Iterable, List
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from ..elements import QuantumGate
+
+
+def qubit_components(qc: QuantumCircuit) -> List[List[int]]:
+    """Connected components of the qubits coupled by multi-qubit gates, sorted by their smallest qubit.
+
+    Every qubit below the largest used one belongs to a component, idle qubits being alone.
+    """
+    num = max(qc.used_qubits) + 1
+    parent = list(range(num))
+
+    def find(q):
+        while parent[q] != q:
+            parent[q] = parent[parent[q]]
+            q = parent[q]
+        return q
+
+    for ins in qc.instructions:
+        if not isinstance(ins, QuantumGate) or not isinstance(ins.pos, Iterable):
+            continue
+        roots = [find(q) for q in ins.pos]
+        for r in roots[1:]:
+            parent[r] = roots[0]
+
+    components = {}
+    for q in range(num):
+        components.setdefault(find(q), []).append(q)
+    return sorted(components.values())
+
+
+def split_circuit(qc: QuantumCircuit, qubits: List[int], gates: List[QuantumGate] = None) -> QuantumCircuit:
+    """Circuit of the instructions of qc on qubits, renumbered in order from 0.
+
+    Measured qubits keep the order of their cbits. The qubits must not interact with the others.
+    Only gates are kept if given, in their order.
+    """
+    local = {q: i for i, q in enumerate(qubits)}
+
+    def map_pos(pos):
+        if isinstance(pos, Iterable):
+            return [local[p] for p in pos]
+        return local[pos]
+
+    measures = {q: c for q, c in qc.measures.items() if q in local}
+    cbits = {c: i for i, c in enumerate(sorted(measures.values()))}
+    sub = QuantumCircuit(len(qubits), max(len(cbits), 1))
+    for ins in qc.instructions if gates is None else gates:
+        if not isinstance(ins, QuantumGate):
+            continue
+        pos = ins.pos if isinstance(ins.pos, Iterable) else [ins.pos]
+        if pos[0] not in local:
+            continue
+        ins_ = copy.copy(ins)
+        for key, val in ins.named_pos.items():
+            setattr(ins_, key, map_pos(val))
+        ins_.pos = map_pos(ins.pos)
+        sub.add_ins(ins_)
+    if measures:
+        sub.measure([local[q] for q in measures], [cbits[c] for c in measures.values()])
+    return sub
@@ -0,0 +1,171 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide cache of simulation results keyed by circuit fingerprints"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import numpy as np
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from ..elements import QuantumGate
+from ..results.results import SimuResult
+
+# Parameters equal up to this many decimals give the same fingerprint
+_DECIMALS = 12
+
+
+def _paras_bytes(paras, decimals: int) -> bytes:
+    try:
+        values = np.round(np.asarray(paras, dtype=float), decimals) + 0.0
+    except (TypeError, ValueError):
+        return repr(paras).encode()
+    return values.tobytes()
+
+
+def update_digest(digest, ins, decimals: int = _DECIMALS):
+    """Update digest with the name, position and parameters of an instruction.
+
+    Registered gates are known by their parameters, since the matrices of controlled gates are not
+    rebuilt when their parameters are updated. Other gates, such as oracles, are known by their matrices.
+    """
+    name = ins.name.lower()
+    digest.update(repr((name, ins.pos)).encode())
+    if name == "cif":
+        digest.update(repr((ins.cbits, ins.condition)).encode())
+        for sub in ins.instructions or []:
+            update_digest(digest, sub, decimals)
+    elif hasattr(ins, "table"):
+        digest.update(np.asarray(ins.table).tobytes())
+    elif isinstance(ins, QuantumGate) and QuantumGate.gate_classes.get(name) is not type(ins):
+        digest.update(np.round(np.asarray(ins.matrix, dtype=complex), decimals).tobytes())
+    elif ins.paras is not None:
+        digest.update(_paras_bytes(ins.paras, decimals))
+
+
+def circuit_fingerprint(qc: QuantumCircuit, psi: np.ndarray = None, decimals: int = _DECIMALS) -> str:
+    """Canonical hex digest of a circuit and its input state.
+
+    It covers the qubit number, the names and positions of the instructions with their parameters
+    rounded to `decimals`, the measurements and the amplitudes of psi, so circuits built separately
+    from the same gates share a fingerprint.
+    """
+    digest = hashlib.blake2b(repr((qc.num, sorted(qc.measures.items()))).encode(), digest_size=16)
+    for ins in qc.instructions:
+        update_digest(digest, ins, decimals)
+    if psi is not None and len(psi) > 0:
+        digest.update(b"psi")
+        digest.update(np.ascontiguousarray(psi, dtype=complex).tobytes())
+    return digest.hexdigest()
+
+
+def _nbytes(value) -> int:
+    """Bytes of the arrays held by a result, nested results and containers included"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return 64 * len(value) + sum(_nbytes(v) for v in value.values())
+    if hasattr(value, "__dict__"):
+        return sum(_nbytes(v) for v in vars(value).values())
+    return 0
+
+
+class ResultCache:
+    """Keep simulation results of identical calls, evicted in least recently used order.
+
+    Results are keyed by a circuit fingerprint and the simulation options. Only deterministic
+    results should be stored, sampled counts would otherwise be repeated. Results are copied with
+    their arrays when stored and returned, so callers may modify them in place.
+    """
+
+    def __init__(self, memory_budget: int = 2**28):
+        """
+        Args:
+            memory_budget: largest number of bytes taken by the arrays of the results.
+        """
+        self.memory_budget = memory_budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+        self._sizes = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+    def stats(self) -> dict:
+        """Hits, misses, evictions, entries and bytes of the cache"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "nbytes": self.nbytes,
+        }
+
+    def get(self, key: Hashable) -> Optional[SimuResult]:
+        """Copy of the result stored for key, None if there is none"""
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(result)
+
+    def put(self, key: Hashable, result: SimuResult, max_nbytes: int = None):
+        """Store a copy of result for key, unless its arrays take more than max_nbytes or the whole budget"""
+        size = _nbytes(result)
+        limit = self.memory_budget if max_nbytes is None else min(max_nbytes, self.memory_budget)
+        if size > limit:
+            return
+        result = copy.deepcopy(result)
+        with self._lock:
+            if key in self._results:
+                self._nbytes -= self._sizes[key]
+            self._results[key] = result
+            self._results.move_to_end(key)
+            self._sizes[key] = size
+            self._nbytes += size
+            while self._nbytes > self.memory_budget:
+                old, _ = self._results.popitem(last=False)
+                self._nbytes -= self._sizes.pop(old)
+                self.evictions += 1
+
+
+_RESULT_CACHE = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    """The process-wide cache used by `simulate`"""
+    return _RESULT_CACHE
@@ -14,13 +14,158 @@
 
 """simulator for quantum circuit and qasm"""
 
-from typing import Union
-from .default_simulator import py_simulate, ptrace, permutebits
+from typing import List, Union
+from .default_simulator import py_simulate, ptrace, simulate_batch
+from .noise import NoiseModel
+from .mps import mps_simulate
+from .cache import SimulationCache
+from .checkpoint import simulate_checkpointed
+from .result_cache import ResultCache, circuit_fingerprint, get_result_cache
+from .feynman import simulate_amplitudes
+from .lightcone import backward_light_cone
+from .partition import qubit_components, split_circuit
 from quafu import QuantumCircuit
-from ..results.results import SimuResult
+from ..elements import QuantumGate
+from ..results.results import ProductSimuResult, SimuResult
 import numpy as np
 from ..exceptions import QuafuError
 
+_CLIFFORD_GATES = {"x", "y", "z", "h", "s", "sdg", "cx", "cnot", "cy", "cz", "swap", "id"}
+_NON_UNITARY = {"barrier", "delay", "measure", "reset"}
+# Largest number of measured qubits whose probabilities are returned by the stabilizer simulator
+_MAX_CLIFFORD_PROB_QUBITS = 24
+# The sparse simulator drops amplitudes with squared norm below _SPARSE_TOL and moves to
+# the dense one once more than _SPARSE_FILL of the basis states are occupied
+_SPARSE_TOL = 1e-24
+_SPARSE_FILL = 1 / 16
+# Widest circuit simulated by the dense statevector, wider circuits use the sparse simulator
+_MAX_DENSE_QUBITS = 30
+# Largest intermediate tensor when contracting dense probabilities from an MPS
+_MAX_MPS_PROB_SIZE = 2**24
+# simulate_many runs one circuit per thread up to this width, wider circuits use parallel kernels
+_MAX_BATCH_PARALLEL_QUBITS = 20
+# Results are stored in the result cache by default only if they take at most this fraction of its budget
+_AUTO_STORE_FRACTION = 16
+
+
+def is_clifford(instructions) -> bool:
+    """Whether all instructions, including those in `cif` blocks, are Clifford gates or non-unitary operations"""
+    for ins in instructions:
+        name = ins.name.lower()
+        if name == "cif":
+            if not is_clifford(ins.instructions):
+                return False
+        elif name not in _CLIFFORD_GATES and name not in _NON_UNITARY:
+            return False
+    return True
+
+
+def _sample_counts(psi: np.ndarray, qubits, shots: int, seed: int = None) -> dict:
+    """Sample outcomes of qubits from a little endian statevector, the first qubit is the most significant bit"""
+    num = int(np.log2(len(psi)))
+    axes = [num - 1 - q for q in qubits]
+    probs = np.abs(psi.reshape([2] * num)) ** 2
+    probs = np.transpose(probs, axes + [a for a in range(num) if a not in axes])
+    probs = probs.reshape(2 ** len(qubits), -1).sum(axis=1)
+    counts = np.random.default_rng(seed).multinomial(shots, probs / probs.sum())
+    return {i: int(c) for i, c in enumerate(counts) if c > 0}
+
+
+def _simulate_components(qc: QuantumCircuit, shots: int, seed: int = None, **kwargs):
+    """Simulate the clusters of interacting qubits of qc that hold measured qubits one by one.
+
+    Returns None if qc is a single cluster of all its qubits.
+    """
+    num = max(qc.used_qubits) + 1
+    measures = qc.measures
+    measured = sorted(measures, key=lambda q: measures[q]) if measures else list(range(num))
+    order = {q: i for i, q in enumerate(measured)}
+    components = [comp for comp in qubit_components(qc) if any(q in order for q in comp)]
+    if len(components) == 1 and len(components[0]) == num:
+        return None
+    rng = np.random.default_rng(seed)
+    factors = []
+    for comp in components:
+        positions = sorted(order[q] for q in comp if q in order)
+        sub = split_circuit(qc, comp)
+        if sub.gates:
+            res = simulate(sub, shots=shots, seed=int(rng.integers(2**63)), partition=False, **kwargs)
+        else:
+            # idle qubits stay in |0>
+            probabilities = np.zeros(2 ** len(positions))
+            probabilities[0] = 1.0
+            res = SimuResult(probabilities, "probabilities", {"0" * len(positions): shots} if measures else {})
+        factors.append((positions, res))
+    return ProductSimuResult(factors, len(measured), int(rng.integers(2**63)))
+
+
+def equivalent(
+    qc: QuantumCircuit,
+    reference: Union[QuantumCircuit, np.ndarray],
+    up_to_global_phase: bool = True,
+    atol: float = 1e-8,
+) -> bool:
+    """Check that a circuit implements the same unitary as a reference without building its matrix.
+
+    The columns of the unitary are computed one statevector at a time by qfvm. A reference circuit
+    is undone gate by gate on each column, so no matrix of size 4^n is stored at all.
+
+    Args:
+        qc: quantum circuit with measurements only at the end.
+        reference: quantum circuit, or unitary matrix ordered in big endian convention.
+        up_to_global_phase: Whether unitaries differing by a global phase are equivalent.
+        atol: Largest deviation of a matrix element.
+    """
+    from .qfvm import unitary_equivalent, unitary_equivalent_matrix
+
+    num = max(qc.used_qubits) + 1
+    if isinstance(reference, QuantumCircuit):
+        num = max(num, max(reference.used_qubits) + 1)
+        return unitary_equivalent(qc, reference, num, atol, up_to_global_phase)
+    reference = np.asarray(reference, dtype=complex)
+    ref_num = int(np.log2(reference.shape[0]))
+    if ref_num < num:
+        raise QuafuError("Reference matrix acts on fewer qubits than the circuit")
+    return unitary_equivalent_matrix(qc, reference, ref_num, atol, up_to_global_phase)
+
+
+def simulate_many(
+    circuits: List[QuantumCircuit],
+    shots: int = 100,
+    output: str = "probabilities",
+    seed: int = None,
+    stack: bool = False,
+) -> Union[List[SimuResult], np.ndarray]:
+    """Simulate independent circuits with `qfvm_circ` in one call.
+
+    All circuits are converted first and then run in parallel, one circuit per thread when
+    none is wider than 20 qubits. Results are the same as those of `simulate` on each circuit.
+
+    Args:
+        circuits: quantum circuits, which may differ in structure and width.
+        shots: The shots of each circuit.
+        output: `"probabilities"` or `"state_vector"`, with the conventions of `simulate`.
+        seed: Seed of the measurement sampling.
+        stack: Return the probabilities or statevectors stacked into one array instead of
+            a list of SimuResult. All of them must have the same size.
+    """
+    if output not in ["probabilities", "state_vector"]:
+        raise ValueError("simulate_many only support output 'probabilities' or 'state_vector'")
+    from .qfvm import simulate_circuits
+
+    if seed is None:
+        seed = np.random.randint(2**63)
+    prob_qubits = []
+    for qc in circuits:
+        measures = qc.measures
+        prob_qubits.append(sorted(measures, key=lambda q: measures[q]))
+    results = simulate_circuits(
+        list(circuits), prob_qubits, shots, seed, output == "state_vector", _MAX_BATCH_PARALLEL_QUBITS
+    )
+    if stack:
+        return np.stack([values for _, values in results])
+    return [SimuResult(values, output, count_dict) for count_dict, values in results]
+
 
 def simulate(
     qc: Union[QuantumCircuit, str],
@@ -30,31 +175,169 @@ def simulate(
     shots: int = 100,
     use_gpu: bool = False,
     use_custatevec: bool = False,
+    noise_model: NoiseModel = None,
+    seed: int = None,
+    max_bond_dim: int = None,
+    truncation_threshold: float = 1e-12,
+    cache: SimulationCache = None,
+    fuse_reversible: int = 8,
+    real: bool = None,
+    partition: bool = True,
+    light_cone: bool = True,
+    checkpoint_every: int = None,
+    checkpoint_path: str = None,
+    resume: bool = False,
+    result_cache: bool = None,
 ) -> SimuResult:
     """Simulate quantum circuit
     Args:
         qc: quantum circuit or qasm string that need to be simulated.
         psi : Input state vector
         simulator:`"qfvm_circ"`: The high performance C++ circuit simulator with optional GPU support.
-                `"py_simu"`: Python implemented simulator by sparse matrix with low performace for large scale circuit.
-                `"qfvm_qasm"`: The high performance C++ qasm simulator with limited gate set.
+                `"py_simu"`: Python implemented simulator contracting gate matrices with the state tensor by NumPy,
+                which runs without the C++ extension.
+                `"qfvm_qasm"`: The high performance C++ qasm simulator. Flat programs of qreg, creg, standard gates,
+                measure, reset and if are parsed in C++, other programs by `QuantumCircuit.from_openqasm`.
+                `"qfvm_clifford"`: The C++ stabilizer tableau simulator for Clifford circuits, which is selected
+                automatically when `"qfvm_circ"` is asked for probabilities of a Clifford circuit without input state.
+                Probabilities are only returned for at most 24 measured qubits, otherwise only counts are sampled.
+                `"mps"`: Python implemented matrix product state simulator for low-entanglement circuits. Only
+                measurements at the end are supported. The final state is kept as `mps` of the result for amplitude,
+                probability and Pauli expectation queries.
+                `"qfvm_sparse"`: The C++ simulator keeping only nonzero amplitudes, for classical-like and arithmetic
+                circuits. It moves to the dense statevector once the state fills up, and is selected automatically
+                by `"qfvm_circ"` for circuits wider than 30 qubits.
 
         output: `"probabilities"`: Return probabilities on measured qubits, ordered in big endian convention.
                 `"density_matrix"`: Return reduced density_amtrix on measured qubits, ordered in big endian convention.
+                `"unitary"`: Return the unitary of the circuit computed by `qfvm_circ` on cpu, ordered in big endian convention. Measurements at the end are ignored.
                 `"state_vector"`: Return original full statevector. The statevector returned by `qfvm` backend is ordered in little endian convention (same as qiskit), while `py_simu` backend is orderd in big endian convention.
         shots: The shots of simulator executions. Only supported for cpu.
         use_gpu: Use the GPU version of `qfvm_circ` simulator.
         use_custatevec: Use cuStateVec-based `qfvm_circ` simulator. The argument `use_gpu` must also be True.
+        noise_model: Gate and readout errors. The circuit is run as `shots` quantum trajectories in parallel,
+                and `"probabilities"` are estimated from the sampled counts.
+        seed: Seed of the random streams of noisy trajectories, stabilizer and mps simulation.
+        max_bond_dim: Largest bond dimension kept by the `mps` simulator, unlimited if None.
+        truncation_threshold: Largest discarded weight of one bond truncation for the `mps` simulator.
+        cache: Statevector checkpoints of `qfvm_circ` on cpu. A unitary circuit without input state is resumed
+                from the longest prefix simulated before, and counts are sampled from the final state.
+        fuse_reversible: Runs of at least this many consecutive X, CX, Toffoli, MCX and SWAP gates are applied
+                by `qfvm_circ` on cpu as a single permutation of the statevector, 0 to apply them one by one.
+        real: Simulate with real amplitudes, which halves the memory of `qfvm_circ` on cpu. All gates must have
+                real matrices (RY, H, X, CX, CZ, SWAP, ...) with measurements at the end, and the `"state_vector"`
+                output is then a real array. If None, real amplitudes are used for `"probabilities"` of such
+                circuits without input state.
+        partition: Simulate the clusters of qubits that never interact separately when `qfvm_circ` is asked for
+                probabilities of a circuit measured at the end on cpu, clusters without measured qubits being
+                dropped. The result keeps one result per cluster and builds their tensor product on demand.
+        light_cone: Drop the gates that cannot affect the measured qubits and the qubits they leave idle when
+                `qfvm_circ` is asked for probabilities of a circuit measured at the end on cpu.
+        checkpoint_every: Write the statevector of `qfvm_circ` on cpu to `checkpoint_path` after every this many
+                instructions. The circuit must be unitary up to measurements at the end, without input state.
+        checkpoint_path: Directory of the checkpoint, which only keeps the latest state.
+        resume: Restart from the checkpoint in `checkpoint_path` if there is one. It may have been written by
+                another circuit starting with the same instructions.
+        result_cache: Return the result of an earlier call with the same circuit fingerprint, input state and
+                options from the process-wide `ResultCache`, and store new results there. Only noiseless circuits
+                measured at the end without sampled counts (`shots` is 0 or nothing is measured) are cached.
+                If None, the cache is used unless `cache` is given, whose statistics then count every call, and
+                only results within a sixteenth of its memory budget (16 MB by default) are stored, so large state
+                vectors are not copied and kept. Pass True to store them as well.
+                Results resumed from the checkpoints of `cache` are never stored.
+                Cached results keep up to 256 MB of arrays alive, call `get_result_cache().clear()` to release them.
 
     Returns:
         SimuResult object that contain the results."""
+    explicit = result_cache is True
+    if result_cache is None:
+        result_cache = cache is None
+    key = None
+    if (
+        result_cache
+        and isinstance(qc, QuantumCircuit)
+        and noise_model is None
+        and checkpoint_every is None
+        and not resume
+        and (shots == 0 or not qc.measures)
+        and SimulationCache.supports(qc)
+    ):
+        options = (simulator, output, shots, use_gpu, use_custatevec, seed, max_bond_dim, truncation_threshold)
+        key = (circuit_fingerprint(qc, psi),) + options + (real, partition, light_cone)
+        res = get_result_cache().get(key)
+        if res is not None:
+            return res
+    res = _simulate(
+        qc,
+        psi=psi,
+        simulator=simulator,
+        output=output,
+        shots=shots,
+        use_gpu=use_gpu,
+        use_custatevec=use_custatevec,
+        noise_model=noise_model,
+        seed=seed,
+        max_bond_dim=max_bond_dim,
+        truncation_threshold=truncation_threshold,
+        cache=cache,
+        fuse_reversible=fuse_reversible,
+        real=real,
+        partition=partition,
+        light_cone=light_cone,
+        checkpoint_every=checkpoint_every,
+        checkpoint_path=checkpoint_path,
+        resume=resume,
+    )
+    if key is not None and cache is None:
+        results = get_result_cache()
+        results.put(key, res, None if explicit else results.memory_budget // _AUTO_STORE_FRACTION)
+    return res
+
+
+def _simulate(
+    qc: Union[QuantumCircuit, str],
+    psi: np.ndarray = np.array([]),
+    simulator: str = "qfvm_circ",
+    output: str = "probabilities",
+    shots: int = 100,
+    use_gpu: bool = False,
+    use_custatevec: bool = False,
+    noise_model: NoiseModel = None,
+    seed: int = None,
+    max_bond_dim: int = None,
+    truncation_threshold: float = 1e-12,
+    cache: SimulationCache = None,
+    fuse_reversible: int = 8,
+    real: bool = None,
+    partition: bool = True,
+    light_cone: bool = True,
+    checkpoint_every: int = None,
+    checkpoint_path: str = None,
+    resume: bool = False,
+) -> SimuResult:
+    """Simulate quantum circuit without the result cache, see `simulate`"""
     qasm = ""
     if simulator == "qfvm_qasm":
         if not isinstance(qc, str):
             raise ValueError("Must input valid qasm str for qfvm_qasm simulator")
         qasm = qc
-        qc = QuantumCircuit(0)
-        qc.from_openqasm(qasm)
+        from .qfvm import QasmUnsupportedError, simulate_qasm
+
+        try:
+            # flat programs are parsed in C++, others fall back to the Python parser
+            count_dict, psi, pairs = simulate_qasm(qasm, psi, shots, fuse_reversible)
+        except QasmUnsupportedError:
+            qc = QuantumCircuit(0)
+            qc.from_openqasm(qasm)
+        else:
+            num = int(np.log2(len(psi)))
+            measured = dict(pairs)
+            measures = list(measured.keys())
+            values = np.argsort(list(measured.values()))
+            if len(measures) == 0:
+                measures = list(range(num))
+                values = list(range(num))
+            return _format_output(psi, output, measures, values, count_dict, True)
 
     # two type of measures for py_simu and qfvm_circ
     measures = []
@@ -65,8 +348,8 @@ def simulate(
         values_tmp = list(qc.measures.values())
         values = np.argsort(values_tmp)
         if len(measures) == 0:
-            measures = list(range(qc.used_qubits))
-            values = list(range(qc.used_qubits))
+            measures = list(range(len(qc.used_qubits)))
+            values = list(range(len(qc.used_qubits)))
     else:
         measures = list(qc.measures.keys())
         values_tmp = list(qc.measures.values())
@@ -76,10 +359,146 @@ def simulate(
             measures = list(range(num))
             values = list(range(num))
 
+    checkpointed = checkpoint_every is not None or resume
+    if checkpointed:
+        if checkpoint_path is None:
+            raise ValueError("checkpoint_path is needed to write or resume checkpoints")
+        if simulator != "qfvm_circ" or use_gpu or noise_model is not None or len(psi) > 0:
+            raise QuafuError("checkpoints only support noiseless `qfvm_circ` on cpu without input state")
+        if not SimulationCache.supports(qc):
+            raise QuafuError("checkpoints only support circuits with measurements at the end")
+
     count_dict = None
-    from .qfvm import simulate_circuit
+    snapshots = {}
+    has_snapshot = any(ins.name == "snapshot" for ins in qc.instructions)
     # simulate
+    if (
+        simulator == "qfvm_circ"
+        and not use_gpu
+        and noise_model is None
+        and output == "probabilities"
+        and len(psi) == 0
+        and cache is None
+        and not checkpointed
+        and SimulationCache.supports(qc)
+    ):
+        if light_cone and qc.measures:
+            kept, gates = backward_light_cone(qc, list(qc.measures))
+            if len(kept) < num or len(gates) < sum(isinstance(ins, QuantumGate) for ins in qc.instructions):
+                return _simulate(
+                    split_circuit(qc, kept, gates),
+                    shots=shots,
+                    seed=seed,
+                    fuse_reversible=fuse_reversible,
+                    real=real,
+                    partition=partition,
+                    light_cone=False,
+                )
+        if partition:
+            res = _simulate_components(qc, shots, seed, real=real, fuse_reversible=fuse_reversible)
+            if res is not None:
+                return res
+    if (
+        simulator == "qfvm_circ"
+        and not use_gpu
+        and noise_model is None
+        and output == "probabilities"
+        and len(psi) == 0
+        and not checkpointed
+        and is_clifford(qc.instructions)
+    ):
+        simulator = "qfvm_clifford"
+    if (
+        simulator == "qfvm_circ"
+        and not use_gpu
+        and noise_model is None
+        and output == "probabilities"
+        and len(psi) == 0
+        and num > _MAX_DENSE_QUBITS
+        and not has_snapshot
+        and not checkpointed
+    ):
+        simulator = "qfvm_sparse"
+    if has_snapshot and (simulator != "qfvm_circ" or use_gpu or noise_model is not None):
+        raise QuafuError("snapshot only support for noiseless `qfvm_circ` on cpu")
+    if output == "unitary":
+        if simulator != "qfvm_circ" or use_gpu or noise_model is not None:
+            raise QuafuError("unitary output only support for noiseless `qfvm_circ` on cpu")
+        from .qfvm import simulate_unitary
+
+        return SimuResult(simulate_unitary(qc, num), output)
+
+    if simulator == "qfvm_clifford":
+        if not is_clifford(qc.instructions):
+            raise QuafuError("qfvm_clifford simulator only supports Clifford circuits")
+        if output != "probabilities":
+            raise ValueError("qfvm_clifford simulator only support output 'probabilities'")
+        from .qfvm import simulate_circuit_clifford
+
+        if seed is None:
+            seed = np.random.randint(2**63)
+        prob_qubits = [measures[v] for v in values]
+        if len(prob_qubits) > _MAX_CLIFFORD_PROB_QUBITS:
+            prob_qubits = []
+        count_dict, probabilities = simulate_circuit_clifford(qc, prob_qubits, shots, seed)
+        probabilities = np.array(probabilities) if prob_qubits else None
+        return SimuResult(probabilities, output, count_dict)
+
+    if simulator == "qfvm_sparse":
+        if noise_model is not None:
+            raise QuafuError("noisy simulation only support for cpu version of qfvm")
+        if output != "probabilities":
+            raise ValueError("qfvm_sparse simulator only support output 'probabilities'")
+        from .qfvm import simulate_circuit_sparse
+
+        if seed is None:
+            seed = np.random.randint(2**63)
+        prob_qubits = [measures[v] for v in values]
+        count_dict, sparse_probs = simulate_circuit_sparse(
+            qc, prob_qubits, shots, seed, _SPARSE_TOL, _SPARSE_FILL, _MAX_DENSE_QUBITS
+        )
+        probabilities = None
+        if len(prob_qubits) <= _MAX_CLIFFORD_PROB_QUBITS:
+            probabilities = np.zeros(2 ** len(prob_qubits))
+            for key, value in sparse_probs.items():
+                probabilities[int(key, 2)] = value
+        return SimuResult(probabilities, output, count_dict)
+
+    if simulator == "mps":
+        if noise_model is not None:
+            raise QuafuError("noisy simulation only support for cpu version of qfvm")
+        if output != "probabilities":
+            raise ValueError("mps simulator only support output 'probabilities'")
+        state = mps_simulate(qc, max_bond_dim, truncation_threshold)
+        prob_qubits = [measures[v] for v in values]
+        probabilities = None
+        if 2 ** len(prob_qubits) * max(state.bond_dims + [1]) ** 2 <= _MAX_MPS_PROB_SIZE:
+            probabilities = state.probabilities(prob_qubits)
+        if qc.measures:
+            count_dict = state.sample(shots, prob_qubits, seed)
+        res = SimuResult(probabilities, output, count_dict)
+        res.truncation_error = state.truncation_error
+        res.mps = state
+        return res
+
+    if noise_model is not None:
+        if simulator == "py_simu" or use_gpu:
+            raise QuafuError("noisy simulation only support for cpu version of qfvm")
+        if output != "probabilities":
+            raise ValueError("noisy simulation only support output 'probabilities'")
+        from .qfvm import simulate_circuit_noisy
+
+        if seed is None:
+            seed = np.random.randint(2**63)
+        count_dict = simulate_circuit_noisy(qc, noise_model, shots, seed)
+        probabilities = np.zeros(2 ** len(measures))
+        for key, value in count_dict.items():
+            probabilities[key] += value / shots
+        return SimuResult(probabilities, output, count_dict)
+
     if simulator == "qfvm_circ":
+        from .qfvm import simulate_circuit, simulate_circuit_snapshots
+
         if use_gpu:
             if qc.executable_on_backend == False:
                 raise QuafuError("classical operation only support for `qfvm_qasm`")
@@ -95,32 +514,66 @@ def simulate(
                 except ImportError:
                     raise QuafuError("you are not using the GPU version of pyquafu")
                 psi = simulate_circuit_gpu(qc, psi)
+        elif has_snapshot:
+            count_dict, psi, snapshots = simulate_circuit_snapshots(qc, psi, shots)
+        elif checkpointed:
+            psi = simulate_checkpointed(qc, checkpoint_path, checkpoint_every, resume)
+            if qc.measures:
+                count_dict = _sample_counts(psi, [measures[v] for v in values], shots, seed)
+        elif real or (
+            real is None and cache is None and output == "probabilities" and len(psi) == 0
+        ):
+            if len(psi) > 0 or output not in ["probabilities", "state_vector"]:
+                raise QuafuError("real amplitudes only support output 'probabilities' or 'state_vector' without input state")
+            from .qfvm import simulate_circuit_real
+
+            if seed is None:
+                seed = np.random.randint(2**63)
+            prob_qubits = [measures[v] for v in values]
+            # circuits found complex are simulated with complex amplitudes in the same call
+            is_real, count_dict, values_real = simulate_circuit_real(
+                qc, prob_qubits, shots, seed, output == "state_vector", fuse_reversible, not real
+            )
+            if is_real:
+                return SimuResult(values_real, output, count_dict)
+            if real:
+                raise QuafuError("circuit has gates with complex matrices or non-terminal measurements")
+            psi = values_real
+        elif cache is not None and len(psi) == 0 and cache.supports(qc):
+            psi = cache.statevector(qc)
+            if qc.measures:
+                count_dict = _sample_counts(psi, [measures[v] for v in values], shots, seed)
         else:
-            count_dict, psi = simulate_circuit(qc, psi, shots)
-            
+            count_dict, psi = simulate_circuit(qc, psi, shots, fuse_reversible)
+
     elif simulator == "py_simu":
         if qc.executable_on_backend == False:
             raise QuafuError("classical operation only support for `qfvm_qasm`")
         psi = py_simulate(qc, psi)
         
     elif simulator == "qfvm_qasm":
-        psi = simulate_circuit(qc, psi, shots)
+        from .qfvm import simulate_circuit
+
+        count_dict, psi = simulate_circuit(qc, psi, shots, fuse_reversible)
         
     else:
         raise ValueError("invalid circuit")
-    
+
+    res = _format_output(psi, output, measures, values, count_dict, simulator in ["qfvm_circ", "qfvm_qasm"])
+    res.snapshots = snapshots
+    return res
+
+
+def _format_output(psi, output, measures, values, count_dict, little_endian) -> SimuResult:
+    """Result of the final statevector, reduced to the measured qubits ordered by their cbits"""
+    # measured qubits ordered by their cbits
+    kept = [measures[v] for v in values]
     if output == "density_matrix":
-        if simulator in ["qfvm_circ", "qfvm_qasm"]:
-            psi = permutebits(psi, range(num)[::-1])
-        rho = ptrace(psi, measures, diag=False)
-        rho = permutebits(rho, values)
+        rho = ptrace(psi, kept, diag=False, little_endian=little_endian)
         return SimuResult(rho, output, count_dict)
 
     elif output == "probabilities":
-        if simulator in ["qfvm_circ", "qfvm_qasm"]:
-            psi = permutebits(psi, range(num)[::-1])
-        probabilities = ptrace(psi, measures)
-        probabilities = permutebits(probabilities, values)
+        probabilities = ptrace(psi, kept, little_endian=little_endian)
         return SimuResult(probabilities, output, count_dict)
 
     elif output == "state_vector":
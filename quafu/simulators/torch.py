@@ -13,3 +13,82 @@
 # limitations under the License.
 
 """Simulate the execution of a quantum circuit using pytorch"""
+
+from typing import Iterable
+
+import numpy as np
+import torch
+
+from quafu.circuits.quantum_circuit import QuantumCircuit
+from ..elements import QuantumGate
+from ..exceptions import QuafuError
+from .cache import SimulationCache
+from .default_simulator import apply_batch, batch_output, move_to_end, parametric_matrices
+
+
+def gate_matrices(gate: QuantumGate, theta: torch.Tensor) -> torch.Tensor:
+    """Matrices of a parametric gate for every angle of theta, shape (B, d, d), in the order of sorted(gate.pos)"""
+    mats = parametric_matrices(gate, theta.to(torch.complex128), torch)
+    if mats is None:
+        raise QuafuError(f"{gate.name} gate has no differentiable matrix")
+    return mats
+
+
+def torch_simulate(qc: QuantumCircuit, params: torch.Tensor = None, output: str = "state_vector") -> torch.Tensor:
+    """Simulate quantum circuit with complex tensor operations differentiable by autograd.
+
+    Gates are applied to a state of shape (B, 2, ..., 2) as batched matrix products, parametric gates with one
+    matrix per row of params. Gradients of the output with respect to params are then given by one backward pass.
+    Tensor operations run on the CPU threads set by `torch.set_num_threads`.
+
+    Args:
+        qc: Quantum circuit measured at the end only.
+        params: Parameters of `qc.parameterized_gates`, of shape (P,) or (B, P) for a batch of B circuits.
+            The parameters of the gates are used if None.
+        output: `"state_vector"` in little endian convention, or `"probabilities"` of the measured qubits
+            ordered by their cbits, all qubits if none is measured.
+
+    Returns:
+        Tensor of shape (B, 2**n), or (2**n,) if params is None or has one dimension.
+    """
+    if output not in ["probabilities", "state_vector"]:
+        raise ValueError("torch_simulate only support output 'probabilities' or 'state_vector'")
+    if not SimulationCache.supports(qc):
+        raise QuafuError("torch_simulate only supports circuits with measurements at the end")
+    gates = qc.parameterized_gates
+    if params is None:
+        params = torch.tensor([float(g.paras) for g in gates], dtype=torch.double)
+    params = torch.as_tensor(params)
+    single = params.dim() == 1
+    if single:
+        params = params.unsqueeze(0)
+    columns = {id(gate): j for j, gate in enumerate(gates)}
+    if params.shape[1] != len(columns):
+        raise ValueError(f"params must have {len(columns)} columns")
+
+    num = max(qc.used_qubits) + 1
+    batch = params.shape[0]
+    psi = torch.zeros((batch,) + (2,) * num, dtype=torch.complex128)
+    psi[(slice(None),) + (0,) * num] = 1
+    order = list(range(num))
+    for gate in qc.gates:
+        if not isinstance(gate, QuantumGate) or gate.name.lower() == "id":
+            continue
+        if hasattr(gate, "table"):
+            # basis state x of the qubits pos goes to table[x]
+            flat = move_to_end(psi, list(gate.pos), order, torch)
+            inverse = torch.from_numpy(np.argsort(gate.table))
+            psi = flat.index_select(-1, inverse).reshape(psi.shape)
+            continue
+        pos = sorted(gate.pos) if isinstance(gate.pos, Iterable) else [gate.pos]
+        if id(gate) in columns:
+            mat = gate_matrices(gate, params[:, columns[id(gate)]])
+        else:
+            mat = torch.from_numpy(np.asarray(gate.matrix, dtype=complex))
+        psi = apply_batch(psi, mat, pos, order, torch)
+
+    measures = qc.measures
+    measured = sorted(measures, key=lambda q: measures[q]) if measures else list(range(num))
+    result = batch_output(psi, order, measured, output, torch)
+    return result[0] if single else result
+
@@ -0,0 +1,106 @@
+#pragma once
+
+#include "simulator.hpp"
+
+// Pauli string as masks, rightmost character acts on qubit 0
+struct PauliMask{
+    size_t x = 0;
+    size_t z = 0;
+    uint num_y = 0;
+
+    PauliMask(){};
+    explicit PauliMask(string const &pauli){
+        const uint len = pauli.size();
+        for (uint k = 0; k < len; k++){
+            size_t bit = 1ULL << (len - 1 - k);
+            switch (pauli[k]){
+                case 'X': x |= bit; break;
+                case 'Y': x |= bit; z |= bit; num_y++; break;
+                case 'Z': z |= bit; break;
+                default: break;
+            }
+        }
+    }
+
+    // <i|P|i ^ x>
+    complex<double> element(size_t i) const {
+        // Y = iXZ, so a Y contributes i times the Z sign taken on the flipped bit
+        static const complex<double> ipow[4] = {{1., 0.}, {0., 1.}, {-1., 0.}, {0., -1.}};
+        size_t j = i ^ x;
+        uint sign = Qfutil::popcount64(j & z) & 1;
+        return ipow[num_y & 3] * (sign ? -1. : 1.);
+    }
+};
+
+// <lambda| P |phi>
+complex<double> pauli_inner(StateVector<data_t> &lambda, StateVector<data_t> &phi, PauliMask const &pauli){
+    auto l = lambda.data();
+    auto p = phi.data();
+    double re = 0., im = 0.;
+#pragma omp parallel for reduction(+:re, im)
+    for (omp_i i = 0; i < (omp_i)phi.size(); i++){
+        complex<double> v = std::conj(l[i]) * pauli.element(i) * p[i ^ pauli.x];
+        re += v.real();
+        im += v.imag();
+    }
+    return complex<double>(re, im);
+}
+
+// <lambda| Pi |phi>, Pi projects the qubits in mask onto |1>
+complex<double> projector_inner(StateVector<data_t> &lambda, StateVector<data_t> &phi, size_t mask){
+    auto l = lambda.data();
+    auto p = phi.data();
+    double re = 0., im = 0.;
+#pragma omp parallel for reduction(+:re, im)
+    for (omp_i i = 0; i < (omp_i)phi.size(); i++){
+        if ((i & mask) != mask) continue;
+        complex<double> v = std::conj(l[i]) * p[i];
+        re += v.real();
+        im += v.imag();
+    }
+    return complex<double>(re, im);
+}
+
+void apply_inverse_op(QuantumOperator &op, StateVector<data_t> &state){
+    if (op.name() == "permutation"){
+        auto const &table = op.table();
+        vector<size_t> inverse(table.size());
+        for (size_t x = 0; x < table.size(); x++) inverse[table[x]] = x;
+        apply_permutation(op.positions(), inverse, state);
+        return;
+    }
+    QuantumOperator inv("u", op.paras(), op.positions(), op.control_num(), op.mat().adjoint());
+    apply_op(inv, state);
+}
+
+// d<H>/dtheta of a parameterized gate from the state phi right after the gate and the
+// back-propagated lambda, using dU/dtheta = -i G U.
+double generator_gradient(QuantumOperator &op, StateVector<data_t> &lambda, StateVector<data_t> &phi){
+    auto pos = op.positions();
+    auto pauli_on = [&](char p){
+        PauliMask mask;
+        for (auto q : pos){
+            size_t bit = 1ULL << q;
+            if (p != 'Z') mask.x |= bit;
+            if (p != 'X') mask.z |= bit;
+            if (p == 'Y') mask.num_y++;
+        }
+        return mask;
+    };
+    // G = P / 2 for rotations, G = -|1..1><1..1| for phase gates; gradient is 2 Im <lambda|G|phi>
+    switch (OPMAP[op.name()]){
+        case Opname::rx: case Opname::rxx:
+            return pauli_inner(lambda, phi, pauli_on('X')).imag();
+        case Opname::ry: case Opname::ryy:
+            return pauli_inner(lambda, phi, pauli_on('Y')).imag();
+        case Opname::rz: case Opname::rzz:
+            return pauli_inner(lambda, phi, pauli_on('Z')).imag();
+        case Opname::p: case Opname::cp:{
+            size_t mask = 0;
+            for (auto q : pos) mask |= 1ULL << q;
+            return -2. * projector_inner(lambda, phi, mask).imag();
+        }
+        default:
+            throw std::invalid_argument("Adjoint gradient is not supported for gate " + op.name());
+    }
+}
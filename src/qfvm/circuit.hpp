@@ -43,6 +43,15 @@ void check_operator(QuantumOperator &op){
 }
 
 
+// Quantity recorded by a snapshot instruction, paulis are ordered with the rightmost character on qubit 0
+struct SnapshotSpec{
+    string label;
+    string kind;
+    vector<pos_t> qubits;
+    vector<string> paulis;
+    vector<complex<double>> coeffs;
+};
+
 class Circuit{
     private:
         uint qubit_num_;  
@@ -52,15 +61,19 @@ class Circuit{
         // to sample count
         vector<std::pair<uint,uint>> measure_vec_;
         bool final_measure_ = true;
+        vector<SnapshotSpec> snapshots_;
 
     public:
     Circuit();
     explicit Circuit(uint qubit_num);
     explicit Circuit(vector<QuantumOperator> &ops);
     explicit Circuit(py::object const&pycircuit); 
+    Circuit(uint qubit_num, uint cbit_num, vector<QuantumOperator> &ops);
 
     void add_op(QuantumOperator &op);
     void compress_instructions();
+    // Defined in permutation.hpp
+    void fuse_reversible(const uint min_run, const uint max_qubits);
     uint qubit_num() const { return qubit_num_; }
     uint cbit_num() const { return cbit_num_; }
     uint max_targe_num() const { return max_targe_num_; }
@@ -68,6 +81,7 @@ class Circuit{
     vector<QuantumOperator> gates();
     vector<std::pair<uint,uint>> measure_vec() { return measure_vec_; }
     vector<QuantumOperator> instructions() const { return instructions_; }
+    vector<SnapshotSpec> const& snapshots() const { return snapshots_; }
     QuantumOperator from_pyops(py::object const &obj);
 };
 
@@ -101,9 +115,38 @@ void Circuit::add_op(QuantumOperator &op){
     }
 }
 
+// Circuit of operators built without Python objects, such as those of QasmReader
+Circuit::Circuit(uint qubit_num, uint cbit_num, vector<QuantumOperator> &ops)
+:
+qubit_num_(qubit_num),
+max_targe_num_(0),
+cbit_num_(cbit_num)
+{
+    bool measured = false;
+    for (auto &op : ops){
+        if (op.targe_num() > max_targe_num_)
+            max_targe_num_ = op.targe_num();
+        if (op.name() == "cif"){
+            for (auto &sub : op.instructions()){
+                if (sub.targe_num() > max_targe_num_)
+                    max_targe_num_ = sub.targe_num();
+            }
+        }
+        if(op.name() == "measure"){
+            measured = true;
+            vector<pos_t> qbits = op.qbits(), cbits = op.cbits();
+            for(uint i = 0; i < qbits.size(); i++){
+                measure_vec_.push_back(std::make_pair(qbits[i], cbits[i]));
+            }
+        }
+        else if(measured == true && op.name() != "snapshot") {final_measure_ = false; }
+        instructions_.push_back(std::move(op));
+    }
+}
+
 vector<QuantumOperator> Circuit::gates(){
     // provide gates for gpu and custate
-    std::vector<std::string> classics = {"measure", "cif", "reset"};
+    std::vector<std::string> classics = {"measure", "cif", "reset", "snapshot"};
     vector<QuantumOperator> gates;
     for(auto op : instructions_){
         if(std::find(classics.begin(), classics.end(), op.name()) == classics.end()){
@@ -124,7 +167,11 @@ QuantumOperator Circuit::from_pyops(py::object const &obj){
     RowMatrixXcd mat;
     
     name = obj.attr("name").attr("lower")().cast<string>();
-    if (!(name == "barrier" || name == "delay" || name == "id" || name == "measure" || name == "reset" || name == "cif"))
+    if (name == "permutation"){
+        auto table = obj.attr("table").cast<py::array_t<int64_t, py::array::c_style | py::array::forcecast>>();
+        return QuantumOperator(name, obj.attr("pos").cast<vector<pos_t>>(), vector<size_t>(table.data(), table.data() + table.size()));
+    }
+    if (!(name == "barrier" || name == "delay" || name == "id" || name == "measure" || name == "reset" || name == "cif" || name == "snapshot"))
     {
         if (py::isinstance<py::list>(obj.attr("pos"))){
             positions = obj.attr("pos").cast<vector<pos_t>>();
@@ -208,6 +255,18 @@ QuantumOperator Circuit::from_pyops(py::object const &obj){
         }
         return QuantumOperator(name, cbits, condition, instructions); 
 
+    }else if(name == "snapshot"){
+        SnapshotSpec spec;
+        spec.label = obj.attr("label").cast<string>();
+        spec.kind = obj.attr("kind").cast<string>();
+        spec.qubits = obj.attr("pos").cast<vector<pos_t>>();
+        if (!obj.attr("paulis").is_none()){
+            spec.paulis = obj.attr("paulis").cast<vector<string>>();
+            spec.coeffs = obj.attr("coeffs").cast<vector<complex<double>>>();
+        }
+        snapshots_.push_back(spec);
+        return QuantumOperator(name, spec.qubits, snapshots_.size() - 1);
+
     }else{
         return QuantumOperator();
     }
@@ -232,7 +291,7 @@ max_targe_num_(0)
             if (op.targe_num() > max_targe_num_)
                 max_targe_num_ = op.targe_num();
             if(op.name() == "measure") {measured = true;}
-            else if(measured == true) {final_measure_ = false; } 
+            else if(measured == true && op.name() != "snapshot") {final_measure_ = false; } 
             instructions_.push_back(std::move(op));
         }        
     }
@@ -0,0 +1,36 @@
+#pragma once
+
+#include "simulator.hpp"
+#include "types.hpp"
+
+// Final states of the circuits on num qubits as the rows of a matrix, in little endian convention.
+// Circuits are converted while holding the GIL and simulated in parallel.
+RowMatrixXcd batch_statevectors(py::list const &pycircuits, const uint num){
+    vector<Circuit> circuits;
+    for (auto pycircuit : pycircuits){
+        circuits.emplace_back(py::reinterpret_borrow<py::object>(pycircuit));
+        if (!circuits.back().final_measure())
+            throw std::invalid_argument("Batched statevectors need circuits with measurements at the end");
+        for (auto const &op : circuits.back().instructions()){
+            if (op.name() == "reset" || op.name() == "cif")
+                throw std::invalid_argument("Batched statevectors need circuits without reset and cif");
+        }
+    }
+    const size_t dim = 1ULL << num;
+    RowMatrixXcd states(circuits.size(), dim);
+#pragma omp parallel for
+    for (omp_i k = 0; k < (omp_i)circuits.size(); k++){
+        StateVector<data_t> state(num);
+        simulate(circuits[k], state);
+        std::copy(state.data(), state.data() + dim, states.row(k).data());
+    }
+    return states;
+}
+
+// K_ij = |<a_i|b_j>|^2 for the rows of a and b, the product is a blocked Eigen GEMM
+RowMatrixXd fidelity_matrix(Eigen::Ref<const RowMatrixXcd> const &a, Eigen::Ref<const RowMatrixXcd> const &b){
+    if (a.cols() != b.cols())
+        throw std::invalid_argument("States of different sizes");
+    RowMatrixXcd overlap = a.conjugate() * b.transpose();
+    return overlap.cwiseAbs2();
+}
@@ -0,0 +1,189 @@
+#pragma once
+
+#include "simulator.hpp"
+#include <map>
+
+namespace py = pybind11;
+
+// Single-qubit error channel attached to gates. Stochastic Pauli channels
+// keep their probabilities so that they can be sampled without looking at
+// the state and inserted as plain Pauli gates, general channels keep their
+// Kraus operators and are sampled from the reduced density matrix.
+struct NoiseChannel{
+    vector<double> pauli_probs;  // (I, X, Y, Z), empty for Kraus channel
+    vector<RowMatrixXcd> kraus;
+
+    bool is_pauli() const { return !pauli_probs.empty(); }
+};
+
+struct GateError{
+    string gate;             // empty string matches every gate
+    vector<pos_t> qubits;    // empty vector matches every qubit
+    NoiseChannel channel;
+};
+
+class NoiseModel{
+    private:
+        vector<GateError> gate_errors_;
+        // qubit -> (p(1|0), p(0|1)), applied to every qubit if has_default_readout_
+        std::map<pos_t, std::pair<double, double>> readout_errors_;
+        std::pair<double, double> default_readout_;
+        bool has_default_readout_ = false;
+        bool all_pauli_ = true;
+
+    public:
+        NoiseModel(){};
+        explicit NoiseModel(py::object const &pynoise);
+
+        bool all_pauli() const { return all_pauli_; }
+        vector<NoiseChannel const*> channels(string const &gate, pos_t qubit) const;
+        uint readout(pos_t qubit, uint bit, std::mt19937_64 &rng) const;
+};
+
+NoiseModel::NoiseModel(py::object const &pynoise){
+    using GateErrorTuple = std::tuple<string, vector<pos_t>, vector<double>, vector<RowMatrixXcd>>;
+    auto gate_errors = pynoise.attr("gate_errors").cast<vector<GateErrorTuple>>();
+    for (auto &item : gate_errors){
+        GateError error;
+        error.gate = std::get<0>(item);
+        error.qubits = std::get<1>(item);
+        error.channel.pauli_probs = std::get<2>(item);
+        error.channel.kraus = std::get<3>(item);
+        if (!error.channel.is_pauli()) all_pauli_ = false;
+        gate_errors_.push_back(std::move(error));
+    }
+
+    using ReadoutTuple = std::tuple<int, double, double>;
+    auto readout_errors = pynoise.attr("readout_errors").cast<vector<ReadoutTuple>>();
+    for (auto &item : readout_errors){
+        auto probs = std::make_pair(std::get<1>(item), std::get<2>(item));
+        if (std::get<0>(item) < 0){
+            default_readout_ = probs;
+            has_default_readout_ = true;
+        }else{
+            readout_errors_[std::get<0>(item)] = probs;
+        }
+    }
+}
+
+vector<NoiseChannel const*> NoiseModel::channels(string const &gate, pos_t qubit) const{
+    vector<NoiseChannel const*> res;
+    for (auto const &error : gate_errors_){
+        if (!error.gate.empty() && error.gate != gate) continue;
+        if (!error.qubits.empty() && std::find(error.qubits.begin(), error.qubits.end(), qubit) == error.qubits.end()) continue;
+        res.push_back(&error.channel);
+    }
+    return res;
+}
+
+uint NoiseModel::readout(pos_t qubit, uint bit, std::mt19937_64 &rng) const{
+    std::pair<double, double> probs;
+    auto it = readout_errors_.find(qubit);
+    if (it != readout_errors_.end()) probs = it->second;
+    else if (has_default_readout_) probs = default_readout_;
+    else return bit;
+
+    double flip = bit == 0 ? probs.first : probs.second;
+    if (flip > 0 && std::uniform_real_distribution<double>(0., 1.)(rng) < flip)
+        return 1 - bit;
+    return bit;
+}
+
+// Pick an element of (I, X, Y, Z) according to a stochastic Pauli channel
+uint sample_pauli(NoiseChannel const &channel, std::mt19937_64 &rng){
+    double r = std::uniform_real_distribution<double>(0., 1.)(rng);
+    double acc = 0.;
+    for (uint k = 0; k < channel.pauli_probs.size(); k++){
+        acc += channel.pauli_probs[k];
+        if (r < acc) return k;
+    }
+    return 0;
+}
+
+void apply_pauli(uint pauli, pos_t pos, StateVector<data_t> &state){
+    switch (pauli){
+        case 1: state.apply_x(pos); break;
+        case 2: state.apply_y(pos); break;
+        case 3: state.apply_z(pos); break;
+        default: break;
+    }
+}
+
+// Reduced density matrix of one qubit, used to get Kraus branch probabilities in one pass
+RowMatrixXcd reduced_density_matrix(StateVector<data_t> &state, pos_t pos){
+    const size_t offset = 1ULL << pos;
+    const size_t rsize = state.size() >> 1;
+    auto data = state.data();
+    double r00 = 0., r11 = 0., r01_re = 0., r01_im = 0.;
+#pragma omp parallel for reduction(+:r00, r11, r01_re, r01_im)
+    for (omp_i j = 0; j < rsize; j++){
+        size_t i = (j & (offset - 1)) | (j >> pos << pos << 1);
+        auto a = data[i];
+        auto b = data[i + offset];
+        auto c = a * std::conj(b);
+        r00 += std::norm(a);
+        r11 += std::norm(b);
+        r01_re += c.real();
+        r01_im += c.imag();
+    }
+    RowMatrixXcd rho(2, 2);
+    rho << r00, complex<double>(r01_re, r01_im), complex<double>(r01_re, -r01_im), r11;
+    return rho;
+}
+
+void apply_channel(NoiseChannel const &channel, pos_t pos, StateVector<data_t> &state, std::mt19937_64 &rng){
+    if (channel.is_pauli()){
+        apply_pauli(sample_pauli(channel, rng), pos, state);
+        return;
+    }
+    auto rho = reduced_density_matrix(state, pos);
+    vector<double> probs;
+    for (auto const &k : channel.kraus){
+        probs.push_back(std::max((k * rho * k.adjoint()).trace().real(), 0.));
+    }
+    uint branch = std::discrete_distribution<uint>(probs.begin(), probs.end())(rng);
+    RowMatrixXcd mat = channel.kraus[branch] / std::sqrt(probs[branch]);
+    state.apply_one_targe_gate_general<0>(vector<pos_t>{pos}, mat.data());
+}
+
+// Apply an operation followed by the errors attached to it, channels are sampled on the fly
+void apply_noisy_op(QuantumOperator &op, StateVector<data_t> &state, NoiseModel const &noise){
+    auto &rng = state.rng();
+    if (op.name() == "measure"){
+        state.apply_measure(op.qbits(), op.cbits());
+        auto qbits = op.qbits();
+        auto cbits = op.cbits();
+        auto creg = state.creg();
+        for (uint j = 0; j < qbits.size(); j++){
+            state.set_cbit(cbits[j], noise.readout(qbits[j], creg[cbits[j]], rng));
+        }
+        return;
+    }
+    if (op.name() == "cif"){
+        if (state.check_cif(op.cbits(), op.condition())){
+            for (auto op_h : op.instructions()){
+                apply_noisy_op(op_h, state, noise);
+            }
+        }
+        return;
+    }
+    apply_op(op, state);
+    if (op.name() == "reset") return;
+    for (auto pos : op.positions()){
+        for (auto channel : noise.channels(op.name(), pos)){
+            apply_channel(*channel, pos, state, rng);
+        }
+    }
+}
+
+// Draw a basis index from |psi|^2 by a cumulative scan, avoid allocating the probabilities
+size_t sample_index(StateVector<data_t> &state, std::mt19937_64 &rng){
+    double r = std::uniform_real_distribution<double>(0., 1.)(rng);
+    double acc = 0.;
+    auto data = state.data();
+    for (size_t i = 0; i < state.size(); i++){
+        acc += std::norm(data[i]);
+        if (r < acc) return i;
+    }
+    return state.size() - 1;
+}
@@ -17,12 +17,17 @@ class QuantumOperator{
         vector<pos_t> cbits_;
         vector<QuantumOperator> instructions_;
         uint condition_;
+        uint index_ = 0;
+        // Image of each basis state of a permutation, the first position is the most significant bit
+        vector<size_t> table_;
     public:
         //Constructor
         QuantumOperator();
         QuantumOperator(string name, vector<pos_t> const &qbits);
         QuantumOperator(string name, vector<pos_t> const &qbits, vector<pos_t> const &cbits);
         QuantumOperator(string name, vector<pos_t> const &cbits, const uint condition, vector<QuantumOperator> const &ins);
+        QuantumOperator(string name, vector<pos_t> const &qbits, const uint index);
+        QuantumOperator(string name, vector<pos_t> const &positions, vector<size_t> const &table);
         QuantumOperator(string name, vector<double> paras, vector<pos_t> const &control_qubits, vector<pos_t> const &targe_qubits, RowMatrixXcd const &mat, bool diag=false, bool real=false);
         QuantumOperator(string name,vector<double> paras, vector<pos_t> const &positions, uint control_num, RowMatrixXcd const &mat, bool diag=false, bool real=false);
 
@@ -36,7 +41,9 @@ class QuantumOperator{
         uint control_num() const { return control_num_; } 
         uint targe_num() const { return targe_num_; }
         uint condition() const { return condition_; }
-        vector<pos_t> positions(){ return positions_; }
+        uint index() const { return index_; }
+        vector<size_t> const& table() const { return table_; }
+        vector<pos_t> positions() const { return positions_; }
         explicit operator bool() const {
             return !(name_ == "empty");
         }
@@ -71,6 +78,21 @@ cbits_(cbits),
 instructions_(ins),
 condition_(condition){}
 
+QuantumOperator::QuantumOperator(string name, vector<pos_t> const &qbits, const uint index)
+:
+name_(name),
+targe_num_(0),
+qbits_(qbits),
+index_(index){}
+
+QuantumOperator::QuantumOperator(string name, vector<pos_t> const &positions, vector<size_t> const &table)
+:
+name_(name),
+positions_(positions),
+control_num_(0),
+targe_num_(positions.size()),
+table_(table){}
+
 QuantumOperator::QuantumOperator(string name, vector<double> paras, vector<pos_t> const &positions, uint control_num, RowMatrixXcd const &mat, bool diag, bool real)
 :
 name_(name),
@@ -0,0 +1,135 @@
+#pragma once
+
+#include <map>
+#include <set>
+#include "statevector.hpp"
+#include "circuit.hpp"
+
+// Permute the amplitudes of the basis states of qubits, table[x] is the image of x whose most
+// significant bit is qubits[0]. Each block of 2^k amplitudes sharing the other qubits is gathered
+// once and scattered to its permuted places, so the state is swept once whatever the table.
+template <class State>
+void apply_permutation(vector<pos_t> const &qubits, vector<size_t> const &table, State &state){
+    using amp_t = typename std::remove_pointer<decltype(state.data())>::type;
+    const uint k = qubits.size();
+    const size_t dim = 1ULL << k;
+    if (table.size() != dim) throw std::invalid_argument("Permutation table does not match its qubits");
+    vector<size_t> offsets(dim, 0);
+    for (size_t x = 0; x < dim; x++){
+        for (uint j = 0; j < k; j++){
+            if ((x >> (k - 1 - j)) & 1) offsets[x] |= 1ULL << qubits[j];
+        }
+    }
+    vector<pos_t> sorted(qubits.begin(), qubits.end());
+    std::sort(sorted.begin(), sorted.end());
+    auto data = state.data();
+    const size_t blocks = state.size() >> k;
+#pragma omp parallel
+    {
+        vector<amp_t> buffer(dim);
+#pragma omp for
+        for (omp_i r = 0; r < (omp_i)blocks; r++){
+            size_t base = r;
+            for (auto q : sorted){
+                base = ((base >> q) << (q + 1)) | (base & ((1ULL << q) - 1));
+            }
+            for (size_t x = 0; x < dim; x++) buffer[x] = data[base | offsets[x]];
+            for (size_t x = 0; x < dim; x++) data[base | offsets[table[x]]] = buffer[x];
+        }
+    }
+}
+
+// Whether op maps basis states to basis states without phases: X, multi-controlled X and SWAP
+bool is_reversible(QuantumOperator const &op){
+    static const std::set<string> names = {"x", "cx", "cnot", "ccx", "toffoli", "mcx", "swap", "permutation"};
+    return names.count(op.name()) > 0;
+}
+
+// A reversible gate on the local basis states of a run, bit k - 1 - j of x is qubit qubits[j]:
+// x flips flip_mask when all bits of ctrl_mask are set, and swaps the bits swap_a, swap_b if swap_a != swap_b.
+// Permutation gates look their sub-table up.
+struct ReversibleStep{
+    size_t ctrl_mask = 0;
+    size_t flip_mask = 0;
+    size_t swap_a = 0;
+    size_t swap_b = 0;
+    vector<size_t> bits;
+    vector<size_t> const *table = nullptr;
+
+    ReversibleStep(QuantumOperator const &op, std::map<pos_t, uint> const &local, const uint k){
+        auto positions = op.positions();
+        for (auto q : positions) bits.push_back(1ULL << (k - 1 - local.at(q)));
+        if (op.name() == "swap"){
+            swap_a = bits[0];
+            swap_b = bits[1];
+        }else if (op.name() == "permutation"){
+            table = &op.table();
+        }else{
+            // x and controlled x, the target is the last position
+            for (uint j = 0; j + 1 < bits.size(); j++) ctrl_mask |= bits[j];
+            flip_mask = bits.back();
+        }
+    }
+
+    size_t apply(size_t x) const {
+        if (table != nullptr){
+            const uint n = bits.size();
+            size_t sub = 0;
+            for (auto b : bits) sub = (sub << 1) | ((x & b) ? 1 : 0);
+            size_t image = (*table)[sub];
+            for (uint j = 0; j < n; j++){
+                x = ((image >> (n - 1 - j)) & 1) ? (x | bits[j]) : (x & ~bits[j]);
+            }
+            return x;
+        }
+        if (swap_a != swap_b){
+            if (((x & swap_a) != 0) != ((x & swap_b) != 0)) x ^= swap_a | swap_b;
+            return x;
+        }
+        return (x & ctrl_mask) == ctrl_mask ? x ^ flip_mask : x;
+    }
+};
+
+// Replace runs of at least min_run consecutive reversible gates acting on at most max_qubits
+// qubits by a single permutation
+vector<QuantumOperator> fuse_reversible(vector<QuantumOperator> const &instructions, const uint min_run, const uint max_qubits){
+    vector<QuantumOperator> fused;
+    size_t k = 0;
+    while (k < instructions.size()){
+        std::set<pos_t> qubits;
+        size_t end = k;
+        while (end < instructions.size() && is_reversible(instructions[end])){
+            auto positions = instructions[end].positions();
+            std::set<pos_t> grown = qubits;
+            grown.insert(positions.begin(), positions.end());
+            if (grown.size() > max_qubits) break;
+            qubits = std::move(grown);
+            end++;
+        }
+        if (end - k < std::max(min_run, 1u)){
+            fused.push_back(instructions[k]);
+            k++;
+            continue;
+        }
+        vector<pos_t> order(qubits.begin(), qubits.end());
+        std::map<pos_t, uint> local;
+        for (uint j = 0; j < order.size(); j++) local[order[j]] = j;
+        const uint width = order.size();
+        vector<size_t> table(1ULL << width);
+        vector<ReversibleStep> run;
+        for (size_t j = k; j < end; j++) run.emplace_back(instructions[j], local, width);
+#pragma omp parallel for
+        for (omp_i x = 0; x < (omp_i)table.size(); x++){
+            size_t y = x;
+            for (auto const &step : run) y = step.apply(y);
+            table[x] = y;
+        }
+        fused.push_back(QuantumOperator("permutation", order, table));
+        k = end;
+    }
+    return fused;
+}
+
+void Circuit::fuse_reversible(const uint min_run, const uint max_qubits){
+    instructions_ = ::fuse_reversible(instructions_, min_run, max_qubits);
+}
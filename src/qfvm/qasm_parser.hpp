@@ -0,0 +1,330 @@
+#pragma once
+
+#include <cctype>
+#include <cmath>
+#include <stdexcept>
+#include <unordered_map>
+#include "circuit.hpp"
+
+// Reader of flat OpenQASM 2 programs: qreg and creg declarations, the gates of qelib1.inc that
+// quafu.qfasm maps to Quafu gates applied to register elements or whole registers, measure, reset,
+// barrier and if. It builds the operators of Circuit(pycircuit) directly, without any Python
+// object. Gate definitions, opaque gates, U and other gate names throw QasmUnsupported so
+// that callers fall back to the full Python parser.
+
+// Syntax beyond QasmReader, raised as QasmUnsupportedError (a ValueError) in Python
+class QasmUnsupported : public std::invalid_argument{
+    public:
+        using std::invalid_argument::invalid_argument;
+};
+
+class QasmReader{
+    private:
+        struct Register{
+            uint offset;
+            uint size;
+        };
+        struct GateSpec{
+            uint control_num;  // 0 for gates applied with their whole matrix
+            uint param_num;
+            uint arity;
+        };
+
+        string const &src_;
+        size_t pos_ = 0;
+        std::unordered_map<string, Register> qregs_, cregs_;
+        uint qreg_size_ = 0, creg_size_ = 0;
+        uint qubit_num_ = 0;
+        vector<QuantumOperator> ops_;
+
+        static std::unordered_map<string, GateSpec> const& gate_specs();
+        static RowMatrixXcd gate_matrix(string const &name, vector<double> const &paras);
+
+        [[noreturn]] void fail(string const &msg) const {
+            throw QasmUnsupported("QASM line " + std::to_string(1 + std::count(src_.begin(), src_.begin() + std::min(pos_, src_.size()), '\n')) + ": " + msg);
+        }
+        void skip_space();
+        bool at_end(){ skip_space(); return pos_ >= src_.size(); }
+        bool peek(char c){ skip_space(); return pos_ < src_.size() && src_[pos_] == c; }
+        void expect(char c);
+        bool accept(char c){ if (peek(c)){ pos_++; return true; } return false; }
+        string identifier();
+        uint integer();
+        double expression();
+        double term();
+        double factor();
+        double primary();
+        vector<pos_t> argument(std::unordered_map<string, Register> const &regs);
+        void skip_statement();
+        void statement(vector<QuantumOperator> &out);
+        void gate(string const &name, vector<QuantumOperator> &out);
+        void use(pos_t q){ qubit_num_ = std::max(qubit_num_, q + 1); }
+
+    public:
+        explicit QasmReader(string const &src) : src_(src) { }
+        Circuit read();
+};
+
+std::unordered_map<string, QasmReader::GateSpec> const& QasmReader::gate_specs(){
+    static const std::unordered_map<string, GateSpec> specs{
+        {"x", {0, 0, 1}}, {"y", {0, 0, 1}}, {"z", {0, 0, 1}}, {"h", {0, 0, 1}}, {"s", {0, 0, 1}},
+        {"sdg", {0, 0, 1}}, {"t", {0, 0, 1}}, {"tdg", {0, 0, 1}}, {"sx", {0, 0, 1}}, {"id", {0, 0, 1}},
+        {"rx", {0, 1, 1}}, {"ry", {0, 1, 1}}, {"rz", {0, 1, 1}}, {"p", {0, 1, 1}},
+        {"cx", {1, 0, 2}}, {"cy", {1, 0, 2}}, {"cz", {1, 0, 2}}, {"cp", {1, 1, 2}},
+        {"swap", {0, 0, 2}}, {"rxx", {0, 1, 2}}, {"rzz", {0, 1, 2}},
+        {"ccx", {2, 0, 3}}, {"cswap", {1, 0, 3}},
+    };
+    return specs;
+}
+
+// Matrices given to the kernels by Circuit(pycircuit): the target matrix of controlled gates and
+// the full matrix of the others, which are all symmetric under the exchange of their qubits
+RowMatrixXcd QasmReader::gate_matrix(string const &name, vector<double> const &paras){
+    const complex<double> i1(0., 1.);
+    const double r = std::sqrt(0.5);
+    RowMatrixXcd m(2, 2);
+    if (name == "x" || name == "cx" || name == "ccx"){
+        m << 0., 1., 1., 0.;
+    }else if (name == "y" || name == "cy"){
+        m << 0., -i1, i1, 0.;
+    }else if (name == "z" || name == "cz"){
+        m << 1., 0., 0., -1.;
+    }else if (name == "h"){
+        m << r, r, r, -r;
+    }else if (name == "s"){
+        m << 1., 0., 0., i1;
+    }else if (name == "sdg"){
+        m << 1., 0., 0., -i1;
+    }else if (name == "t"){
+        m << 1., 0., 0., std::exp(i1 * M_PI / 4.);
+    }else if (name == "tdg"){
+        m << 1., 0., 0., std::exp(-i1 * M_PI / 4.);
+    }else if (name == "sx"){
+        m << 0.5 + 0.5 * i1, 0.5 - 0.5 * i1, 0.5 - 0.5 * i1, 0.5 + 0.5 * i1;
+    }else if (name == "rx"){
+        const double c = std::cos(paras[0] / 2), s = std::sin(paras[0] / 2);
+        m << c, -i1 * s, -i1 * s, c;
+    }else if (name == "ry"){
+        const double c = std::cos(paras[0] / 2), s = std::sin(paras[0] / 2);
+        m << c, -s, s, c;
+    }else if (name == "rz"){
+        m << std::exp(-i1 * paras[0] / 2.), 0., 0., std::exp(i1 * paras[0] / 2.);
+    }else if (name == "p" || name == "cp"){
+        m << 1., 0., 0., std::exp(i1 * paras[0]);
+    }else{
+        m = RowMatrixXcd::Zero(4, 4);
+        if (name == "swap" || name == "cswap"){
+            m(0, 0) = m(1, 2) = m(2, 1) = m(3, 3) = 1.;
+        }else if (name == "rzz"){
+            m(0, 0) = m(3, 3) = std::exp(-i1 * paras[0] / 2.);
+            m(1, 1) = m(2, 2) = std::exp(i1 * paras[0] / 2.);
+        }else{
+            const double c = std::cos(paras[0] / 2), s = std::sin(paras[0] / 2);
+            m(0, 0) = m(1, 1) = m(2, 2) = m(3, 3) = c;
+            m(0, 3) = m(3, 0) = m(1, 2) = m(2, 1) = -i1 * s;
+        }
+    }
+    return m;
+}
+
+void QasmReader::skip_space(){
+    while (pos_ < src_.size()){
+        if (std::isspace(static_cast<unsigned char>(src_[pos_]))){
+            pos_++;
+        }else if (src_.compare(pos_, 2, "//") == 0){
+            pos_ = src_.find('\n', pos_);
+            if (pos_ == string::npos) pos_ = src_.size();
+        }else{
+            break;
+        }
+    }
+}
+
+void QasmReader::expect(char c){
+    if (!accept(c)) fail(string("expected '") + c + "'");
+}
+
+string QasmReader::identifier(){
+    skip_space();
+    size_t start = pos_;
+    while (pos_ < src_.size() && (std::isalnum(static_cast<unsigned char>(src_[pos_])) || src_[pos_] == '_')) pos_++;
+    if (start == pos_) fail("expected a name");
+    return src_.substr(start, pos_ - start);
+}
+
+uint QasmReader::integer(){
+    skip_space();
+    size_t start = pos_;
+    while (pos_ < src_.size() && std::isdigit(static_cast<unsigned char>(src_[pos_]))) pos_++;
+    if (start == pos_) fail("expected an integer");
+    return std::stoul(src_.substr(start, pos_ - start));
+}
+
+// Parameters are real expressions of numbers and pi with + - * / ^, brackets and the unary
+// functions of quafu.qfasm
+double QasmReader::expression(){
+    double value = term();
+    while (true){
+        if (accept('+')) value += term();
+        else if (accept('-')) value -= term();
+        else return value;
+    }
+}
+
+double QasmReader::term(){
+    double value = factor();
+    while (true){
+        if (accept('*')) value *= factor();
+        else if (accept('/')) value /= factor();
+        else return value;
+    }
+}
+
+double QasmReader::factor(){
+    if (accept('-')) return -factor();
+    if (accept('+')) return factor();
+    double base = primary();
+    if (accept('^')) return std::pow(base, factor());
+    return base;
+}
+
+double QasmReader::primary(){
+    if (accept('(')){
+        double value = expression();
+        expect(')');
+        return value;
+    }
+    skip_space();
+    if (pos_ < src_.size() && (std::isdigit(static_cast<unsigned char>(src_[pos_])) || src_[pos_] == '.')){
+        const char *begin = src_.c_str() + pos_;
+        char *end = nullptr;
+        double value = std::strtod(begin, &end);
+        pos_ += end - begin;
+        return value;
+    }
+    string name = identifier();
+    if (name == "pi") return M_PI;
+    static const std::unordered_map<string, double (*)(double)> functions{
+        {"sin", std::sin}, {"cos", std::cos}, {"tan", std::tan}, {"exp", std::exp}, {"ln", std::log},
+        {"sqrt", std::sqrt}, {"acos", std::acos}, {"atan", std::atan}, {"asin", std::asin}};
+    auto it = functions.find(name);
+    if (it == functions.end()) fail("unknown identifier " + name);
+    expect('(');
+    double value = expression();
+    expect(')');
+    return it->second(value);
+}
+
+// Bits of reg[i] or of a whole register
+vector<pos_t> QasmReader::argument(std::unordered_map<string, Register> const &regs){
+    string name = identifier();
+    auto it = regs.find(name);
+    if (it == regs.end()) fail("undeclared register " + name);
+    Register const &reg = it->second;
+    if (accept('[')){
+        uint index = integer();
+        expect(']');
+        if (index >= reg.size) fail("index out of range of " + name);
+        return {reg.offset + index};
+    }
+    vector<pos_t> bits(reg.size);
+    for (uint i = 0; i < reg.size; i++) bits[i] = reg.offset + i;
+    return bits;
+}
+
+void QasmReader::skip_statement(){
+    while (!at_end() && !accept(';')) pos_++;
+}
+
+void QasmReader::gate(string const &name, vector<QuantumOperator> &out){
+    auto const &specs = gate_specs();
+    auto it = specs.find(name);
+    if (it == specs.end()) fail("unsupported gate " + name);
+    GateSpec const &spec = it->second;
+
+    vector<double> paras;
+    if (accept('(')){
+        if (!peek(')')){
+            do { paras.push_back(expression()); } while (accept(','));
+        }
+        expect(')');
+    }
+    if (paras.size() != spec.param_num) fail("wrong number of parameters of " + name);
+    vector<vector<pos_t>> args;
+    do { args.push_back(argument(qregs_)); } while (accept(','));
+    expect(';');
+    if (args.size() != spec.arity) fail("wrong number of arguments of " + name);
+
+    // whole registers are broadcast, all of them must have the same size
+    size_t times = 1;
+    for (auto const &arg : args){
+        if (arg.size() == 1) continue;
+        if (times != 1 && arg.size() != times) fail("registers of different sizes in " + name);
+        times = arg.size();
+    }
+    if (name == "id") return;
+    RowMatrixXcd mat = gate_matrix(name, paras);
+    for (size_t k = 0; k < times; k++){
+        vector<pos_t> positions;
+        for (auto const &arg : args) positions.push_back(arg.size() == 1 ? arg[0] : arg[k]);
+        for (auto q : positions) use(q);
+        out.emplace_back(name, paras, positions, spec.control_num, mat);
+    }
+}
+
+void QasmReader::statement(vector<QuantumOperator> &out){
+    string keyword = identifier();
+    if (keyword == "OPENQASM" || keyword == "include"){
+        skip_statement();
+    }else if (keyword == "qreg" || keyword == "creg"){
+        string name = identifier();
+        expect('[');
+        uint size = integer();
+        expect(']');
+        expect(';');
+        auto &regs = keyword == "qreg" ? qregs_ : cregs_;
+        uint &total = keyword == "qreg" ? qreg_size_ : creg_size_;
+        if (regs.count(name)) fail("duplicate register " + name);
+        regs[name] = Register{total, size};
+        total += size;
+    }else if (keyword == "barrier"){
+        skip_statement();
+    }else if (keyword == "measure"){
+        vector<pos_t> qbits = argument(qregs_);
+        expect('-');
+        expect('>');
+        vector<pos_t> cbits = argument(cregs_);
+        expect(';');
+        if (qbits.size() != cbits.size()) fail("measure of registers of different sizes");
+        for (auto q : qbits) use(q);
+        out.emplace_back("measure", qbits, cbits);
+    }else if (keyword == "reset"){
+        vector<pos_t> qbits = argument(qregs_);
+        expect(';');
+        for (auto q : qbits) use(q);
+        out.emplace_back("reset", qbits);
+    }else if (keyword == "if"){
+        expect('(');
+        vector<pos_t> cbits = argument(cregs_);
+        expect('=');
+        expect('=');
+        uint condition = integer();
+        expect(')');
+        vector<QuantumOperator> body;
+        string name = identifier();
+        if (gate_specs().count(name) == 0) fail("unsupported instruction in if: " + name);
+        gate(name, body);
+        out.emplace_back("cif", cbits, condition, body);
+    }else{
+        gate(keyword, out);
+    }
+}
+
+Circuit QasmReader::read(){
+    while (!at_end()) statement(ops_);
+    return Circuit(std::max(qubit_num_, 1u), std::max(creg_size_, 1u), ops_);
+}
+
+Circuit parse_qasm(string const &source){
+    return QasmReader(source).read();
+}
@@ -1,7 +1,17 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
 #include "simulator.hpp"
+#include "noise.hpp"
+#include "stabilizer.hpp"
+#include "sparse.hpp"
+#include "adjoint.hpp"
+#include "snapshot.hpp"
+#include "unitary.hpp"
+#include "kernel.hpp"
+#include "realstate.hpp"
+#include "qasm_parser.hpp"
 #include <iostream>
+#include <limits>
 #include <random>
 #ifdef _USE_GPU
 #include <cuda_simulator.cuh>
@@ -13,6 +23,10 @@
 
 namespace py = pybind11;
 
+// Widest permutation built from a run of reversible gates, wider tables no longer fit in cache and
+// their scattered writes cost more than the gates they replace
+const uint MAX_FUSED_QUBITS = 16;
+
 template <typename T>
 py::array_t<T> to_numpy(const std::tuple<T*, size_t> &src) {
     auto src_ptr = std::get<0>(src);
@@ -28,8 +42,9 @@ py::array_t<T> to_numpy(const std::tuple<T*, size_t> &src) {
     );
 }
 
-std::pair<std::map<uint, uint>, py::array_t<complex<double>> > simulate_circuit(py::object const&pycircuit, py::array_t<complex<double>> &np_inputstate, const int &shots){
-    auto circuit = Circuit(pycircuit);
+// Snapshots are recorded into snapshots if it is given, runs shot by shot keep those of the last shot
+std::pair<std::map<uint, uint>, py::array_t<complex<double>> > simulate_circuit_impl(Circuit &circuit, py::array_t<complex<double>> &np_inputstate, const int &shots, py::dict *snapshots, const uint fuse_min_run){
+    if (fuse_min_run > 0) circuit.fuse_reversible(fuse_min_run, std::min(circuit.qubit_num(), MAX_FUSED_QUBITS));
     py::buffer_info buf = np_inputstate.request();
     auto* data_ptr = reinterpret_cast<std::complex<double>*>(buf.ptr);
     size_t data_size = buf.size;
@@ -46,13 +61,20 @@ std::pair<std::map<uint, uint>, py::array_t<complex<double>> > simulate_circuit(
     std::map<uint, uint> outcount;
     for(uint i =0; i < actual_shots; i++){
         StateVector<double> state;
+        std::function<void(QuantumOperator &)> on_snapshot = nullptr;
+        if(snapshots != nullptr){
+            on_snapshot = [&](QuantumOperator &op){
+                auto const &spec = circuit.snapshots()[op.index()];
+                (*snapshots)[py::str(spec.label)] = snapshot_value(spec, state);
+            };
+        }
         if(data_size == 0){
-            simulate(circuit, state);
+            simulate(circuit, state, on_snapshot);
         }else{
             //deepcopy state
-            vector<std::complex<double>> data_copy(data_ptr, data_ptr + data_size);
-            state = std::move(StateVector<double>(data_copy.data(), data_copy.size()));
-            simulate(circuit, state);
+            state.set_num(static_cast<uint>(std::log2(data_size)));
+            std::copy(data_ptr, data_ptr + data_size, state.data());
+            simulate(circuit, state, on_snapshot);
         }
         if(!circuit.final_measure()){
             // store reg
@@ -99,8 +121,511 @@ std::pair<std::map<uint, uint>, py::array_t<complex<double>> > simulate_circuit(
         }
     } 
     // return 
-    if(data_size == 0) return std::make_pair(outcount, to_numpy(global_state.move_data_to_python()));
-    else return std::make_pair(outcount, np_inputstate);  
+    return std::make_pair(outcount, to_numpy(global_state.move_data_to_python()));
+}
+
+std::pair<std::map<uint, uint>, py::array_t<complex<double>> > simulate_circuit(py::object const&pycircuit, py::array_t<complex<double>> &np_inputstate, const int &shots, const uint fuse_min_run){
+    auto circuit = Circuit(pycircuit);
+    return simulate_circuit_impl(circuit, np_inputstate, shots, nullptr, fuse_min_run);
+}
+
+// Same as simulate_circuit for a flat OpenQASM 2 program parsed in C++, also returning the measured
+// (qubit, cbit) pairs in program order. Programs beyond QasmReader raise QasmUnsupportedError, errors
+// of the simulation raise ValueError.
+std::tuple<std::map<uint, uint>, py::array_t<complex<double>>, vector<std::pair<uint,uint>>> simulate_qasm(string const &source, py::array_t<complex<double>> &np_inputstate, const int &shots, const uint fuse_min_run){
+    auto circuit = parse_qasm(source);
+    size_t input_size = np_inputstate.size();
+    if (input_size > 0 && input_size < (1ULL << circuit.qubit_num())){
+        throw std::invalid_argument("Input state has fewer qubits than the program");
+    }
+    auto result = simulate_circuit_impl(circuit, np_inputstate, shots, nullptr, fuse_min_run);
+    return std::make_tuple(result.first, result.second, circuit.measure_vec());
+}
+
+// Same as simulate_circuit, also returning the values of the snapshot instructions keyed by label
+std::tuple<std::map<uint, uint>, py::array_t<complex<double>>, py::dict> simulate_circuit_snapshots(py::object const&pycircuit, py::array_t<complex<double>> &np_inputstate, const int &shots){
+    py::dict snapshots;
+    auto circuit = Circuit(pycircuit);
+    auto result = simulate_circuit_impl(circuit, np_inputstate, shots, &snapshots, 0);
+    return std::make_tuple(result.first, result.second, snapshots);
+}
+
+// Pack measured cbits into an outcome, the first cbit is the most significant bit
+uint creg_to_outcome(vector<uint> const &creg, std::map<uint, bool> const &cbit_measured){
+    uint outcome = 0;
+    for(uint j = 0; j < creg.size(); j++){
+        if(cbit_measured.find(j) == cbit_measured.end()) continue;
+        outcome *= 2;
+        outcome += creg[j];
+    }
+    return outcome;
+}
+
+// Map a sampled basis index of the final state to an outcome, applying readout errors
+uint index_to_outcome(size_t index, vector<std::pair<uint, uint>> const &measures, uint cbit_num,
+                      std::map<uint, bool> const &cbit_measured, NoiseModel const &noise, std::mt19937_64 &rng){
+    vector<uint> creg(cbit_num, 0);
+    for(auto &pair: measures){
+        creg[pair.second] = noise.readout(pair.first, (index >> pair.first) & 1, rng);
+    }
+    return creg_to_outcome(creg, cbit_measured);
+}
+
+// Monte-Carlo trajectories of a noisy circuit, each shot runs with its own random stream
+// seeded by (seed, shot). std::seed_seq keeps the low 32 bits of each value, so the 64 bit
+// seed is passed as two words. For stochastic Pauli noise with terminal measurements, errors do
+// not depend on the state and are drawn up front: error-free shots are sampled from a single
+// noiseless run, only the shots that picked up a Pauli insertion are simulated again.
+std::map<uint, uint> simulate_circuit_noisy(py::object const&pycircuit, py::object const&pynoise, const int &shots, const uint64_t &seed){
+    auto circuit = Circuit(pycircuit);
+    NoiseModel noise(pynoise);
+    auto instructions = circuit.instructions();
+    vector<std::pair<uint,uint>> measures = circuit.measure_vec();
+    uint cbit_num = circuit.cbit_num();
+    // Without explicit measurement, sample all qubits into cbits of the same index
+    if(measures.empty()){
+        for(uint q = 0; q < circuit.qubit_num(); q++) measures.push_back(std::make_pair(q, q));
+        cbit_num = std::max(cbit_num, circuit.qubit_num());
+    }
+    std::map<uint,bool> cbit_measured;
+    for(auto &pair: measures){
+        cbit_measured[pair.second] = true;
+    }
+    bool final_measure = circuit.final_measure();
+    bool presample = final_measure && noise.all_pauli();
+    for(auto &op : instructions){
+        if(op.name() == "reset" || op.name() == "cif") presample = false;
+    }
+    // Run trajectories side by side only when a state per thread is affordable
+    bool parallel = circuit.qubit_num() <= 20;
+
+    std::map<uint, uint> outcount;
+    auto init_state = [&](StateVector<data_t> &state, std::seed_seq &seq){
+        state.set_num(circuit.qubit_num());
+        state.set_creg(circuit.cbit_num());
+        state.set_rng(seq);
+    };
+
+    if(presample){
+        // Error sites in program order, so that a pattern can be replayed while simulating
+        vector<std::tuple<uint, pos_t, NoiseChannel const*>> sites;
+        for(uint k = 0; k < instructions.size(); k++){
+            if(instructions[k].name() == "measure") continue;
+            for(auto pos : instructions[k].positions()){
+                for(auto channel : noise.channels(instructions[k].name(), pos)){
+                    sites.push_back(std::make_tuple(k, pos, channel));
+                }
+            }
+        }
+        uint clean_shots = 0;
+        vector<std::pair<uint, vector<std::pair<uint, uint>>>> patterns;
+        for(uint s = 0; s < shots; s++){
+            std::seed_seq seq{seed & 0xffffffff, seed >> 32, (uint64_t)s};
+            std::mt19937_64 rng(seq);
+            vector<std::pair<uint, uint>> pattern;
+            for(uint j = 0; j < sites.size(); j++){
+                uint pauli = sample_pauli(*std::get<2>(sites[j]), rng);
+                if(pauli != 0) pattern.push_back(std::make_pair(j, pauli));
+            }
+            if(pattern.empty()) clean_shots++;
+            else patterns.push_back(std::make_pair(s, std::move(pattern)));
+        }
+
+        if(clean_shots > 0){
+            std::seed_seq seq{seed & 0xffffffff, seed >> 32, (uint64_t)shots};
+            StateVector<data_t> state;
+            init_state(state, seq);
+            simulate(circuit, state);
+            vector<double> probs = state.probabilities();
+            std::discrete_distribution<size_t> dist(probs.begin(), probs.end());
+            for(uint s = 0; s < clean_shots; s++){
+                outcount[index_to_outcome(dist(state.rng()), measures, cbit_num, cbit_measured, noise, state.rng())]++;
+            }
+        }
+
+#pragma omp parallel if(parallel)
+        {
+            std::map<uint, uint> local_count;
+#pragma omp for schedule(dynamic)
+            for(omp_i t = 0; t < patterns.size(); t++){
+                auto const &pattern = patterns[t].second;
+                std::seed_seq seq{seed & 0xffffffff, seed >> 32, (uint64_t)patterns[t].first, (uint64_t)1};
+                StateVector<data_t> state;
+                init_state(state, seq);
+                uint next = 0;
+                for(uint k = 0; k < instructions.size(); k++){
+                    if(instructions[k].name() == "measure") continue;
+                    apply_op(instructions[k], state);
+                    while(next < pattern.size() && std::get<0>(sites[pattern[next].first]) == k){
+                        apply_pauli(pattern[next].second, std::get<1>(sites[pattern[next].first]), state);
+                        next++;
+                    }
+                }
+                size_t index = sample_index(state, state.rng());
+                local_count[index_to_outcome(index, measures, cbit_num, cbit_measured, noise, state.rng())]++;
+            }
+#pragma omp critical
+            for(auto &pair : local_count) outcount[pair.first] += pair.second;
+        }
+        return outcount;
+    }
+
+#pragma omp parallel if(parallel)
+    {
+        std::map<uint, uint> local_count;
+#pragma omp for schedule(dynamic)
+        for(omp_i s = 0; s < shots; s++){
+            std::seed_seq seq{seed & 0xffffffff, seed >> 32, (uint64_t)s};
+            StateVector<data_t> state;
+            init_state(state, seq);
+            for(auto op : instructions){
+                if(final_measure && op.name() == "measure") continue;
+                apply_noisy_op(op, state, noise);
+            }
+            uint outcome;
+            if(final_measure){
+                size_t index = sample_index(state, state.rng());
+                outcome = index_to_outcome(index, measures, cbit_num, cbit_measured, noise, state.rng());
+            }else{
+                outcome = creg_to_outcome(state.creg(), cbit_measured);
+            }
+            local_count[outcome]++;
+        }
+#pragma omp critical
+        for(auto &pair : local_count) outcount[pair.first] += pair.second;
+    }
+    return outcount;
+}
+
+// Bitstring of measured cbits, the first cbit is the leftmost character
+string creg_to_bitstring(vector<uint> const &creg, std::map<uint, bool> const &cbit_measured){
+    string bitstr;
+    for(auto &pair: cbit_measured){
+        bitstr.push_back(creg[pair.first] ? '1' : '0');
+    }
+    return bitstr;
+}
+
+// Stabilizer simulation of a Clifford circuit. Counts are keyed by bitstrings so that
+// circuits with thousands of measured qubits can be sampled. Outcomes of a terminal
+// measurement are affine in a few random bits, so shots are drawn from one symbolic
+// measurement and the probabilities of prob_qubits (first qubit is the most significant
+// bit) are enumerated exactly over that affine space.
+std::pair<std::map<string, uint>, vector<double>> simulate_circuit_clifford(py::object const&pycircuit, vector<pos_t> const &prob_qubits, const int &shots, const uint64_t &seed){
+    auto circuit = Circuit(pycircuit);
+    auto instructions = circuit.instructions();
+    vector<std::pair<uint,uint>> measures = circuit.measure_vec();
+    std::map<uint,bool> cbit_measured;
+    for(auto &pair: measures){
+        cbit_measured[pair.second] = true;
+    }
+    std::mt19937_64 rng(seed);
+    std::map<string, uint> outcount;
+    StabilizerState global_state;
+
+    if(circuit.final_measure()){
+        StabilizerState state(circuit.qubit_num(), circuit.cbit_num());
+        for(auto &op : instructions){
+            if(op.name() == "measure") continue;
+            apply_clifford_op(op, state, rng);
+        }
+        if(!measures.empty()){
+            StabilizerState sym_state = state;
+            sym_state.enable_symbolic(measures.size());
+            vector<vector<uint64_t>> outcomes;
+            for(auto &pair: measures){
+                outcomes.push_back(sym_state.measure_symbolic(pair.first));
+            }
+            uint num_vars = sym_state.num_vars();
+            vector<uint64_t> vars(outcomes[0].size(), 0);
+            vector<uint> creg(circuit.cbit_num(), 0);
+            for(int s = 0; s < shots; s++){
+                std::fill(vars.begin(), vars.end(), 0);
+                vars[0] = 1;
+                for(uint k = 1; k <= num_vars; k++){
+                    vars[k >> 6] |= (uint64_t)(rng() & 1) << (k & 63);
+                }
+                for(uint j = 0; j < measures.size(); j++){
+                    creg[measures[j].second] = eval_symbolic(outcomes[j], vars);
+                }
+                outcount[creg_to_bitstring(creg, cbit_measured)]++;
+            }
+        }
+        global_state = std::move(state);
+    }else{
+        for(int s = 0; s < shots; s++){
+            StabilizerState state(circuit.qubit_num(), circuit.cbit_num());
+            for(auto &op : instructions){
+                apply_clifford_op(op, state, rng);
+            }
+            if(!measures.empty()) outcount[creg_to_bitstring(state.creg(), cbit_measured)]++;
+            if(s == shots - 1) global_state = std::move(state);
+        }
+    }
+
+    vector<double> probs;
+    if(!prob_qubits.empty() && global_state.num() > 0){
+        // Outcome index is c0 ^ f_1 col_1 ^ ... ^ f_r col_r, walk the 2^r terms in Gray code order
+        const uint m = prob_qubits.size();
+        global_state.enable_symbolic(m);
+        size_t c0 = 0;
+        vector<size_t> cols(m, 0);
+        for(uint j = 0; j < m; j++){
+            auto outcome = global_state.measure_symbolic(prob_qubits[j]);
+            size_t bit = 1ULL << (m - 1 - j);
+            if(outcome[0] & 1) c0 |= bit;
+            for(uint k = 1; k <= m; k++){
+                if((outcome[k >> 6] >> (k & 63)) & 1) cols[k - 1] |= bit;
+            }
+        }
+        uint num_vars = global_state.num_vars();
+        probs.assign(1ULL << m, 0.);
+        double p = std::ldexp(1., -(int)num_vars);
+        size_t index = c0;
+        probs[index] = p;
+        for(size_t g = 1; g < (1ULL << num_vars); g++){
+            index ^= cols[Qfutil::ctz64(g)];
+            probs[index] = p;
+        }
+    }
+    return std::make_pair(outcount, probs);
+}
+
+// Simulate on the sparse engine, falling back to the dense engine when the state fills up.
+// Both counts and probabilities of prob_qubits are keyed by bitstrings, the first character
+// is the first qubit, so that circuits wider than a machine word can be reported.
+std::pair<std::map<string, uint>, std::map<string, double>> simulate_circuit_sparse(py::object const&pycircuit, vector<pos_t> const &prob_qubits, const int &shots, const uint64_t &seed, const double &tol, const double &fill, const uint &max_dense_qubits){
+    auto circuit = Circuit(pycircuit);
+    auto instructions = circuit.instructions();
+    vector<std::pair<uint,uint>> measures = circuit.measure_vec();
+    std::map<uint,bool> cbit_measured;
+    for(auto &pair: measures){
+        cbit_measured[pair.second] = true;
+    }
+    auto to_bitstring = [&](uint64_t key){
+        string bitstr(prob_qubits.size(), '0');
+        for(uint j = 0; j < prob_qubits.size(); j++){
+            if((key >> j) & 1ULL) bitstr[j] = '1';
+        }
+        return bitstr;
+    };
+    std::mt19937_64 rng(seed);
+    std::map<string, uint> outcount;
+    auto make_state = [&](){
+        return HybridState(circuit.qubit_num(), circuit.cbit_num(), tol, fill, max_dense_qubits, rng());
+    };
+
+    std::unordered_map<uint64_t, double> marginal;
+    if(circuit.final_measure()){
+        auto state = make_state();
+        for(auto &op : instructions){
+            if(op.name() == "measure") continue;
+            state.apply(op);
+        }
+        marginal = state.marginal(prob_qubits);
+        if(!measures.empty()){
+            vector<uint64_t> keys;
+            vector<double> probs;
+            for(auto &pair : marginal){
+                keys.push_back(pair.first);
+                probs.push_back(pair.second);
+            }
+            std::discrete_distribution<size_t> dist(probs.begin(), probs.end());
+            std::map<uint64_t, uint> tmpcount;
+            for(int s = 0; s < shots; s++) tmpcount[keys[dist(rng)]]++;
+            for(auto &pair : tmpcount) outcount[to_bitstring(pair.first)] = pair.second;
+        }
+    }else{
+        for(int s = 0; s < shots; s++){
+            auto state = make_state();
+            for(auto &op : instructions){
+                state.apply(op);
+            }
+            if(!measures.empty()) outcount[creg_to_bitstring(state.creg(), cbit_measured)]++;
+            if(s == shots - 1) marginal = state.marginal(prob_qubits);
+        }
+    }
+    std::map<string, double> probabilities;
+    for(auto &pair : marginal){
+        probabilities[to_bitstring(pair.first)] += pair.second;
+    }
+    return std::make_pair(outcount, probabilities);
+}
+
+// Adjoint differentiation of <H> with respect to every parameterized gate, in order of
+// appearance. After one forward pass, psi and lambda = H psi are carried backwards through
+// the inverse gates together, and each parameterized gate contributes 2 Im <lambda|G|psi>
+// of its generator G.
+std::pair<double, vector<double>> adjoint_gradient(py::object const&pycircuit, vector<string> const &paulis, vector<complex<double>> const &coeffs){
+    auto circuit = Circuit(pycircuit);
+    vector<QuantumOperator> gates;
+    for(auto &op : circuit.instructions()){
+        if(op.name() == "measure") continue;
+        if(op.name() == "reset" || op.name() == "cif")
+            throw std::invalid_argument("Adjoint gradient only supports unitary circuits");
+        gates.push_back(op);
+    }
+    uint num = circuit.qubit_num();
+    for(auto &pauli : paulis) num = std::max(num, (uint)pauli.size());
+
+    StateVector<data_t> psi;
+    psi.set_num(num);
+    for(auto &op : gates) apply_op(op, psi);
+
+    StateVector<data_t> lambda;
+    lambda.set_num(num);
+    auto l = lambda.data();
+    auto p = psi.data();
+    l[0] = 0.;
+    for(uint k = 0; k < paulis.size(); k++){
+        PauliMask mask(paulis[k]);
+        auto coeff = coeffs[k];
+#pragma omp parallel for
+        for(omp_i i = 0; i < (omp_i)psi.size(); i++){
+            l[i] += coeff * mask.element(i) * p[i ^ mask.x];
+        }
+    }
+    double expectation = pauli_inner(psi, lambda, PauliMask()).real();
+
+    vector<double> grads;
+    for(int k = (int)gates.size() - 1; k >= 0; k--){
+        if(!gates[k].paras().empty()) grads.push_back(generator_gradient(gates[k], lambda, psi));
+        if(k == 0) break;
+        apply_inverse_op(gates[k], psi);
+        apply_inverse_op(gates[k], lambda);
+    }
+    std::reverse(grads.begin(), grads.end());
+    return std::make_pair(expectation, grads);
+}
+
+// Simulate independent circuits with final states or probabilities of prob_qubits, all qubits if empty.
+// Circuits are run one per thread when none is wider than parallel_qubits, otherwise one after
+// another with parallel kernels. Returns the counts and the probabilities or statevector of each circuit.
+// Circuit k samples from a stream seeded by (seed, k), the 64 bit seed being split into two words.
+vector<std::pair<std::map<uint, uint>, py::array>> simulate_circuits(py::list const &pycircuits, vector<vector<pos_t>> prob_qubits, const uint shots, const uint64_t seed, const bool state_output, const uint parallel_qubits){
+    vector<Circuit> circuits;
+    uint max_num = 0;
+    for (auto pycircuit : pycircuits){
+        circuits.emplace_back(py::reinterpret_borrow<py::object>(pycircuit));
+        max_num = std::max(max_num, circuits.back().qubit_num());
+    }
+    const size_t n = circuits.size();
+    if (prob_qubits.size() != n)
+        throw std::invalid_argument("Number of circuits and measured qubit lists differ");
+    vector<std::map<uint, uint>> counts(n);
+    vector<vector<double>> probs(n);
+    vector<vector<complex<double>>> states(n);
+
+#pragma omp parallel for schedule(dynamic) if(max_num <= parallel_qubits)
+    for (omp_i k = 0; k < (omp_i)n; k++){
+        auto &circuit = circuits[k];
+        if (prob_qubits[k].empty()){
+            for (uint q = 0; q < circuit.qubit_num(); q++) prob_qubits[k].push_back(q);
+        }
+        auto measures = circuit.measure_vec();
+        std::map<uint, bool> cbit_measured;
+        for (auto &pair : measures) cbit_measured[pair.second] = true;
+
+        StateVector<data_t> state;
+        if (circuit.final_measure()){
+            std::seed_seq seq{seed & 0xffffffff, seed >> 32, (uint64_t)k};
+            state.set_rng(seq);
+            simulate(circuit, state);
+            probs[k] = marginal_probabilities(state, prob_qubits[k]);
+            if (!measures.empty()){
+                std::discrete_distribution<uint> dist(probs[k].begin(), probs[k].end());
+                for (uint s = 0; s < shots; s++) counts[k][dist(state.rng())]++;
+            }
+        }else{
+            for (uint s = 0; s < shots; s++){
+                std::seed_seq seq{seed & 0xffffffff, seed >> 32, (uint64_t)k, (uint64_t)s};
+                state = StateVector<data_t>();
+                state.set_rng(seq);
+                simulate(circuit, state);
+                counts[k][creg_to_outcome(state.creg(), cbit_measured)]++;
+            }
+            probs[k] = marginal_probabilities(state, prob_qubits[k]);
+        }
+        if (state_output) states[k].assign(state.data(), state.data() + state.size());
+    }
+
+    vector<std::pair<std::map<uint, uint>, py::array>> results;
+    for (size_t k = 0; k < n; k++){
+        py::array values;
+        if (state_output) values = py::array_t<complex<double>>(states[k].size(), states[k].data());
+        else values = py::array_t<double>(probs[k].size(), probs[k].data());
+        results.push_back(std::make_pair(std::move(counts[k]), values));
+    }
+    return results;
+}
+
+// Simulate a circuit with real amplitudes if is_real_circuit holds, returning whether it did, the counts
+// and the probabilities of prob_qubits (first qubit is the most significant bit, all qubits if empty)
+// or the real statevector. Other circuits are run by simulate_circuit on the same Circuit with
+// complex_fallback, returning its counts and complex statevector, and are not run otherwise.
+std::tuple<bool, std::map<uint, uint>, py::array> simulate_circuit_real(py::object const&pycircuit, vector<pos_t> prob_qubits, const uint shots, const uint64_t seed, const bool state_output, const uint fuse_min_run, const bool complex_fallback){
+    auto circuit = Circuit(pycircuit);
+    std::map<uint, uint> outcount;
+    if (!is_real_circuit(circuit)){
+        if (!complex_fallback) return std::make_tuple(false, outcount, py::array());
+        py::array_t<complex<double>> inputstate(0);
+        auto result = simulate_circuit_impl(circuit, inputstate, shots, nullptr, fuse_min_run);
+        return std::make_tuple(false, result.first, py::array(result.second));
+    }
+    if (fuse_min_run > 0) circuit.fuse_reversible(fuse_min_run, std::min(circuit.qubit_num(), MAX_FUSED_QUBITS));
+    RealStateVector state(circuit.qubit_num());
+    simulate(circuit, state);
+    if (prob_qubits.empty()){
+        for (uint q = 0; q < circuit.qubit_num(); q++) prob_qubits.push_back(q);
+    }
+    vector<double> probs;
+    if (!circuit.measure_vec().empty() || !state_output) probs = state.probabilities(prob_qubits);
+    if (!circuit.measure_vec().empty()){
+        std::mt19937_64 rng(seed);
+        std::discrete_distribution<uint> dist(probs.begin(), probs.end());
+        for (uint s = 0; s < shots; s++) outcount[dist(rng)]++;
+    }
+    if (state_output) return std::make_tuple(true, outcount, to_numpy(state.move_data_to_python()));
+    return std::make_tuple(true, outcount, py::array_t<double>(probs.size(), probs.data()));
+}
+
+// Run the instructions from index start on the input state (|0> if empty), returning the final state and copies
+// of the states right after the instructions listed in save_at. If on_save is given, it is called instead with the
+// instruction index and a view of the live state, valid only during the call. Terminal measurements are skipped,
+// the circuit must not contain other non-unitary operations.
+std::pair<py::array_t<complex<double>>, vector<py::array_t<complex<double>>>> simulate_circuit_from(py::object const&pycircuit, py::array_t<complex<double>> &np_inputstate, const uint &start, vector<uint> const &save_at, py::object const&on_save){
+    auto circuit = Circuit(pycircuit);
+    auto instructions = circuit.instructions();
+    py::buffer_info buf = np_inputstate.request();
+    auto* data_ptr = reinterpret_cast<std::complex<double>*>(buf.ptr);
+
+    StateVector<data_t> state;
+    if(buf.size == 0){
+        state.set_num(circuit.qubit_num());
+    }else{
+        state.set_num(static_cast<uint>(std::log2(buf.size)));
+        std::copy(data_ptr, data_ptr + buf.size, state.data());
+    }
+    vector<py::array_t<complex<double>>> checkpoints;
+    uint next = 0;
+    for(uint k = start; k < instructions.size(); k++){
+        auto &op = instructions[k];
+        if(op.name() == "reset" || op.name() == "cif")
+            throw std::invalid_argument("Checkpointed simulation only supports unitary circuits");
+        if(op.name() != "measure" && op.name() != "snapshot") apply_op(op, state);
+        while(next < save_at.size() && save_at[next] <= k){
+            if(save_at[next] == k && !on_save.is_none()){
+                auto view = py::array_t<complex<double>>(state.size(), state.data(), py::capsule(state.data(), [](void*) {}));
+                on_save(k, view);
+            }else if(save_at[next] == k){
+                py::array_t<complex<double>> copy(state.size());
+                std::copy(state.data(), state.data() + state.size(), copy.mutable_data());
+                checkpoints.push_back(std::move(copy));
+            }
+            next++;
+        }
+    }
+    return std::make_pair(to_numpy(state.move_data_to_python()), checkpoints);
 }
 
 #ifdef _USE_GPU
@@ -151,7 +676,22 @@ py::object simulate_circuit_custate(py::object const&pycircuit, py::array_t<comp
 
 PYBIND11_MODULE(qfvm, m) {
     m.doc() = "Qfvm simulator";
-    m.def("simulate_circuit", &simulate_circuit, "Simulate with circuit", py::arg("circuit"), py::arg("inputstate")= py::array_t<complex<double>>(0), py::arg("shots"));
+    py::register_exception<QasmUnsupported>(m, "QasmUnsupportedError", PyExc_ValueError);
+    m.def("simulate_circuit", &simulate_circuit, "Simulate with circuit", py::arg("circuit"), py::arg("inputstate")= py::array_t<complex<double>>(0), py::arg("shots"), py::arg("fuse_min_run")=0);
+    m.def("simulate_qasm", &simulate_qasm, "Simulate flat OpenQASM 2 source parsed natively", py::arg("source"), py::arg("inputstate")= py::array_t<complex<double>>(0), py::arg("shots"), py::arg("fuse_min_run")=0);
+    m.def("simulate_unitary", &simulate_unitary, "Unitary of circuit in big endian convention", py::arg("circuit"), py::arg("num"));
+    m.def("unitary_equivalent", &unitary_equivalent, "Check circuit equals the reference circuit column by column", py::arg("circuit"), py::arg("reference"), py::arg("num"), py::arg("atol"), py::arg("up_to_phase"));
+    m.def("unitary_equivalent_matrix", &unitary_equivalent_matrix, "Check circuit equals the reference matrix column by column", py::arg("circuit"), py::arg("reference"), py::arg("num"), py::arg("atol"), py::arg("up_to_phase"));
+    m.def("batch_statevectors", &batch_statevectors, "Final statevectors of circuits as rows", py::arg("circuits"), py::arg("num"));
+    m.def("fidelity_matrix", &fidelity_matrix, "Squared overlaps between rows of two state matrices", py::arg("a"), py::arg("b"));
+    m.def("simulate_circuits", &simulate_circuits, "Simulate independent circuits in parallel", py::arg("circuits"), py::arg("prob_qubits"), py::arg("shots"), py::arg("seed"), py::arg("state_output"), py::arg("parallel_qubits"));
+    m.def("simulate_circuit_snapshots", &simulate_circuit_snapshots, "Simulate with circuit and record snapshots", py::arg("circuit"), py::arg("inputstate")= py::array_t<complex<double>>(0), py::arg("shots"));
+    m.def("simulate_circuit_noisy", &simulate_circuit_noisy, "Simulate noisy circuit with quantum trajectories", py::arg("circuit"), py::arg("noise_model"), py::arg("shots"), py::arg("seed"));
+    m.def("simulate_circuit_clifford", &simulate_circuit_clifford, "Simulate Clifford circuit with stabilizer tableau", py::arg("circuit"), py::arg("prob_qubits"), py::arg("shots"), py::arg("seed"));
+    m.def("simulate_circuit_sparse", &simulate_circuit_sparse, "Simulate circuit with sparse amplitudes", py::arg("circuit"), py::arg("prob_qubits"), py::arg("shots"), py::arg("seed"), py::arg("tol"), py::arg("fill"), py::arg("max_dense_qubits"));
+    m.def("adjoint_gradient", &adjoint_gradient, "Expectation and gradients of parameterized gates by adjoint differentiation", py::arg("circuit"), py::arg("paulis"), py::arg("coeffs"));
+    m.def("simulate_circuit_real", &simulate_circuit_real, "Simulate circuit with real amplitudes if all its gates are real", py::arg("circuit"), py::arg("prob_qubits"), py::arg("shots"), py::arg("seed"), py::arg("state_output"), py::arg("fuse_min_run")=0, py::arg("complex_fallback")=false);
+    m.def("simulate_circuit_from", &simulate_circuit_from, "Simulate circuit from an instruction index and keep or hand over intermediate states", py::arg("circuit"), py::arg("inputstate"), py::arg("start"), py::arg("save_at"), py::arg("on_save")=py::none());
 
     #ifdef _USE_GPU
      m.def("simulate_circuit_gpu", &simulate_circuit_gpu, "Simulate with circuit", py::arg("circuit"), py::arg("inputstate")= py::array_t<complex<double>>(0));
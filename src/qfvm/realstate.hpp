@@ -0,0 +1,162 @@
+#pragma once
+
+#include "simulator.hpp"
+
+// Statevector with real amplitudes, for circuits whose gates all have real matrices
+// (RY, H, X, CX, CZ, SWAP, ...). It takes half the memory of StateVector and every
+// gate moves half as many bytes.
+class RealStateVector{
+    private:
+        uint num_;
+        size_t size_;
+        std::unique_ptr<double[]> data_;
+
+    public:
+        explicit RealStateVector(uint num);
+
+        // mat index bit j is targs[j], the gate acts where all control qubits are set
+        void apply_one_targe_gate(pos_t targ, uint64_t ctrl_mask, RowMatrixXd const &mat);
+        void apply_multi_targe_gate(vector<pos_t> const &posv, uint control_num, RowMatrixXd const &mat);
+        vector<double> probabilities(vector<pos_t> const &qubits) const;
+
+        std::tuple<double*, size_t> move_data_to_python() {
+            auto data_ptr = data_.release();
+            return std::make_tuple(std::move(data_ptr), size_);
+        }
+
+        double* data(){ return data_.get(); }
+        size_t size() const { return size_; }
+        uint num() const { return num_; }
+};
+
+RealStateVector::RealStateVector(uint num)
+:
+num_(num),
+size_(1ULL << num)
+{
+    data_ = std::make_unique<double[]>(size_);
+    data_[0] = 1.;
+}
+
+void RealStateVector::apply_one_targe_gate(pos_t targ, uint64_t ctrl_mask, RowMatrixXd const &mat){
+    const double m00 = mat(0, 0), m01 = mat(0, 1), m10 = mat(1, 0), m11 = mat(1, 1);
+    const size_t half = 1ULL << targ;
+    const size_t blocks = size_ >> (targ + 1);
+    auto data = data_.get();
+    // Inner loops run over contiguous amplitudes with the target bit cleared
+    auto sweep = [&](auto update){
+#pragma omp parallel for
+        for (omp_i r = 0; r < (omp_i)blocks; r++){
+            const size_t base = r << (targ + 1);
+            double *lo = data + base;
+            double *hi = lo + half;
+            if (ctrl_mask == 0){
+                for (size_t j = 0; j < half; j++) update(lo[j], hi[j]);
+            }else{
+                for (size_t j = 0; j < half; j++){
+                    if (((base | j) & ctrl_mask) == ctrl_mask) update(lo[j], hi[j]);
+                }
+            }
+        }
+    };
+    if (m00 == 0. && m11 == 0. && m01 == 1. && m10 == 1.){
+        sweep([](double &a, double &b){ std::swap(a, b); });
+    }else if (m01 == 0. && m10 == 0.){
+        sweep([=](double &a, double &b){ a *= m00; b *= m11; });
+    }else{
+        sweep([=](double &a, double &b){
+            const double x = a, y = b;
+            a = m00 * x + m01 * y;
+            b = m10 * x + m11 * y;
+        });
+    }
+}
+
+void RealStateVector::apply_multi_targe_gate(vector<pos_t> const &posv, uint control_num, RowMatrixXd const &mat){
+    vector<pos_t> targs(posv.begin() + control_num, posv.end());
+    uint64_t ctrl_mask = 0;
+    for (uint k = 0; k < control_num; k++) ctrl_mask |= 1ULL << posv[k];
+    if (targs.size() == 1){
+        apply_one_targe_gate(targs[0], ctrl_mask, mat);
+        return;
+    }
+    auto posv_sorted = posv;
+    std::sort(posv_sorted.begin(), posv_sorted.end());
+    const size_t matsize = 1ULL << targs.size();
+    vector<size_t> targ_mask(matsize, 0);
+    for (size_t m = 0; m < matsize; m++){
+        for (size_t j = 0; j < targs.size(); j++){
+            if ((m >> j) & 1) targ_mask[m] |= 1ULL << targs[j];
+        }
+    }
+    const size_t rsize = size_ >> posv.size();
+    auto data = data_.get();
+#pragma omp parallel
+    {
+        Eigen::VectorXd block(matsize);
+#pragma omp for
+        for (omp_i j = 0; j < (omp_i)rsize; j++){
+            size_t i = j;
+            for (auto q : posv_sorted) i = (i & ((1ULL << q) - 1)) | ((i >> q) << (q + 1));
+            i |= ctrl_mask;
+            for (size_t m = 0; m < matsize; m++) block(m) = data[i | targ_mask[m]];
+            Eigen::VectorXd result = mat * block;
+            for (size_t m = 0; m < matsize; m++) data[i | targ_mask[m]] = result(m);
+        }
+    }
+}
+
+vector<double> RealStateVector::probabilities(vector<pos_t> const &qubits) const{
+    // outcome of index i is the sum of lookups on its bytes
+    const uint bytes = (num_ + 7) / 8;
+    vector<vector<size_t>> lookup(bytes, vector<size_t>(256, 0));
+    const uint k = qubits.size();
+    for (uint j = 0; j < k; j++){
+        const uint b = qubits[j] / 8, shift = qubits[j] % 8;
+        for (size_t v = 0; v < 256; v++){
+            if ((v >> shift) & 1) lookup[b][v] |= 1ULL << (k - 1 - j);
+        }
+    }
+    auto outcome = [&](size_t i){
+        size_t out = 0;
+        for (uint b = 0; b < bytes; b++) out |= lookup[b][(i >> (8 * b)) & 255];
+        return out;
+    };
+    vector<double> probs(1ULL << k, 0.);
+    auto data = data_.get();
+    if (k == num_){
+        // every index has its own outcome
+#pragma omp parallel for
+        for (omp_i i = 0; i < (omp_i)size_; i++) probs[outcome(i)] = data[i] * data[i];
+    }else{
+        for (size_t i = 0; i < size_; i++) probs[outcome(i)] += data[i] * data[i];
+    }
+    return probs;
+}
+
+// Whether the circuit keeps real amplitudes: only gates with real matrices and permutations,
+// measurements at the end, and no reset, cif or snapshot
+bool is_real_circuit(Circuit const &circuit){
+    if (!circuit.final_measure()) return false;
+    for (auto const &op : circuit.instructions()){
+        if (op.name() == "measure" || op.name() == "permutation") continue;
+        if (op.name() == "reset" || op.name() == "cif" || op.name() == "snapshot") return false;
+        if (op.mat().size() == 0 || !op.mat().imag().isZero(0.)) return false;
+    }
+    return true;
+}
+
+void apply_real_op(QuantumOperator const &op, RealStateVector &state){
+    if (op.name() == "permutation"){
+        apply_permutation(op.positions(), op.table(), state);
+    }else{
+        state.apply_multi_targe_gate(op.positions(), op.control_num(), op.mat().real());
+    }
+}
+
+void simulate(Circuit const &circuit, RealStateVector &state){
+    for (auto const &op : circuit.instructions()){
+        if (op.name() == "measure") continue;
+        apply_real_op(op, state);
+    }
+}
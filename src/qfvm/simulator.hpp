@@ -1,7 +1,9 @@
 #pragma once
+#include <functional>
 
 #include "statevector.hpp"
 #include "circuit.hpp"
+#include "permutation.hpp"
 
 void apply_op(QuantumOperator &op, StateVector<data_t> &state){
     bool matched = false; 
@@ -71,6 +73,9 @@ void apply_op(QuantumOperator &op, StateVector<data_t> &state){
         case Opname::reset:
             state.apply_reset(op.qbits());
             break;
+        case Opname::permutation:
+            apply_permutation(op.positions(), op.table(), state);
+            break;
         case Opname::cif:
             // check cbits and condition
             matched = state.check_cif(op.cbits(), op.condition());
@@ -103,14 +108,30 @@ void apply_op(QuantumOperator &op, StateVector<data_t> &state){
     }
 }
 
-void simulate(Circuit const& circuit, StateVector<data_t> & state){
+// on_snapshot is called with the snapshot instructions, which are skipped if it is empty
+void simulate(Circuit const& circuit, StateVector<data_t> & state, std::function<void(QuantumOperator &)> const &on_snapshot = nullptr){
     state.set_num(circuit.qubit_num());
     state.set_creg(circuit.cbit_num());
     // skip measure and handle it in qfvm.cpp 
     bool skip_measure = circuit.final_measure();
     for (auto op : circuit.instructions()){
         if(skip_measure == true && op.name() == "measure") continue;
+        if(op.name() == "snapshot"){
+            if(on_snapshot) on_snapshot(op);
+            continue;
+        }
         apply_op(op , state);
     }
 }
 
+// Probabilities of the outcomes of qubits, the first qubit is the most significant bit
+vector<double> marginal_probabilities(StateVector<data_t> &state, vector<pos_t> const &qubits){
+    auto data = state.data();
+    vector<double> probs(1ULL << qubits.size(), 0.);
+    for (size_t i = 0; i < state.size(); i++){
+        size_t outcome = 0;
+        for (auto q : qubits) outcome = (outcome << 1) | ((i >> q) & 1);
+        probs[outcome] += std::norm(data[i]);
+    }
+    return probs;
+}
@@ -0,0 +1,25 @@
+#pragma once
+
+#include "adjoint.hpp"
+
+// Value of a snapshot on the current state, the state is left untouched
+py::object snapshot_value(SnapshotSpec const &spec, StateVector<data_t> &state){
+    auto data = state.data();
+    if (spec.kind == "statevector"){
+        py::array_t<complex<double>> psi(state.size());
+        std::copy(data, data + state.size(), psi.mutable_data());
+        return psi;
+    }
+    if (spec.kind == "probabilities"){
+        auto probs = marginal_probabilities(state, spec.qubits);
+        return py::array_t<double>(probs.size(), probs.data());
+    }
+    if (spec.kind == "expval"){
+        complex<double> expval = 0.;
+        for (uint k = 0; k < spec.paulis.size(); k++){
+            expval += spec.coeffs[k] * pauli_inner(state, state, PauliMask(spec.paulis[k]));
+        }
+        return py::float_(expval.real());
+    }
+    throw std::invalid_argument("Unknown snapshot kind " + spec.kind);
+}
@@ -0,0 +1,269 @@
+#pragma once
+
+#include "simulator.hpp"
+#include <unordered_map>
+
+// State stored as a list of (basis index, amplitude) pairs without duplicated
+// indices. Gates whose matrix has one nonzero per column (X, CX, Toffoli, SWAP,
+// phase and diagonal gates) only rewrite indices and amplitudes in place, other
+// gates expand every entry and drop amplitudes below the tolerance.
+class SparseState{
+    private:
+        uint num_;
+        vector<uint> creg_;
+        vector<std::pair<uint64_t, complex<double>>> data_;
+        double tol_;
+        std::mt19937_64 rng_;
+
+        static uint64_t gather_bits(uint64_t index, vector<pos_t> const &qbits);
+        static uint64_t scatter_bits(uint64_t value, vector<pos_t> const &qbits);
+        void apply_monomial(uint64_t ctrl_mask, vector<pos_t> const &targs, RowMatrixXcd const &mat);
+        void apply_dense_block(uint64_t ctrl_mask, vector<pos_t> const &targs, RowMatrixXcd const &mat);
+
+    public:
+        SparseState(uint num, uint cbit_num, double tol, uint64_t seed);
+
+        uint num() const { return num_; }
+        size_t size() const { return data_.size(); }
+        vector<uint> creg() const { return creg_; }
+        vector<std::pair<uint64_t, complex<double>>> const& data() const { return data_; }
+        std::mt19937_64& rng(){ return rng_; }
+
+        // ctrl_mask selects indices with all control bits set, mat index bit j is targs[j]
+        void apply_gate(uint64_t ctrl_mask, vector<pos_t> const &targs, RowMatrixXcd const &mat);
+        // table[x] is the image of x whose most significant bit is qbits[0]
+        void apply_permutation(vector<pos_t> const &qbits, vector<size_t> const &table);
+        uint apply_measure(pos_t qbit);
+        void apply_measure(vector<pos_t> const &qbits, vector<pos_t> const &cbits);
+        void apply_reset(vector<pos_t> const &qbits);
+        bool check_cif(vector<pos_t> const &cbits, const uint condition);
+        void to_dense(StateVector<data_t> &state) const;
+};
+
+SparseState::SparseState(uint num, uint cbit_num, double tol, uint64_t seed)
+:
+num_(num),
+creg_(cbit_num, 0),
+tol_(tol),
+rng_(seed)
+{
+    if (num > 64) throw std::invalid_argument("Sparse simulator supports at most 64 qubits");
+    data_.push_back(std::make_pair(0ULL, complex<double>(1., 0.)));
+}
+
+uint64_t SparseState::gather_bits(uint64_t index, vector<pos_t> const &qbits){
+    uint64_t value = 0;
+    for (uint j = 0; j < qbits.size(); j++){
+        value |= ((index >> qbits[j]) & 1ULL) << j;
+    }
+    return value;
+}
+
+uint64_t SparseState::scatter_bits(uint64_t value, vector<pos_t> const &qbits){
+    uint64_t index = 0;
+    for (uint j = 0; j < qbits.size(); j++){
+        index |= ((value >> j) & 1ULL) << qbits[j];
+    }
+    return index;
+}
+
+void SparseState::apply_gate(uint64_t ctrl_mask, vector<pos_t> const &targs, RowMatrixXcd const &mat){
+    const size_t dim = mat.rows();
+    bool monomial = true;
+    for (size_t c = 0; c < dim && monomial; c++){
+        uint nonzero = 0;
+        for (size_t r = 0; r < dim; r++){
+            if (std::abs(mat(r, c)) > 0) nonzero++;
+        }
+        monomial = nonzero == 1;
+    }
+    if (monomial) apply_monomial(ctrl_mask, targs, mat);
+    else apply_dense_block(ctrl_mask, targs, mat);
+}
+
+void SparseState::apply_monomial(uint64_t ctrl_mask, vector<pos_t> const &targs, RowMatrixXcd const &mat){
+    const size_t dim = mat.rows();
+    const uint64_t targ_mask = scatter_bits(dim - 1, targs);
+    vector<std::pair<uint64_t, complex<double>>> column(dim);
+    for (size_t c = 0; c < dim; c++){
+        for (size_t r = 0; r < dim; r++){
+            if (std::abs(mat(r, c)) > 0) column[c] = std::make_pair(scatter_bits(r, targs), mat(r, c));
+        }
+    }
+    for (auto &item : data_){
+        if ((item.first & ctrl_mask) != ctrl_mask) continue;
+        auto const &entry = column[gather_bits(item.first, targs)];
+        item.first = (item.first & ~targ_mask) | entry.first;
+        item.second *= entry.second;
+    }
+}
+
+void SparseState::apply_dense_block(uint64_t ctrl_mask, vector<pos_t> const &targs, RowMatrixXcd const &mat){
+    const size_t dim = mat.rows();
+    const uint64_t targ_mask = scatter_bits(dim - 1, targs);
+    // Group entries by the index with target bits cleared, each group is one block of dim amplitudes
+    std::unordered_map<uint64_t, size_t> blocks;
+    blocks.reserve(data_.size());
+    vector<uint64_t> bases;
+    vector<complex<double>> amps;
+    vector<std::pair<uint64_t, complex<double>>> result;
+    for (auto const &item : data_){
+        if ((item.first & ctrl_mask) != ctrl_mask){
+            result.push_back(item);
+            continue;
+        }
+        uint64_t base = item.first & ~targ_mask;
+        auto it = blocks.find(base);
+        size_t block;
+        if (it == blocks.end()){
+            block = bases.size();
+            blocks.emplace(base, block);
+            bases.push_back(base);
+            amps.resize(amps.size() + dim, 0.);
+        }else{
+            block = it->second;
+        }
+        amps[block * dim + gather_bits(item.first, targs)] = item.second;
+    }
+    for (size_t b = 0; b < bases.size(); b++){
+        for (size_t r = 0; r < dim; r++){
+            complex<double> amp = 0.;
+            for (size_t c = 0; c < dim; c++) amp += mat(r, c) * amps[b * dim + c];
+            if (std::norm(amp) > tol_) result.push_back(std::make_pair(bases[b] | scatter_bits(r, targs), amp));
+        }
+    }
+    data_ = std::move(result);
+}
+
+void SparseState::apply_permutation(vector<pos_t> const &qbits, vector<size_t> const &table){
+    const vector<pos_t> targs(qbits.rbegin(), qbits.rend());
+    const uint64_t targ_mask = scatter_bits(table.size() - 1, targs);
+    for (auto &item : data_){
+        item.first = (item.first & ~targ_mask) | scatter_bits(table[gather_bits(item.first, targs)], targs);
+    }
+}
+
+uint SparseState::apply_measure(pos_t qbit){
+    const uint64_t mask = 1ULL << qbit;
+    double p1 = 0.;
+    for (auto const &item : data_){
+        if (item.first & mask) p1 += std::norm(item.second);
+    }
+    uint outcome = std::uniform_real_distribution<double>(0., 1.)(rng_) < p1 ? 1 : 0;
+    double norm = std::sqrt(outcome ? p1 : 1. - p1);
+    vector<std::pair<uint64_t, complex<double>>> result;
+    for (auto const &item : data_){
+        if (((item.first & mask) != 0) == (outcome == 1)) result.push_back(std::make_pair(item.first, item.second / norm));
+    }
+    data_ = std::move(result);
+    return outcome;
+}
+
+void SparseState::apply_measure(vector<pos_t> const &qbits, vector<pos_t> const &cbits){
+    for (uint j = 0; j < qbits.size(); j++){
+        creg_[cbits[j]] = apply_measure(qbits[j]);
+    }
+}
+
+void SparseState::apply_reset(vector<pos_t> const &qbits){
+    for (auto q : qbits){
+        if (apply_measure(q) == 1){
+            for (auto &item : data_) item.first ^= 1ULL << q;
+        }
+    }
+}
+
+bool SparseState::check_cif(vector<pos_t> const &cbits, const uint condition){
+    uint out = 0;
+    for (uint i = 0; i < cbits.size(); i++){
+        out *= 2;
+        out += creg_[cbits[i]];
+    }
+    return out == condition;
+}
+
+void SparseState::to_dense(StateVector<data_t> &state) const{
+    state.set_num(num_);
+    state.set_creg(creg_.size());
+    for (uint j = 0; j < creg_.size(); j++) state.set_cbit(j, creg_[j]);
+    auto dense = state.data();
+    dense[0] = 0.;
+    for (auto const &item : data_) dense[item.first] = item.second;
+}
+
+void apply_sparse_op(QuantumOperator &op, SparseState &state){
+    if (op.name() == "measure"){
+        state.apply_measure(op.qbits(), op.cbits());
+    }else if (op.name() == "reset"){
+        state.apply_reset(op.qbits());
+    }else if (op.name() == "cif"){
+        if (state.check_cif(op.cbits(), op.condition())){
+            for (auto op_h : op.instructions()){
+                apply_sparse_op(op_h, state);
+            }
+        }
+    }else if (op.name() == "permutation"){
+        state.apply_permutation(op.positions(), op.table());
+    }else{
+        auto positions = op.positions();
+        uint64_t ctrl_mask = 0;
+        for (uint j = 0; j < op.control_num(); j++) ctrl_mask |= 1ULL << positions[j];
+        vector<pos_t> targs(positions.begin() + op.control_num(), positions.end());
+        state.apply_gate(ctrl_mask, targs, op.mat());
+    }
+}
+
+// Runs a circuit on the sparse engine and moves to the dense engine once the number
+// of nonzero amplitudes exceeds fill * 2^n, measurements are left to the caller if skip_measure
+class HybridState{
+    private:
+        SparseState sparse_;
+        StateVector<data_t> dense_;
+        bool is_dense_ = false;
+        double fill_;
+        uint max_dense_qubits_;
+
+    public:
+        HybridState(uint num, uint cbit_num, double tol, double fill, uint max_dense_qubits, uint64_t seed)
+        : sparse_(num, cbit_num, tol, seed), fill_(fill), max_dense_qubits_(max_dense_qubits){}
+
+        bool is_dense() const { return is_dense_; }
+        SparseState& sparse(){ return sparse_; }
+        StateVector<data_t>& dense(){ return dense_; }
+        vector<uint> creg(){ return is_dense_ ? dense_.creg() : sparse_.creg(); }
+
+        void apply(QuantumOperator &op){
+            if (is_dense_){
+                apply_op(op, dense_);
+                return;
+            }
+            apply_sparse_op(op, sparse_);
+            uint num = sparse_.num();
+            if (num <= max_dense_qubits_ && sparse_.size() > fill_ * std::ldexp(1., num)){
+                std::seed_seq seq{sparse_.rng()()};
+                dense_.set_rng(seq);
+                sparse_.to_dense(dense_);
+                is_dense_ = true;
+            }
+        }
+
+        // Probability of each outcome of qbits, bit j of the key is qbits[j]
+        std::unordered_map<uint64_t, double> marginal(vector<pos_t> const &qbits){
+            std::unordered_map<uint64_t, double> probs;
+            auto add = [&](uint64_t index, double p){
+                uint64_t key = 0;
+                for (uint j = 0; j < qbits.size(); j++) key |= ((index >> qbits[j]) & 1ULL) << j;
+                probs[key] += p;
+            };
+            if (is_dense_){
+                auto data = dense_.data();
+                for (size_t i = 0; i < dense_.size(); i++){
+                    double p = std::norm(data[i]);
+                    if (p > 0) add(i, p);
+                }
+            }else{
+                for (auto const &item : sparse_.data()) add(item.first, std::norm(item.second));
+            }
+            return probs;
+        }
+};
@@ -0,0 +1,314 @@
+#pragma once
+
+#include "circuit.hpp"
+#include <random>
+
+// Aaronson-Gottesman (CHP) tableau of a stabilizer state, bit-packed over qubits.
+// Rows [0, n) are destabilizers, rows [n, 2n) stabilizers and row 2n is scratch.
+// The phase of every row is stored as a bit vector: bit 0 is the sign and, when
+// measuring symbolically, bit k+1 is the coefficient of the k-th random outcome.
+class StabilizerState{
+    private:
+        uint num_;
+        size_t words_;
+        size_t pwords_ = 1;
+        vector<uint64_t> x_;
+        vector<uint64_t> z_;
+        vector<uint64_t> phase_;
+        uint num_vars_ = 0;
+        vector<uint> creg_;
+
+        uint64_t* x(size_t row){ return x_.data() + row * words_; }
+        uint64_t* z(size_t row){ return z_.data() + row * words_; }
+        uint64_t* phase(size_t row){ return phase_.data() + row * pwords_; }
+        bool xbit(size_t row, pos_t q){ return (x(row)[q >> 6] >> (q & 63)) & 1; }
+        bool zbit(size_t row, pos_t q){ return (z(row)[q >> 6] >> (q & 63)) & 1; }
+
+        void rowcopy(size_t h, size_t i);
+        void rowset_z(size_t h, pos_t q);
+        void rowsum(size_t h, size_t i);
+
+    public:
+        StabilizerState(){};
+        StabilizerState(uint num, uint cbit_num);
+
+        uint num() const { return num_; }
+        vector<uint> creg() const { return creg_; }
+
+        void apply_h(pos_t q);
+        void apply_s(pos_t q);
+        void apply_sdag(pos_t q);
+        void apply_x(pos_t q);
+        void apply_y(pos_t q);
+        void apply_z(pos_t q);
+        void apply_cnot(pos_t c, pos_t t);
+        void apply_cz(pos_t a, pos_t b);
+        void apply_cy(pos_t c, pos_t t);
+        void apply_swap(pos_t a, pos_t b);
+
+        uint apply_measure(pos_t q, std::mt19937_64 &rng);
+        void apply_measure(vector<pos_t> const &qbits, vector<pos_t> const &cbits, std::mt19937_64 &rng);
+        void apply_reset(vector<pos_t> const &qbits, std::mt19937_64 &rng);
+        bool check_cif(vector<pos_t> const &cbits, const uint condition);
+
+        // Symbolic measurement, outcome returned as an affine function of random bits
+        void enable_symbolic(uint max_vars);
+        vector<uint64_t> measure_symbolic(pos_t q);
+        uint num_vars() const { return num_vars_; }
+};
+
+StabilizerState::StabilizerState(uint num, uint cbit_num)
+:
+num_(num),
+words_((num + 63) >> 6),
+creg_(cbit_num, 0)
+{
+    x_.assign((2 * num + 1) * words_, 0);
+    z_.assign((2 * num + 1) * words_, 0);
+    phase_.assign(2 * num + 1, 0);
+    for (pos_t q = 0; q < num; q++){
+        x(q)[q >> 6] |= 1ULL << (q & 63);
+        z(q + num)[q >> 6] |= 1ULL << (q & 63);
+    }
+}
+
+void StabilizerState::rowcopy(size_t h, size_t i){
+    std::copy(x(i), x(i) + words_, x(h));
+    std::copy(z(i), z(i) + words_, z(h));
+    std::copy(phase(i), phase(i) + pwords_, phase(h));
+}
+
+void StabilizerState::rowset_z(size_t h, pos_t q){
+    std::fill(x(h), x(h) + words_, 0);
+    std::fill(z(h), z(h) + words_, 0);
+    std::fill(phase(h), phase(h) + pwords_, 0);
+    z(h)[q >> 6] |= 1ULL << (q & 63);
+}
+
+// Left multiply row h by row i, the sign is accumulated word by word
+void StabilizerState::rowsum(size_t h, size_t i){
+    int g = 0;
+    uint64_t *x1 = x(i), *z1 = z(i), *x2 = x(h), *z2 = z(h);
+    for (size_t w = 0; w < words_; w++){
+        uint64_t a = x1[w], b = z1[w], c = x2[w], d = z2[w];
+        uint64_t plus = (a & b & ~c & d) | (a & ~b & c & d) | (~a & b & c & ~d);
+        uint64_t minus = (a & b & c & ~d) | (a & ~b & ~c & d) | (~a & b & c & d);
+        g += (int)Qfutil::popcount64(plus) - (int)Qfutil::popcount64(minus);
+        x2[w] = a ^ c;
+        z2[w] = b ^ d;
+    }
+    uint64_t *p1 = phase(i), *p2 = phase(h);
+    for (size_t w = 0; w < pwords_; w++) p2[w] ^= p1[w];
+    if (((g % 4) + 4) % 4 == 2) p2[0] ^= 1;
+}
+
+void StabilizerState::apply_h(pos_t q){
+    const size_t w = q >> 6;
+    const uint64_t m = 1ULL << (q & 63);
+    for (size_t row = 0; row < 2 * num_; row++){
+        uint64_t &xw = x(row)[w], &zw = z(row)[w];
+        if ((xw & m) && (zw & m)) phase(row)[0] ^= 1;
+        uint64_t t = (xw ^ zw) & m;
+        xw ^= t;
+        zw ^= t;
+    }
+}
+
+void StabilizerState::apply_s(pos_t q){
+    const size_t w = q >> 6;
+    const uint64_t m = 1ULL << (q & 63);
+    for (size_t row = 0; row < 2 * num_; row++){
+        uint64_t &xw = x(row)[w], &zw = z(row)[w];
+        if ((xw & m) && (zw & m)) phase(row)[0] ^= 1;
+        zw ^= xw & m;
+    }
+}
+
+void StabilizerState::apply_sdag(pos_t q){
+    const size_t w = q >> 6;
+    const uint64_t m = 1ULL << (q & 63);
+    for (size_t row = 0; row < 2 * num_; row++){
+        uint64_t &xw = x(row)[w], &zw = z(row)[w];
+        if ((xw & m) && !(zw & m)) phase(row)[0] ^= 1;
+        zw ^= xw & m;
+    }
+}
+
+void StabilizerState::apply_x(pos_t q){
+    for (size_t row = 0; row < 2 * num_; row++){
+        if (zbit(row, q)) phase(row)[0] ^= 1;
+    }
+}
+
+void StabilizerState::apply_y(pos_t q){
+    for (size_t row = 0; row < 2 * num_; row++){
+        if (xbit(row, q) ^ zbit(row, q)) phase(row)[0] ^= 1;
+    }
+}
+
+void StabilizerState::apply_z(pos_t q){
+    for (size_t row = 0; row < 2 * num_; row++){
+        if (xbit(row, q)) phase(row)[0] ^= 1;
+    }
+}
+
+void StabilizerState::apply_cnot(pos_t c, pos_t t){
+    const size_t wc = c >> 6, wt = t >> 6;
+    const uint sc = c & 63, st = t & 63;
+    for (size_t row = 0; row < 2 * num_; row++){
+        uint64_t *xr = x(row), *zr = z(row);
+        uint64_t xc = (xr[wc] >> sc) & 1, zc = (zr[wc] >> sc) & 1;
+        uint64_t xt = (xr[wt] >> st) & 1, zt = (zr[wt] >> st) & 1;
+        if (xc & zt & (xt ^ zc ^ 1)) phase(row)[0] ^= 1;
+        xr[wt] ^= xc << st;
+        zr[wc] ^= zt << sc;
+    }
+}
+
+void StabilizerState::apply_cz(pos_t a, pos_t b){
+    const size_t wa = a >> 6, wb = b >> 6;
+    const uint sa = a & 63, sb = b & 63;
+    for (size_t row = 0; row < 2 * num_; row++){
+        uint64_t *xr = x(row), *zr = z(row);
+        uint64_t xa = (xr[wa] >> sa) & 1, za = (zr[wa] >> sa) & 1;
+        uint64_t xb = (xr[wb] >> sb) & 1, zb = (zr[wb] >> sb) & 1;
+        if (xa & xb & (za ^ zb)) phase(row)[0] ^= 1;
+        zr[wa] ^= xb << sa;
+        zr[wb] ^= xa << sb;
+    }
+}
+
+void StabilizerState::apply_cy(pos_t c, pos_t t){
+    apply_sdag(t);
+    apply_cnot(c, t);
+    apply_s(t);
+}
+
+void StabilizerState::apply_swap(pos_t a, pos_t b){
+    apply_cnot(a, b);
+    apply_cnot(b, a);
+    apply_cnot(a, b);
+}
+
+uint StabilizerState::apply_measure(pos_t q, std::mt19937_64 &rng){
+    const size_t n = num_;
+    size_t p = 2 * n;
+    for (size_t row = n; row < 2 * n; row++){
+        if (xbit(row, q)) { p = row; break; }
+    }
+    if (p < 2 * n){
+        // Random outcome
+        for (size_t row = 0; row < 2 * n; row++){
+            if (row != p && xbit(row, q)) rowsum(row, p);
+        }
+        rowcopy(p - n, p);
+        rowset_z(p, q);
+        uint outcome = rng() & 1;
+        phase(p)[0] = outcome;
+        return outcome;
+    }
+    // Deterministic outcome
+    rowset_z(2 * n, q);
+    z(2 * n)[q >> 6] = 0;
+    for (size_t row = 0; row < n; row++){
+        if (xbit(row, q)) rowsum(2 * n, row + n);
+    }
+    return phase(2 * n)[0] & 1;
+}
+
+void StabilizerState::apply_measure(vector<pos_t> const &qbits, vector<pos_t> const &cbits, std::mt19937_64 &rng){
+    for (uint j = 0; j < qbits.size(); j++){
+        creg_[cbits[j]] = apply_measure(qbits[j], rng);
+    }
+}
+
+void StabilizerState::apply_reset(vector<pos_t> const &qbits, std::mt19937_64 &rng){
+    for (auto q : qbits){
+        if (apply_measure(q, rng) == 1) apply_x(q);
+    }
+}
+
+bool StabilizerState::check_cif(vector<pos_t> const &cbits, const uint condition){
+    uint out = 0;
+    for (uint i = 0; i < cbits.size(); i++){
+        out *= 2;
+        out += creg_[cbits[i]];
+    }
+    return out == condition;
+}
+
+void StabilizerState::enable_symbolic(uint max_vars){
+    size_t pwords = (max_vars + 1 + 63) >> 6;
+    vector<uint64_t> phase(( 2 * num_ + 1) * pwords, 0);
+    for (size_t row = 0; row < 2 * num_ + 1; row++){
+        phase[row * pwords] = phase_[row * pwords_] & 1;
+    }
+    phase_ = std::move(phase);
+    pwords_ = pwords;
+    num_vars_ = 0;
+}
+
+vector<uint64_t> StabilizerState::measure_symbolic(pos_t q){
+    const size_t n = num_;
+    size_t p = 2 * n;
+    for (size_t row = n; row < 2 * n; row++){
+        if (xbit(row, q)) { p = row; break; }
+    }
+    if (p < 2 * n){
+        for (size_t row = 0; row < 2 * n; row++){
+            if (row != p && xbit(row, q)) rowsum(row, p);
+        }
+        rowcopy(p - n, p);
+        rowset_z(p, q);
+        uint var = ++num_vars_;
+        phase(p)[var >> 6] |= 1ULL << (var & 63);
+        return vector<uint64_t>(phase(p), phase(p) + pwords_);
+    }
+    rowset_z(2 * n, q);
+    z(2 * n)[q >> 6] = 0;
+    for (size_t row = 0; row < n; row++){
+        if (xbit(row, q)) rowsum(2 * n, row + n);
+    }
+    return vector<uint64_t>(phase(2 * n), phase(2 * n) + pwords_);
+}
+
+// Evaluate a symbolic outcome for an assignment of the random bits (bit 0 of vars is 1)
+inline uint eval_symbolic(vector<uint64_t> const &outcome, vector<uint64_t> const &vars){
+    uint parity = 0;
+    for (size_t w = 0; w < outcome.size(); w++){
+        parity ^= Qfutil::popcount64(outcome[w] & vars[w]) & 1;
+    }
+    return parity;
+}
+
+void apply_clifford_op(QuantumOperator &op, StabilizerState &state, std::mt19937_64 &rng){
+    auto pos = op.positions();
+    switch (OPMAP[op.name()]){
+        case Opname::x: state.apply_x(pos[0]); break;
+        case Opname::y: state.apply_y(pos[0]); break;
+        case Opname::z: state.apply_z(pos[0]); break;
+        case Opname::h: state.apply_h(pos[0]); break;
+        case Opname::s: state.apply_s(pos[0]); break;
+        case Opname::sdg: state.apply_sdag(pos[0]); break;
+        case Opname::cx: state.apply_cnot(pos[0], pos[1]); break;
+        case Opname::cnot: state.apply_cnot(pos[0], pos[1]); break;
+        case Opname::cz: state.apply_cz(pos[0], pos[1]); break;
+        case Opname::cy: state.apply_cy(pos[0], pos[1]); break;
+        case Opname::swap: state.apply_swap(pos[0], pos[1]); break;
+        case Opname::measure:
+            state.apply_measure(op.qbits(), op.cbits(), rng);
+            break;
+        case Opname::reset:
+            state.apply_reset(op.qbits(), rng);
+            break;
+        case Opname::cif:
+            if (state.check_cif(op.cbits(), op.condition())){
+                for (auto op_h : op.instructions()){
+                    apply_clifford_op(op_h, state, rng);
+                }
+            }
+            break;
+        default:
+            throw std::invalid_argument("Non-Clifford operation " + op.name() + " for stabilizer simulator");
+    }
+}
@@ -27,6 +27,7 @@ class StateVector{
         std::unique_ptr<complex<real_t>[]> data_;
         //random engine
         std::mt19937_64 rng_;
+        bool rng_seeded_ = false;
 
     public:
         //construct function
@@ -107,9 +108,25 @@ class StateVector{
             return creg_;
         }
 
+        void set_cbit(pos_t cbit, uint value){
+            creg_[cbit] = value;
+        }
+
         void set_rng(){
             std::random_device rd;
             rng_.seed(rd());
+            rng_seeded_ = true;
+        }
+
+        // Seed the engine explicitly, e.g. to give every trajectory its own stream
+        void set_rng(std::seed_seq &seq){
+            rng_.seed(seq);
+            rng_seeded_ = true;
+        }
+
+        std::mt19937_64& rng(){
+            if(!rng_seeded_) set_rng();
+            return rng_;
         }
 
         void print_state();
@@ -1314,7 +1331,7 @@ std::pair<uint, double> StateVector<real_t>::sample_measure_probs(vector<pos_t>
             probs[m] += probs_private[m];
         }
     }
-    set_rng();
+    if(!rng_seeded_) set_rng();
     // std::cout<<"probs:";
     // printVector(probs);
     uint outcome = std::discrete_distribution<uint>(probs.begin(), probs.end())(rng_);
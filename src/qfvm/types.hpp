@@ -28,6 +28,7 @@ using std::complex;
 using std::vector;
 using std::string;
 using RowMatrixXcd = Eigen::Matrix<complex<double>, Eigen::Dynamic, Eigen::Dynamic, Eigen::RowMajor>;
+using RowMatrixXd = Eigen::Matrix<double, Eigen::Dynamic, Eigen::Dynamic, Eigen::RowMajor>;
 
 const complex<double> imag_I = complex<double>(0, 1.);
 const double PI = 3.14159265358979323846;
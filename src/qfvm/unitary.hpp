@@ -0,0 +1,134 @@
+#pragma once
+
+#include "adjoint.hpp"
+
+// Matrices are indexed in big endian convention, the first qubit is the most significant bit
+size_t reverse_bits(size_t index, uint num){
+    size_t reversed = 0;
+    for (uint k = 0; k < num; k++){
+        reversed = (reversed << 1) | ((index >> k) & 1);
+    }
+    return reversed;
+}
+
+void check_unitary_circuit(Circuit const &circuit){
+    if (!circuit.final_measure())
+        throw std::invalid_argument("Unitary is only defined for circuits with measurements at the end");
+    for (auto const &op : circuit.instructions()){
+        if (op.name() == "reset" || op.name() == "cif")
+            throw std::invalid_argument("Unitary is only defined for circuits without reset and cif");
+    }
+}
+
+// Column of the circuit unitary for the basis state index, little endian
+void apply_unitary_column(Circuit const &circuit, StateVector<data_t> &state, size_t index){
+    auto data = state.data();
+    std::fill(data, data + state.size(), complex<double>(0., 0.));
+    data[index] = 1.;
+    for (auto op : circuit.instructions()){
+        if (op.name() == "measure" || op.name() == "snapshot") continue;
+        apply_op(op, state);
+    }
+}
+
+// Every column is an independent statevector run, the columns are distributed over threads
+py::array_t<complex<double>> simulate_unitary(py::object const &pycircuit, const uint num){
+    auto circuit = Circuit(pycircuit);
+    check_unitary_circuit(circuit);
+    const size_t dim = 1ULL << num;
+    py::array_t<complex<double>> unitary({dim, dim});
+    auto out = unitary.mutable_data();
+#pragma omp parallel
+    {
+        StateVector<data_t> state(num);
+#pragma omp for
+        for (omp_i col = 0; col < (omp_i)dim; col++){
+            apply_unitary_column(circuit, state, reverse_bits(col, num));
+            auto data = state.data();
+            for (size_t i = 0; i < dim; i++){
+                out[reverse_bits(i, num) * dim + col] = data[i];
+            }
+        }
+    }
+    return unitary;
+}
+
+// Whether the circuit equals the reference up to a global phase, or exactly if not up_to_phase.
+// Each column of U_ref^dagger U is computed on a single statevector and must be phase * |j>.
+bool unitary_equivalent(py::object const &pycircuit, py::object const &pyreference, const uint num, const double atol, const bool up_to_phase){
+    auto circuit = Circuit(pycircuit);
+    auto reference = Circuit(pyreference);
+    check_unitary_circuit(circuit);
+    check_unitary_circuit(reference);
+    auto ref_ops = reference.instructions();
+    const size_t dim = 1ULL << num;
+    complex<double> phase = 1.;
+    if (up_to_phase){
+        StateVector<data_t> state(num);
+        apply_unitary_column(circuit, state, 0);
+        for (auto it = ref_ops.rbegin(); it != ref_ops.rend(); it++){
+            if (it->name() == "measure" || it->name() == "snapshot") continue;
+            apply_inverse_op(*it, state);
+        }
+        phase = state.data()[0];
+        if (std::abs(phase) < 1. - atol) return false;
+        phase /= std::abs(phase);
+    }
+    bool equal = true;
+#pragma omp parallel
+    {
+        StateVector<data_t> state(num);
+#pragma omp for
+        for (omp_i col = 0; col < (omp_i)dim; col++){
+            if (!equal) continue;
+            apply_unitary_column(circuit, state, col);
+            for (auto it = ref_ops.rbegin(); it != ref_ops.rend(); it++){
+                if (it->name() == "measure" || it->name() == "snapshot") continue;
+                apply_inverse_op(*it, state);
+            }
+            if (std::abs(state.data()[col] - phase) > atol){
+#pragma omp atomic write
+                equal = false;
+            }
+        }
+    }
+    return equal;
+}
+
+// Same as unitary_equivalent with the reference given as a matrix in big endian convention
+bool unitary_equivalent_matrix(py::object const &pycircuit, py::array_t<complex<double>> const &pyreference, const uint num, const double atol, const bool up_to_phase){
+    auto circuit = Circuit(pycircuit);
+    check_unitary_circuit(circuit);
+    const size_t dim = 1ULL << num;
+    if (pyreference.ndim() != 2 || (size_t)pyreference.shape(0) != dim || (size_t)pyreference.shape(1) != dim)
+        throw std::invalid_argument("Reference matrix does not match the number of qubits");
+    auto ref = pyreference.unchecked<2>();
+    complex<double> phase = 1.;
+    if (up_to_phase){
+        StateVector<data_t> state(num);
+        apply_unitary_column(circuit, state, 0);
+        complex<double> overlap = 0.;
+        for (size_t i = 0; i < dim; i++) overlap += std::conj(ref(reverse_bits(i, num), 0)) * state.data()[i];
+        if (std::abs(overlap) < 1. - atol) return false;
+        phase = overlap / std::abs(overlap);
+    }
+    bool equal = true;
+#pragma omp parallel
+    {
+        StateVector<data_t> state(num);
+#pragma omp for
+        for (omp_i col = 0; col < (omp_i)dim; col++){
+            if (!equal) continue;
+            apply_unitary_column(circuit, state, reverse_bits(col, num));
+            auto data = state.data();
+            for (size_t i = 0; i < dim; i++){
+                if (std::abs(data[i] - phase * ref(reverse_bits(i, num), col)) > atol){
+#pragma omp atomic write
+                    equal = false;
+                    break;
+                }
+            }
+        }
+    }
+    return equal;
+}
@@ -6,9 +6,30 @@
 #include <regex>
 #include <type_traits>
 #include <bitset>
+#ifdef _MSC_VER
+#include <intrin.h>
+#endif
 
 namespace Qfutil{
 
+inline uint popcount64(uint64_t v){
+#ifdef _MSC_VER
+    return (uint)__popcnt64(v);
+#else
+    return (uint)__builtin_popcountll(v);
+#endif
+}
+
+inline uint ctz64(uint64_t v){
+#ifdef _MSC_VER
+    unsigned long index;
+    _BitScanForward64(&index, v);
+    return (uint)index;
+#else
+    return (uint)__builtin_ctzll(v);
+#endif
+}
+
 std::vector<int> randomArr(size_t length, size_t max){
     srand((unsigned)time(NULL));
     std::vector<int> arr(length);
@@ -20,6 +20,7 @@ from unittest.mock import patch
 from quafu import ExecResult
 from quafu.algorithms.estimator import Estimator
 from quafu.algorithms.hamiltonian import Hamiltonian
+from quafu.simulators.cache import SimulationCache
 
 from quafu.circuits.quantum_circuit import QuantumCircuit
 from quafu.tasks.tasks import Task
@@ -78,3 +79,13 @@ class TestEstimator:
         estimator = Estimator(circ)
         expectation = estimator.run(test_ising, None)
         assert math.isclose(expectation, 1.0)
+
+    def test_cache(self):
+        circ, test_ising = self.build_circuit()
+        # estimators share one bounded cache unless given their own
+        assert Estimator(circ)._cache is Estimator(circ)._cache
+        assert Estimator(circ, cache=False)._cache is None
+        cache = SimulationCache(memory_budget=2**20)
+        estimator = Estimator(circ, cache=cache)
+        assert math.isclose(estimator.run(test_ising, None), 1.0)
+        assert cache.misses + cache.hits > 0
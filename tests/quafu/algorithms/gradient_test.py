@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import pytest
 import sys
 from quafu.algorithms.estimator import Estimator
 from quafu.algorithms.hamiltonian import Hamiltonian
-from quafu.algorithms.gradients import ParamShift
+from quafu.algorithms.gradients import ParamShift, Adjoint, Gradient, jacobian
+from quafu.exceptions import QuafuError
 from quafu.circuits.quantum_circuit import QuantumCircuit
 
 
@@ -39,3 +41,44 @@ class TestParamShift:
 
         grads = grad(ham, params)
         print(grads)
+
+
+class TestAdjoint:
+    def _circuit(self):
+        circ = QuantumCircuit(3)
+        circ.h(0)
+        circ.rx(0, 0.5)
+        circ.cnot(0, 1)
+        circ.ry(1, 0.5)
+        circ.rzz(1, 2, 0.3)
+        circ.p(2, 0.2)
+        circ.rz(2, 0.1)
+        circ.cp(0, 2, 0.4)
+        circ.rxx(0, 2, 0.7)
+        circ.ryy(2, 1, 0.9)
+        return circ
+
+    def test_match_param_shift(self):
+        ham = Hamiltonian.from_pauli_list([("ZZI", 0.5), ("XIY", 1), ("IYZ", -0.3)])
+        params = np.linspace(0.1, 1.2, 8).tolist()
+        circ = self._circuit()
+        expected = Gradient(Estimator(circ), method="param_shift")(ham, params)
+        grads = Gradient(Estimator(circ), method="adjoint")(ham, params)
+        assert np.allclose(grads, expected)
+
+    def test_jacobian(self):
+        circ = self._circuit()
+        params = np.random.default_rng(1).random((2, 8))
+        assert np.allclose(
+            jacobian(circ, params, method="adjoint"), jacobian(circ, params)
+        )
+
+    def test_unsupported(self):
+        circ = QuantumCircuit(2)
+        circ.cx(0, 1)
+        circ.reset([0])
+        ham = Hamiltonian.from_pauli_list([("ZZ", 1)])
+        with pytest.raises(QuafuError):
+            Adjoint(Estimator(circ)).grad(ham, None)
+        with pytest.raises(ValueError):
+            Gradient(Estimator(circ), method="finite_diff")
@@ -0,0 +1,72 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import QuantumCircuit, simulate
+from quafu.algorithms import AngleEmbedding, fidelity_kernel
+
+
+def embedding(feature):
+    num_qubits = len(feature)
+    qc = QuantumCircuit(num_qubits)
+    qc.add_gates(AngleEmbedding(features=feature, num_qubits=num_qubits, rotation="Y"))
+    for i in range(num_qubits - 1):
+        qc.cx(i, i + 1)
+    qc.add_gates(AngleEmbedding(features=feature, num_qubits=num_qubits, rotation="Z"))
+    return qc
+
+
+class TestFidelityKernel:
+    def test_kernel(self, tmp_path):
+        rng = np.random.default_rng(0)
+        features = rng.normal(size=(7, 3))
+        circuits = [embedding(x) for x in features]
+        states = [simulate(qc, output="state_vector").state_vector for qc in circuits]
+        ref = np.abs(np.array(states).conj() @ np.array(states).T) ** 2
+
+        kernel = fidelity_kernel(circuits)
+        assert np.allclose(kernel, ref)
+        assert np.allclose(np.diag(kernel), 1)
+
+        tiled = fidelity_kernel(circuits, block_size=3, out=str(tmp_path / "kernel.npy"))
+        assert isinstance(tiled, np.memmap)
+        assert np.allclose(tiled, ref)
+        assert np.allclose(np.load(tmp_path / "kernel.npy"), ref)
+
+        block = fidelity_kernel(circuits[:2], circuits[3:], block_size=2)
+        assert np.allclose(block, ref[:2, 3:])
+
+    def test_simulated_once(self, monkeypatch):
+        from quafu.simulators import qfvm
+
+        rng = np.random.default_rng(1)
+        circuits = [embedding(x) for x in rng.normal(size=(9, 3))]
+        ref = fidelity_kernel(circuits)
+        simulated = []
+        batch = qfvm.batch_statevectors
+
+        def counted(circs, num):
+            simulated.extend(circs)
+            return batch(circs, num)
+
+        monkeypatch.setattr(qfvm, "batch_statevectors", counted)
+        # columns held in memory, then streamed from a memmap
+        for max_memory in [2**30, 0]:
+            simulated.clear()
+            assert np.allclose(fidelity_kernel(circuits, block_size=2, max_memory=max_memory), ref)
+            assert len(simulated) == 9
+            simulated.clear()
+            kernel = fidelity_kernel(circuits[:4], circuits[4:], block_size=2, max_memory=max_memory)
+            assert np.allclose(kernel, ref[:4, 4:])
+            assert len(simulated) == 9
@@ -29,3 +29,41 @@ class TestQuantumCircuit:
         assert math.isclose(g.paras, 0.2)
         c.update_params([None])
         assert math.isclose(g.paras, 0.2)
+
+    def test_metadata(self):
+        """Test used qubits, depth and gate counts kept while gates are added"""
+        c = QuantumCircuit(6, 6)
+        c.h(1)
+        c.rx(4, 0.1)
+        c.cx(1, 3)
+        assert c.used_qubits == [1, 3, 4]
+        assert c.depth == 2 and c.frontier_depths == {1: 2, 2: 2, 3: 2, 4: 1}
+        c.barrier([0, 5])
+        c.measure([2], [0])
+        with c.cif([0], 1):
+            c.reset([5])
+        c.rz(0, 0.2)
+        assert c.used_qubits == [0, 1, 2, 3, 4, 5]
+        assert c.depth == c.layered_circuit().shape[1] - 1 == 4
+        assert c.gate_counts == {"h": 1, "rx": 1, "cx": 1, "barrier": 1, "rz": 1}
+        assert [g.name.lower() for g in c.parameterized_gates] == ["rx", "rz"]
+        assert c.measures == {2: 0}
+
+    def test_metadata_direct_edits(self):
+        """Test the metadata of circuits whose lists are edited directly"""
+        c = QuantumCircuit(4)
+        c.x(0)
+        c.gates.append(RXGate(2, 0.3))
+        assert c.used_qubits == [0, 2]
+        assert len(c.parameterized_gates) == 1
+        c.gates = [RXGate(3, 0.1)]
+        c.measures = {1: 0}
+        assert c.used_qubits == [1, 3]
+        assert c.depth == 1
+
+    def test_used_qubits(self):
+        """Test used qubits of gates given by a list of positions"""
+        c = QuantumCircuit(5)
+        c.rxx(0, 3, 0.2)
+        c.barrier([0, 1, 2, 3, 4])
+        assert list(c.used_qubits) == [0, 3]
@@ -0,0 +1,24 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from quafu.simulators import result_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_result_cache(monkeypatch):
+    """Give every test an empty process-wide result cache, so results never depend on earlier tests"""
+    cache = result_cache.ResultCache()
+    monkeypatch.setattr(result_cache, "_RESULT_CACHE", cache)
+    return cache
@@ -0,0 +1,146 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.algorithms.hamiltonian import Hamiltonian
+from quafu.cutting import cut_circuit, find_cuts
+from quafu.exceptions import CircuitError
+
+
+def two_blocks(rng):
+    # blocks {0, 1, 2} and {3, 4, 5} linked by a single cz
+    qc = QuantumCircuit(6)
+    for q in range(6):
+        qc.ry(q, float(rng.normal()))
+        qc.rz(q, float(rng.normal()))
+    for q in [0, 1, 3, 4]:
+        qc.cx(q, q + 1)
+    qc.barrier(list(range(6)))
+    qc.cz(2, 3)
+    for q in range(6):
+        qc.rx(q, float(rng.normal()))
+    for q in [1, 0, 4, 3]:
+        qc.cx(q, q + 1)
+    return qc
+
+
+def chained_blocks(rng, count, size):
+    # blocks of size qubits with cx chains, each linked to the next one by a single cz
+    num = count * size
+    qc = QuantumCircuit(num)
+    for q in range(num):
+        qc.ry(q, float(rng.normal()))
+    for b in range(count):
+        for q in range(b * size, (b + 1) * size - 1):
+            qc.cx(q, q + 1)
+    for b in range(1, count):
+        qc.cz(b * size - 1, b * size)
+    for q in range(num):
+        qc.rx(q, float(rng.normal()))
+    for b in range(count):
+        for q in range((b + 1) * size - 2, b * size - 1, -1):
+            qc.cx(q, q + 1)
+    return qc
+
+
+def pauli_expectation(qc, pauli):
+    paulis = {
+        "I": np.eye(2),
+        "X": np.array([[0, 1], [1, 0]]),
+        "Y": np.array([[0, -1j], [1j, 0]]),
+        "Z": np.diag([1, -1]),
+    }
+    op = np.array([[1]])
+    for s in pauli:
+        op = np.kron(op, paulis[s])
+    psi = simulate(qc, output="state_vector").get_statevector()
+    return np.real(psi.conj() @ op @ psi)
+
+
+class SimulatedTask:
+    """Stands in for a Task, sending back the simulated probabilities keyed by bitstrings like ExecResult"""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, qc):
+        self.sent += 1
+        probs = simulate(qc).probabilities
+        return SimpleNamespace(
+            probabilities={format(i, f"0{qc.cbits_num}b"): p for i, p in enumerate(probs) if p > 0}
+        )
+
+
+class TestCutting:
+    def test_find_cuts(self):
+        qc = two_blocks(np.random.default_rng(0))
+        cuts = find_cuts(qc, 4)
+        assert all(q == 3 for q, _ in cuts)
+        assert len(cuts) == 2
+        assert max(f.width for f in cut_circuit(qc, max_width=3).fragments) <= 3
+        with pytest.raises(CircuitError):
+            find_cuts(qc, 2)
+
+    def test_find_cuts_odd_blocks(self):
+        # clusters are not forced to equal halves, only the wires of the link qubits are cut
+        for count, size in [(3, 4), (5, 3)]:
+            qc = chained_blocks(np.random.default_rng(count), count, size)
+            cuts = find_cuts(qc, size + 2)
+            links = {b * size + d for b in range(1, count) for d in [-1, 0]}
+            assert len(cuts) == 2 * (count - 1)
+            assert {q for q, _ in cuts} <= links
+        qc.measure(list(range(count * size)))
+        cc = cut_circuit(qc, max_width=size + 2)
+        assert np.allclose(cc.probabilities(), simulate(qc).probabilities)
+
+    def test_probabilities(self):
+        qc = two_blocks(np.random.default_rng(1))
+        qc.measure([5, 0, 3, 2], [0, 1, 2, 3])
+        cc = cut_circuit(qc, max_width=4)
+        assert [f.width for f in cc.fragments] == [4, 4]
+        assert np.allclose(cc.probabilities(), simulate(qc).probabilities)
+
+    def test_task(self):
+        qc = two_blocks(np.random.default_rng(5))
+        qc.measure([4, 0, 3, 1], [0, 1, 2, 3])
+        task = SimulatedTask()
+        cc = cut_circuit(qc, max_width=4, task=task)
+        assert np.allclose(cc.probabilities(), simulate(qc).probabilities)
+        assert task.sent == cc.num_variants
+        assert np.isclose(cc.expectation("ZIIXIZ"), pauli_expectation(qc, "ZIIXIZ"))
+
+    def test_probabilities_without_measure(self):
+        qc = two_blocks(np.random.default_rng(2))
+        cc = cut_circuit(qc, cuts=[(3, 14), (1, 12)])
+        assert np.allclose(cc.probabilities(), simulate(qc).probabilities)
+
+    def test_expectation(self):
+        qc = two_blocks(np.random.default_rng(3))
+        cc = cut_circuit(qc, max_width=4)
+        for pauli in ["ZIIIIZ", "IIXYII", "XIIIZY", "IIIIII"]:
+            assert np.isclose(cc.expectation(pauli), pauli_expectation(qc, pauli))
+        ham = Hamiltonian.from_pauli_list([("ZZIIII", 0.5), ("IIIYXI", -1.5)])
+        ref = 0.5 * pauli_expectation(qc, "ZZIIII") - 1.5 * pauli_expectation(qc, "IIIYXI")
+        assert np.isclose(cc.expectation(ham), ref)
+
+    def test_invalid_cuts(self):
+        qc = two_blocks(np.random.default_rng(4))
+        with pytest.raises(CircuitError):
+            cut_circuit(qc, cuts=[(1, 0)])
+        with pytest.raises(CircuitError):
+            cut_circuit(qc, cuts=[(5, 26)])
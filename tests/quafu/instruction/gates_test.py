@@ -57,10 +57,13 @@ class TestGate(unittest.TestCase):
         mcz = qeg.MCZGate(ctrls=[0, 1, 2], targ=3)
         toffoli = qeg.ToffoliGate(ctrl1=0, ctrl2=1, targ=2)
 
+        # Reversible
+        perm = qeg.PermutationGate(table=[1, 2, 3, 0], pos=[0, 1])
+
         all_gates = [x, y, z, i, w, sw, swdg, sx, sxdg, sy, sydg,
                      h, s, sdg, t, tdg,
                      ph, rx, ry, rz, rxx, ryy, rzz, swap, iswap, fredkin, cx, cy, cz, cs, ct, cp, mcx, mcy, mcz,
-                     toffoli]
+                     toffoli, perm]
         self.assertEqual(len(all_gates), len(gate_classes))
         for gate in all_gates:
             self.assertIn(gate.name.lower(), gate_classes)
@@ -0,0 +1,118 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate, simulate_batch, simulate_many
+from quafu.algorithms.gradients import run_circ, run_circ_batch
+from quafu.exceptions import QuafuError
+
+from builders import random_circuit
+
+
+class TestSimulateMany:
+    def test_heterogeneous(self):
+        rng = np.random.default_rng(5)
+        circuits = []
+        for k in range(12):
+            num = int(rng.integers(2, 6))
+            qc = random_circuit(num, 15, rng)
+            if k % 3 == 1:
+                qc.measure([num - 1, 0], [0, 1])
+            circuits.append(qc)
+        results = simulate_many(circuits, shots=200, seed=1)
+        for qc, res in zip(circuits, results):
+            assert np.allclose(res.probabilities, simulate(qc).probabilities)
+            if qc.measures:
+                assert sum(res.count.values()) == 200
+        states = simulate_many(circuits[:3], output="state_vector")
+        for qc, res in zip(circuits[:3], states):
+            assert np.allclose(res.state_vector, simulate(qc, output="state_vector").state_vector)
+
+    def test_stack_and_mid_measure(self):
+        qc = QuantumCircuit(2)
+        qc.x(0)
+        qc.measure([0], [0])
+        qc.cx(0, 1)
+        qc.measure([1], [1])
+        other = QuantumCircuit(2)
+        other.h(0)
+        other.cx(0, 1)
+        probs = simulate_many([qc, other], shots=20, seed=2, stack=True)
+        assert probs.shape == (2, 4)
+        assert np.allclose(probs[0], [0, 0, 0, 1])
+        assert np.allclose(probs[1], [0.5, 0, 0, 0.5])
+        res = simulate_many([qc], shots=20, seed=2)[0]
+        assert res.count == {"11": 20}
+
+    def test_seed(self):
+        qc = QuantumCircuit(5)
+        for q in range(5):
+            qc.h(q)
+        qc.measure()
+        counts = [simulate_many([qc], shots=200, seed=seed)[0].count for seed in [5, 5, 5 + 2**32]]
+        assert counts[0] == counts[1]
+        # all 64 bits of the seed select the random streams
+        assert counts[2] != counts[0]
+
+
+def parametric_circuit(num, layers):
+    qc = QuantumCircuit(num)
+    for _ in range(layers):
+        for q in range(num):
+            qc.rx(q, 0.1)
+            qc.rz(q, 0.2)
+            qc.p(q, 0.3)
+        for q in range(num - 1):
+            qc.cx(q, q + 1)
+        qc.cp(0, num - 1, 0.4)
+        qc.rxx(1, num - 2, 0.5)
+        qc.ryy(num - 1, 2, 0.6)
+        qc.rzz(num - 1, 0, 0.7)
+        qc.ry(2, 0.8)
+        qc.h(1)
+    return qc
+
+
+class TestSimulateBatch:
+    def test_rows(self):
+        qc = parametric_circuit(5, 2)
+        qc.measure([3, 1, 4], [0, 2, 1])
+        params = np.random.default_rng(6).normal(size=(8, len(qc.parameterized_gates)))
+        probs = simulate_batch(qc, params)
+        states = simulate_batch(qc, params, output="state_vector")
+        assert probs.shape == (8, 8) and states.shape == (8, 32)
+        for row, p, psi in zip(params, probs, states):
+            qc.update_params(list(row))
+            assert np.allclose(p, simulate(qc).probabilities)
+            assert np.allclose(psi, simulate(qc, output="state_vector").get_statevector())
+
+    def test_run_circ(self):
+        qc = QuantumCircuit(4)
+        for q in range(3):
+            qc.rx(q, 0.1)
+            qc.ry(q, 0.2)
+        qc.cx(0, 2)
+        params = np.random.default_rng(7).normal(size=(5, 6))
+        ref = [run_circ(qc, list(row)) for row in params]
+        assert np.allclose(run_circ_batch(qc, params), ref)
+
+    def test_invalid(self):
+        qc = parametric_circuit(3, 1)
+        with pytest.raises(ValueError):
+            simulate_batch(qc, np.zeros((2, 3)))
+        qc.measure([0])
+        qc.x(0)
+        with pytest.raises(QuafuError):
+            simulate_batch(qc, np.zeros((2, len(qc.parameterized_gates))))
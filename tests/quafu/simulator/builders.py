@@ -0,0 +1,66 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import QuantumCircuit
+
+# number of qubits and whether the gate takes an angle
+GATES = {
+    "h": (1, False), "x": (1, False), "y": (1, False), "z": (1, False), "s": (1, False),
+    "sdg": (1, False), "t": (1, False), "sx": (1, False),
+    "rx": (1, True), "ry": (1, True), "rz": (1, True),
+    "cx": (2, False), "cy": (2, False), "cz": (2, False), "swap": (2, False),
+    "cp": (2, True), "rxx": (2, True), "ryy": (2, True), "rzz": (2, True),
+    "toffoli": (3, False), "fredkin": (3, False), "mcx": (3, False), "mcz": (3, False),
+}
+
+
+def random_circuit(num, depth, rng, gates=("h", "ry", "cx", "rzz")):
+    """Circuit of depth gates drawn from gates on random distinct qubits, with normal angles"""
+    width = max(GATES[name][0] for name in gates)
+    qc = QuantumCircuit(num)
+    for _ in range(depth):
+        qubits = [int(q) for q in rng.choice(num, width, replace=False)]
+        name = str(rng.choice(gates))
+        arity, has_angle = GATES[name]
+        qubits = qubits[:arity]
+        if name in ["mcx", "mcz"]:
+            getattr(qc, name)(qubits[:-1], qubits[-1])
+        elif has_angle:
+            getattr(qc, name)(*qubits, float(rng.normal()))
+        else:
+            getattr(qc, name)(*qubits)
+    return qc
+
+
+def layered(num, layers, params=None, seed=0, rotations=("ry",), entangler="cx", brickwork=False, barrier=False):
+    """Layers of rotations on every qubit followed by entanglers on neighbouring qubits.
+
+    Angles are taken in order from params, or drawn from a normal distribution seeded by seed,
+    which may be a numpy Generator. Entanglers act on the whole chain, or on alternating pairs
+    of neighbours if brickwork.
+    """
+    angles = iter(params) if params is not None else None
+    rng = np.random.default_rng(seed)
+    qc = QuantumCircuit(num)
+    for layer in range(layers):
+        for q in range(num):
+            for name in rotations:
+                getattr(qc, name)(q, float(next(angles)) if angles is not None else float(rng.normal()))
+        if barrier:
+            qc.barrier(list(range(num)))
+        pairs = range(layer % 2, num - 1, 2) if brickwork else range(num - 1)
+        for q in pairs:
+            getattr(qc, entangler)(q, q + 1)
+    return qc
@@ -0,0 +1,81 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import QuantumCircuit, simulate
+from quafu.simulators.cache import SimulationCache
+
+from builders import layered
+
+
+class TestSimulationCache:
+    def test_resume(self):
+        num, layers = 4, 5
+        rng = np.random.default_rng(1)
+        params = rng.normal(size=num * layers)
+        cache = SimulationCache(interval=3)
+        for k in [len(params) - 1, len(params) - 1, 5, 0]:
+            shifted = params.copy()
+            shifted[k] += np.pi / 2
+            qc = layered(num, layers, shifted)
+            psi = simulate(qc, output="state_vector", cache=cache).state_vector
+            ref = simulate(qc, output="state_vector").state_vector
+            assert np.allclose(psi, ref)
+        assert cache.misses == 2
+        assert cache.hits == 2
+
+    def test_memory_budget(self):
+        cache = SimulationCache(interval=1, memory_budget=3 * 16 * 2**3)
+        qc = layered(3, 2, np.ones(6))
+        cache.statevector(qc)
+        assert len(cache) == 3
+        assert cache.nbytes <= cache.memory_budget
+
+    def test_counts_and_fallback(self):
+        qc = layered(3, 2, np.linspace(0, 1, 6))
+        qc.measure([0, 2], [1, 0])
+        cache = SimulationCache()
+        res = simulate(qc, shots=1000, seed=3, cache=cache)
+        ref = simulate(qc)
+        assert np.allclose(res.probabilities, ref.probabilities)
+        assert sum(res.count.values()) == 1000
+        assert cache.misses == 1
+
+        qc = QuantumCircuit(2)
+        qc.h(0)
+        qc.measure([0], [0])
+        qc.x(1)
+        assert not cache.supports(qc)
+        simulate(qc, cache=cache)
+        assert cache.misses == 1
+
+    def test_controlled_parameters(self):
+        # matrices of controlled gates keep their first parameters, checkpoints are keyed by parameters
+        def build(t):
+            qc = QuantumCircuit(3)
+            for i in range(3):
+                qc.h(i)
+            qc.cp(0, 1, t)
+            qc.cp(1, 2, t)
+            qc.ry(0, 0.2)
+            return qc
+
+        cache = SimulationCache(interval=1)
+        qc = build(0.1)
+        for t in [0.1, 0.7, 1.5]:
+            qc.update_params([t, t, 0.2])
+            psi = simulate(qc, output="state_vector", cache=cache).state_vector
+            ref = simulate(build(t), output="state_vector", result_cache=False).state_vector
+            assert np.allclose(psi, ref)
+        assert cache.hits == 2
@@ -0,0 +1,113 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.exceptions import QuafuError
+from quafu.simulators import checkpoint
+from quafu.simulators.checkpoint import load_checkpoint
+
+from builders import layered
+
+LAYERS = dict(rotations=("rx", "rz"), brickwork=True, barrier=True)
+
+
+def statevector(qc, **kwargs):
+    return simulate(qc, output="state_vector", **kwargs).get_statevector()
+
+
+class TestCheckpoint:
+    def test_write(self, tmp_path):
+        qc = layered(6, 4, **LAYERS)
+        path = str(tmp_path / "ckpt")
+        psi = statevector(qc, checkpoint_every=10, checkpoint_path=path)
+        assert np.allclose(psi, statevector(qc))
+        state, meta = load_checkpoint(path)
+        # 4 layers of 12 rotations and 3 or 2 cx, the latest checkpoint is before the last 10 instructions
+        assert meta["index"] == 50 and meta["num"] == 6
+        assert [f for f in os.listdir(path) if f.endswith(".npy")] == [meta["state"]]
+        prefix = QuantumCircuit(6)
+        for ins in [ins for ins in qc.instructions if ins.name != "barrier"][:50]:
+            prefix.add_ins(ins)
+        assert np.allclose(state, statevector(prefix))
+
+    def test_resume(self, tmp_path, monkeypatch):
+        qc = layered(5, 6, seed=1, **LAYERS)
+        qc.measure([3, 0], [0, 1])
+        path = str(tmp_path / "ckpt")
+        ref = simulate(qc)
+
+        # preempted after the second checkpoint
+        calls = []
+        save = checkpoint.save_checkpoint
+
+        def preempted(*args, **kwargs):
+            save(*args, **kwargs)
+            calls.append(args[2])
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr(checkpoint, "save_checkpoint", preempted)
+        with pytest.raises(KeyboardInterrupt):
+            simulate(qc, checkpoint_every=8, checkpoint_path=path)
+        monkeypatch.undo()
+        assert load_checkpoint(path)[1]["index"] == 16
+
+        res = simulate(qc, shots=30, checkpoint_every=8, checkpoint_path=path, resume=True)
+        assert np.allclose(res.probabilities, ref.probabilities)
+        assert sum(res.count.values()) == 30
+
+    def test_shared_prefix(self, tmp_path):
+        qc = layered(4, 3, seed=2, **LAYERS)
+        path = str(tmp_path / "ckpt")
+        statevector(qc, checkpoint_every=12, checkpoint_path=path)
+        # another job appends gates to the same circuit
+        longer = layered(4, 3, seed=2, **LAYERS)
+        longer.h(2)
+        assert np.allclose(statevector(longer, checkpoint_path=path, resume=True), statevector(longer))
+        other = layered(4, 3, seed=3, **LAYERS)
+        with pytest.raises(QuafuError):
+            simulate(other, checkpoint_path=path, resume=True)
+
+    def test_controlled_parameters(self, tmp_path):
+        qc = QuantumCircuit(3)
+        for q in range(3):
+            qc.h(q)
+        qc.cp(0, 1, 0.1)
+        qc.cp(1, 2, 0.1)
+        qc.ry(0, 0.2)
+        path = str(tmp_path / "ckpt")
+        statevector(qc, checkpoint_every=4, checkpoint_path=path)
+        # the matrix of a controlled gate keeps its first angle, the checkpoint must not be reused
+        qc.update_params([0.7, 0.7, 0.2])
+        with pytest.raises(QuafuError):
+            simulate(qc, checkpoint_path=path, resume=True)
+        qc.update_params([0.1, 0.7, 0.2])
+        ref = statevector(qc, result_cache=False)
+        assert np.allclose(statevector(qc, checkpoint_path=path, resume=True), ref)
+
+    def test_invalid(self, tmp_path):
+        qc = layered(3, 1, **LAYERS)
+        with pytest.raises(ValueError):
+            simulate(qc, checkpoint_every=2)
+        qc.measure([0])
+        qc.x(0)
+        with pytest.raises(QuafuError):
+            simulate(qc, checkpoint_every=2, checkpoint_path=str(tmp_path))
+        # resuming without a checkpoint starts from the beginning
+        qc = layered(3, 1, **LAYERS)
+        assert np.allclose(statevector(qc, checkpoint_path=str(tmp_path / "none"), resume=True), statevector(qc))
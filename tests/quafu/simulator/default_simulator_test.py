@@ -0,0 +1,52 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import simulate
+from quafu.simulators.default_simulator import permutebits, py_simulate
+
+from builders import random_circuit
+
+GATES = ("ry", "rx", "sx", "t", "cx", "cy", "cp", "swap", "rxx", "ryy", "toffoli", "fredkin", "mcx", "mcz")
+
+
+def mixed_circuit(num, depth, seed=0):
+    qc = random_circuit(num, depth, np.random.default_rng(seed), GATES)
+    qc.barrier(list(range(num)))
+    qc.cx(0, num - 1)
+    return qc
+
+
+class TestPySimulate:
+    def test_statevector(self):
+        qc = mixed_circuit(6, 60)
+        psi = simulate(qc, output="state_vector").get_statevector()
+        # py_simu is big endian
+        assert np.allclose(py_simulate(qc), permutebits(psi, range(6)[::-1]))
+
+    def test_input_state(self):
+        qc = mixed_circuit(5, 30, seed=1)
+        rng = np.random.default_rng(2)
+        psi = rng.normal(size=32) + 1j * rng.normal(size=32)
+        psi /= np.linalg.norm(psi)
+        ref = simulate(qc, psi=permutebits(psi, range(5)[::-1]), output="state_vector").get_statevector()
+        assert np.allclose(py_simulate(qc, psi), permutebits(ref, range(5)[::-1]))
+
+    def test_probabilities(self):
+        qc = mixed_circuit(5, 45, seed=3)
+        assert np.allclose(simulate(qc, simulator="py_simu").probabilities, simulate(qc).probabilities)
+        qc.measure([4, 1, 2], [0, 2, 1])
+        for output, attr in [("probabilities", "probabilities"), ("density_matrix", "rho")]:
+            res = simulate(qc, simulator="py_simu", output=output)
+            assert np.allclose(getattr(res, attr), getattr(simulate(qc, output=output), attr))
@@ -0,0 +1,65 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate, simulate_amplitudes
+from quafu.exceptions import QuafuError
+
+from builders import random_circuit
+
+# gates across the halves of the qubits, with controls and targets on both sides
+GATES = ("rx", "rz", "cz", "cx", "swap", "mcx", "rxx")
+
+
+def reference(qc, bitstrings):
+    psi = simulate(qc, output="state_vector").get_statevector()
+    return np.array([psi[sum(int(b[q]) << q for q in range(qc.num))] for b in bitstrings])
+
+
+class TestAmplitudes:
+    def test_halves(self):
+        rng = np.random.default_rng(0)
+        qc = random_circuit(8, 14, rng, GATES)
+        bitstrings = ["".join(rng.choice(["0", "1"], 8)) for _ in range(6)]
+        amplitudes = simulate_amplitudes(qc, bitstrings)
+        assert np.allclose(amplitudes, reference(qc, bitstrings))
+        indices = [int(b, 2) for b in bitstrings]
+        assert np.allclose(simulate_amplitudes(qc, indices), amplitudes)
+
+    def test_custom_parts(self):
+        rng = np.random.default_rng(1)
+        qc = random_circuit(8, 12, rng, GATES)
+        qc.measure([0, 1])
+        bitstrings = ["".join(rng.choice(["0", "1"], 8)) for _ in range(4)]
+        ref = reference(qc, bitstrings)
+        assert np.allclose(simulate_amplitudes(qc, bitstrings, qubits=[0, 2, 5]), ref)
+        assert np.allclose(simulate_amplitudes(qc, bitstrings, qubits=list(range(8))), ref)
+
+    def test_idle_qubits(self):
+        qc = QuantumCircuit(4)
+        qc.h(0)
+        qc.cx(0, 3)
+        amplitudes = simulate_amplitudes(qc, ["0000", "1001", "1000", "0100"])
+        assert np.allclose(amplitudes, [2**-0.5, 2**-0.5, 0, 0])
+
+    def test_invalid(self):
+        qc = QuantumCircuit(2)
+        qc.h(0)
+        with pytest.raises(ValueError):
+            simulate_amplitudes(qc, ["0"])
+        qc.measure([0])
+        qc.cx(0, 1)
+        with pytest.raises(QuafuError):
+            simulate_amplitudes(qc, ["00"])
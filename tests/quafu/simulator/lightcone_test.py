@@ -0,0 +1,80 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import QuantumCircuit, simulate
+from quafu.algorithms.estimator import Estimator
+from quafu.algorithms.hamiltonian import Hamiltonian
+from quafu.simulators import simulator
+from quafu.simulators.lightcone import backward_light_cone, light_cone_circuit
+
+from builders import layered
+
+BRICKWORK = dict(rotations=("ry", "rz"), brickwork=True)
+
+
+class TestLightCone:
+    def test_cone(self):
+        qc = layered(10, 2, **BRICKWORK)
+        sub, kept = light_cone_circuit(qc, [4])
+        # the last layer couples (3, 4), the first one (2, 3) and (4, 5)
+        assert kept == [2, 3, 4, 5]
+        assert sub.num == 4
+        assert len(sub.gates) == 1 + 4 + 2 + 8
+
+    def test_nothing_pruned(self, monkeypatch):
+        qc = layered(4, 3, seed=5, **BRICKWORK)
+        qc.measure([0, 3])
+        kept, gates = backward_light_cone(qc, [0, 3])
+        assert kept == [0, 1, 2, 3] and len(gates) == len(qc.gates)
+        ref = simulate(qc, light_cone=False, partition=False)
+        # the circuit is simulated as it is when the cone holds every qubit and gate
+        monkeypatch.setattr(simulator, "split_circuit", None)
+        assert np.allclose(simulate(qc, partition=False).probabilities, ref.probabilities)
+
+    def test_probabilities(self):
+        qc = layered(9, 3, seed=1, **BRICKWORK)
+        qc.measure([5, 2], [0, 1])
+        res = simulate(qc, shots=50, seed=2)
+        ref = simulate(qc, light_cone=False)
+        assert np.allclose(res.probabilities, ref.probabilities)
+        assert sum(res.count.values()) == 50
+        assert all(len(key) == 2 for key in res.count)
+
+    def test_idle_measured_qubit(self):
+        qc = QuantumCircuit(3)
+        qc.h(0)
+        qc.cx(0, 1)
+        qc.measure([2, 1], [1, 0])
+        assert np.allclose(simulate(qc).probabilities, [0.5, 0, 0.5, 0])
+
+    def test_estimator(self):
+        qc = layered(7, 3, seed=3, **BRICKWORK)
+        ham = Hamiltonian.from_pauli_list([("IIIIZZI", 0.5), ("XIIIIIY", -1.0), ("IIIIIII", 2.0)])
+        psi = simulate(qc, output="state_vector").get_statevector()
+        ref = np.real(psi.conj() @ ham.get_matrix() @ psi)
+        assert np.isclose(Estimator(qc).run(ham, None), ref)
+
+    def test_wide_local_observable(self):
+        # qubits 0 and 1 of two brickwork layers only depend on the gates of qubits 0 to 3
+        wide = layered(40, 2, seed=4, **BRICKWORK)
+        narrow = QuantumCircuit(4)
+        for gate in wide.gates:
+            if max(np.atleast_1d(gate.pos)) < 4:
+                narrow.add_ins(gate)
+        obs = "I" * 38 + "ZZ"
+        value = Estimator(wide).run(Hamiltonian.from_pauli_list([(obs, 1.0)]), None)
+        psi = simulate(narrow, output="state_vector").get_statevector()
+        ref = np.real(psi.conj() @ Hamiltonian.from_pauli_list([(obs[-4:], 1.0)]).get_matrix() @ psi)
+        assert np.isclose(value, ref)
@@ -0,0 +1,87 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.exceptions import QuafuError
+from quafu.simulators.mps import mps_simulate
+
+from builders import random_circuit
+
+
+GATES = ("h", "ry", "cx", "rzz", "swap", "toffoli")
+
+
+def reference_state(qc):
+    num = max(qc.used_qubits) + 1
+    psi = simulate(qc, output="state_vector").state_vector
+    return psi.reshape([2] * num).transpose(list(range(num))[::-1]).reshape(-1)
+
+
+class TestMPSSimulator:
+    def test_exact_state(self):
+        rng = np.random.default_rng(3)
+        for _ in range(10):
+            qc = random_circuit(6, 30, rng, GATES)
+            psi = mps_simulate(qc).to_statevector()
+            assert abs(abs(np.vdot(psi, reference_state(qc))) - 1) < 1e-10
+
+    def test_queries(self):
+        rng = np.random.default_rng(5)
+        qc = random_circuit(5, 30, rng, GATES)
+        state = mps_simulate(qc)
+        psi = reference_state(qc)
+        assert state.amplitude("01101") == pytest.approx(psi[0b01101])
+        probs = np.abs(psi.reshape([2] * 5)) ** 2
+        assert state.probability("10", [3, 1]) == pytest.approx(probs[:, 0, :, 1, :].sum())
+        zx = np.kron(np.diag([1, -1]), np.eye(16))
+        zx = zx @ np.kron(np.eye(16), np.array([[0, 1], [1, 0]]))
+        assert state.expectation("ZX", [0, 4]) == pytest.approx(np.vdot(psi, zx @ psi).real)
+        assert np.allclose(state.probabilities([2, 0]), probs.sum(axis=(1, 3, 4)).T.reshape(-1))
+
+    def test_simulate(self):
+        rng = np.random.default_rng(7)
+        qc = random_circuit(5, 30, rng, GATES)
+        qc.measure([0, 2, 4], [1, 2, 0])
+        res = simulate(qc, simulator="mps", shots=1000, seed=1)
+        ref = simulate(qc, output="density_matrix")
+        assert np.allclose(res.probabilities, ref.probabilities.real)
+        assert sum(res.count.values()) == 1000
+        assert res.truncation_error < 1e-10
+
+    def test_long_chain(self):
+        num = 80
+        qc = QuantumCircuit(num)
+        for layer in range(4):
+            for i in range(num):
+                qc.ry(i, 0.1 * (i + layer))
+            for i in range(layer % 2, num - 1, 2):
+                qc.cx(i, i + 1)
+        qc.cx(0, num - 1)
+        qc.measure()
+        res = simulate(qc, simulator="mps", shots=200, max_bond_dim=4, seed=2)
+        assert res.probabilities is None
+        assert max(res.mps.bond_dims) <= 4
+        assert res.truncation_error > 0
+        assert sum(res.count.values()) == 200
+        assert all(len(key) == num for key in res.count)
+
+    def test_mid_circuit_measure(self):
+        qc = QuantumCircuit(2)
+        qc.h(0)
+        qc.measure([0], [0])
+        qc.x(1)
+        with pytest.raises(QuafuError):
+            simulate(qc, simulator="mps")
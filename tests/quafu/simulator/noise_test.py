@@ -0,0 +1,87 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.exceptions import QuafuError
+from quafu.simulators.noise import (
+    NoiseModel,
+    KrausChannel,
+    bit_flip,
+    depolarizing,
+    amplitude_damping,
+)
+
+
+class TestNoiseModel:
+    def test_readout_error(self):
+        qc = QuantumCircuit(2)
+        qc.x(0)
+        qc.measure([0, 1])
+        noise = NoiseModel().add_readout_error(0.1, 0.2, qubits=[0])
+        res = simulate(qc, noise_model=noise, shots=4000, seed=7)
+        assert set(res.count.keys()) <= {"10", "00"}
+        assert abs(res.count["00"] / 4000 - 0.2) < 0.03
+        assert abs(res.probabilities[2] - res.count["10"] / 4000) < 1e-12
+
+    def test_pauli_gate_error(self):
+        qc = QuantumCircuit(2)
+        qc.x(0)
+        qc.cx(0, 1)
+        qc.measure([0, 1])
+        noise = NoiseModel().add_gate_error(bit_flip(0.25), gates="cx", qubits=[1])
+        res = simulate(qc, noise_model=noise, shots=4000, seed=3)
+        assert set(res.count.keys()) <= {"11", "10"}
+        assert abs(res.count["10"] / 4000 - 0.25) < 0.03
+
+    def test_kraus_gate_error(self):
+        qc = QuantumCircuit(1)
+        qc.x(0)
+        qc.measure([0])
+        noise = NoiseModel().add_gate_error(amplitude_damping(0.3))
+        res = simulate(qc, noise_model=noise, shots=4000, seed=11)
+        assert abs(res.count["0"] / 4000 - 0.3) < 0.03
+
+    def test_mid_circuit_measure(self):
+        qc = QuantumCircuit(2)
+        qc.x(0)
+        qc.measure([0], [0])
+        qc.x(1)
+        qc.measure([1], [1])
+        noise = NoiseModel().add_gate_error(bit_flip(1.0), gates="x", qubits=[1])
+        res = simulate(qc, noise_model=noise, shots=100, seed=1)
+        assert res.count == {"10": 100}
+
+    def test_seed(self):
+        qc = QuantumCircuit(4)
+        qc.h(0)
+        for i in range(3):
+            qc.cx(i, i + 1)
+        qc.measure()
+        noise = NoiseModel().add_gate_error(depolarizing(0.05))
+        res1 = simulate(qc, noise_model=noise, shots=500, seed=5)
+        res2 = simulate(qc, noise_model=noise, shots=500, seed=5)
+        assert res1.count == res2.count
+        assert sum(res1.count.values()) == 500
+        # all 64 bits of the seed select the random streams
+        res3 = simulate(qc, noise_model=noise, shots=500, seed=5 + 2**32)
+        assert res3.count != res1.count
+
+    def test_invalid(self):
+        with pytest.raises(QuafuError):
+            KrausChannel([[[1, 0], [0, 0.5]]])
+        qc = QuantumCircuit(1)
+        qc.x(0)
+        with pytest.raises(ValueError):
+            simulate(qc, noise_model=NoiseModel(), output="state_vector")
@@ -0,0 +1,114 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import QuantumCircuit, simulate
+from quafu.results.results import ProductSimuResult
+from quafu.simulators.partition import qubit_components
+
+
+def interleaved_clusters(rng):
+    # clusters {0, 2, 5} and {1, 3}, qubit 4 idle
+    qc = QuantumCircuit(6)
+    for q in [0, 1, 2, 3, 5]:
+        qc.ry(q, float(rng.normal()))
+    qc.cx(0, 2)
+    qc.cz(3, 1)
+    qc.mcx([5, 2], 0)
+    qc.rz(3, float(rng.normal()))
+    qc.rxx(1, 3, float(rng.normal()))
+    qc.swap(2, 5)
+    qc.t(0)
+    return qc
+
+
+class TestPartition:
+    def test_components(self):
+        qc = interleaved_clusters(np.random.default_rng(0))
+        assert qubit_components(qc) == [[0, 2, 5], [1, 3], [4]]
+
+    def test_probabilities(self):
+        rng = np.random.default_rng(1)
+        qc = interleaved_clusters(rng)
+        qc.measure([5, 1, 4, 0, 3], [0, 3, 1, 4, 2])
+        res = simulate(qc, shots=300, seed=2)
+        ref = simulate(qc, partition=False)
+        assert isinstance(res, ProductSimuResult)
+        assert len(res.factors) == 3
+        assert np.allclose(res.probabilities, ref.probabilities)
+        assert sum(res.count.values()) == 300
+        assert all(len(key) == 5 for key in res.count)
+        for pos in [[0], [1, 3], [0, 2, 4], [0, 1, 2, 3, 4]]:
+            assert np.isclose(res.calculate_obs(pos), ref.calculate_obs(pos))
+
+    def test_marginal_and_expectation(self):
+        rng = np.random.default_rng(6)
+        qc = interleaved_clusters(rng)
+        qc.measure([5, 1, 4, 0, 3], [0, 3, 1, 4, 2])
+        res = simulate(qc, shots=100, seed=7)
+        ref = simulate(qc, partition=False)
+        for qubits in [[2], [4, 0], [3, 0, 4], [1, 4, 0, 2], []]:
+            assert np.allclose(res.marginal(qubits), ref.marginal(qubits))
+        for mask in [0, 1, 0b10010, 0b10101, 0b11111]:
+            assert np.isclose(res.expectation(mask), ref.expectation(mask))
+        assert res._probabilities is None
+
+    def test_unmeasured_cluster(self):
+        rng = np.random.default_rng(3)
+        qc = interleaved_clusters(rng)
+        qc.measure([3, 1], [0, 1])
+        res = simulate(qc, shots=10, light_cone=False)
+        ref = simulate(qc, partition=False)
+        assert len(res.factors) == 1
+        assert np.allclose(res.probabilities, ref.probabilities)
+
+    def test_without_measure(self):
+        rng = np.random.default_rng(4)
+        qc = interleaved_clusters(rng)
+        res = simulate(qc)
+        ref = simulate(qc, partition=False)
+        assert np.allclose(res.probabilities, ref.probabilities)
+
+    def test_wide_independent_experiments(self):
+        rng = np.random.default_rng(5)
+        num = 15
+        qc = QuantumCircuit(2 * num)
+        for offset in [0, num]:
+            for q in range(num):
+                qc.ry(offset + q, float(rng.normal()))
+            for q in range(num - 1):
+                qc.cx(offset + q, offset + q + 1)
+        qc.measure([0, num])
+        res = simulate(qc, shots=100)
+        assert len(res.factors) == 2
+        assert all(len(res_.probabilities) == 2 for _, res_ in res.factors)
+        assert np.isclose(res.probabilities.sum(), 1)
+        assert sum(res.count.values()) == 100
+
+    def test_sampled_cluster(self):
+        # the GHZ cluster is too wide for stabilizer probabilities, only its counts are sampled
+        qc = QuantumCircuit(27)
+        qc.h(0)
+        for q in range(25):
+            qc.cx(q, q + 1)
+        qc.rx(26, 0.4)
+        qc.measure(list(range(27)))
+        res = simulate(qc, shots=500, seed=8)
+        assert res.probabilities is None
+        assert sum(res.count.values()) == 500
+        assert all(key[:26] in ["0" * 26, "1" * 26] for key in res.count)
+        (_, ghz), (_, rx) = res.factors
+        ones = sum(value for key, value in res.count.items() if key[-1] == "1")
+        assert ones == rx.count.get("1", 0)
+        assert np.allclose(res.marginal([26]), [np.cos(0.2) ** 2, np.sin(0.2) ** 2])
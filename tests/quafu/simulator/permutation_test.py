@@ -0,0 +1,171 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.exceptions import CircuitError
+from quafu.simulators.simulator import equivalent
+
+from builders import layered
+
+
+def random_reversible(qc, num, depth, rng):
+    for _ in range(depth):
+        a, b, c = (int(q) for q in rng.choice(num, 3, replace=False))
+        name = rng.choice(["x", "cx", "mcx", "swap"])
+        if name == "x":
+            qc.x(a)
+        elif name == "cx":
+            qc.cx(a, b)
+        elif name == "mcx":
+            qc.mcx([a, b], c)
+        else:
+            qc.swap(a, b)
+
+
+def permuted_index(i, table, qubits):
+    """Little endian index of the image of basis state i"""
+    k = len(qubits)
+    x = sum(((i >> q) & 1) << (k - 1 - j) for j, q in enumerate(qubits))
+    y = int(table[x])
+    for j, q in enumerate(qubits):
+        i = (i & ~(1 << q)) | (((y >> (k - 1 - j)) & 1) << q)
+    return i
+
+
+class TestPermutation:
+    def test_matches_table(self):
+        rng = np.random.default_rng(3)
+        table = rng.permutation(8)
+        qubits = [3, 0, 2]
+        qc = layered(4, 1, seed=rng, rotations=("ry", "rz"))
+        psi = simulate(qc, output="state_vector").get_statevector()
+        qc.permutation(table, qubits)
+        res = simulate(qc, output="state_vector").get_statevector()
+        expected = np.zeros_like(psi)
+        for i in range(16):
+            expected[permuted_index(i, table, qubits)] = psi[i]
+        assert np.allclose(res, expected)
+
+    def test_unitary_and_inverse(self):
+        rng = np.random.default_rng(5)
+        table = rng.permutation(8)
+        qubits = [1, 2, 0]
+        qc = QuantumCircuit(3)
+        qc.permutation(table, qubits)
+        # unitary is big endian, so qubit q is bit 2 - q of its indices
+        big = [2 - q for q in qubits]
+        expected = np.zeros((8, 8))
+        for i in range(8):
+            expected[permuted_index(i, table, big), i] = 1
+        assert np.allclose(simulate(qc, output="unitary").unitary, expected)
+        assert np.allclose(qc.gates[0].matrix, expected)
+        ref = QuantumCircuit(3)
+        ref.permutation(np.argsort(table), qubits)
+        assert not equivalent(qc, ref)
+        qc.permutation(np.argsort(table), qubits)
+        assert equivalent(qc, np.eye(8))
+
+    def test_callable(self):
+        qc = QuantumCircuit(4)
+        qc.x(0)
+        qc.x(2)
+        qc.permutation(lambda x: (x + 3) % 16, [3, 2, 1, 0])
+        qc.measure([3, 2, 1, 0], [0, 1, 2, 3])
+        res = simulate(qc, shots=10)
+        assert res.count == {"1000": 10}
+
+    def test_sparse(self):
+        rng = np.random.default_rng(7)
+        qc = layered(5, 1, seed=rng, rotations=("ry", "rz"))
+        qc.permutation(rng.permutation(16), [4, 1, 3, 0])
+        qc.measure([0, 1, 2, 3, 4])
+        res = simulate(qc, simulator="qfvm_sparse", shots=10, seed=1)
+        ref = simulate(qc)
+        assert np.allclose(res.probabilities, ref.probabilities)
+
+    def test_decompose(self):
+        rng = np.random.default_rng(9)
+        for i, qubits in enumerate(([2], [1, 4], [3, 0, 2], [4, 1, 3, 0], [0, 2, 4, 1, 3])):
+            qc = layered(5, 1, seed=i, rotations=("ry", "rz"))
+            ref = layered(5, 1, seed=i, rotations=("ry", "rz"))
+            qc.permutation(rng.permutation(2 ** len(qubits)), qubits)
+            for gate in qc.gates[-1].decompose():
+                ref.add_ins(gate)
+            res = simulate(qc, output="state_vector").get_statevector()
+            expected = simulate(ref, output="state_vector", fuse_reversible=0).get_statevector()
+            assert np.allclose(res, expected)
+
+    def test_to_openqasm(self):
+        rng = np.random.default_rng(11)
+        qc = layered(4, 1, seed=rng, rotations=("ry", "rz"))
+        qc.permutation(rng.permutation(8), [2, 0, 3])
+        qc.permutation(np.arange(4), [1, 2])
+        qc.measure([0, 1, 2, 3])
+        parsed = QuantumCircuit(4)
+        parsed.from_openqasm(qc.to_openqasm())
+        res = simulate(parsed, output="state_vector", fuse_reversible=0).get_statevector()
+        assert np.allclose(res, simulate(qc, output="state_vector").get_statevector())
+
+    def test_invalid_table(self):
+        qc = QuantumCircuit(2)
+        with pytest.raises(CircuitError):
+            qc.permutation([0, 1, 1, 3], [0, 1])
+        with pytest.raises(CircuitError):
+            qc.permutation([0, 1], [0, 1])
+
+
+class TestReversibleFusion:
+    def test_fused_runs(self):
+        rng = np.random.default_rng(11)
+        for _ in range(10):
+            qc = layered(6, 1, seed=rng, rotations=("ry", "rz"))
+            random_reversible(qc, 6, 30, rng)
+            qc.h(2)
+            random_reversible(qc, 6, 12, rng)
+            fused = simulate(qc, output="state_vector").get_statevector()
+            plain = simulate(qc, output="state_vector", fuse_reversible=0).get_statevector()
+            assert np.allclose(fused, plain)
+
+    def test_adder(self):
+        # Cuccaro ripple-carry adder on a = 5, b = 6 with carry in 1
+        qc = QuantumCircuit(10)
+        a = [1, 2, 3, 4]
+        b = [5, 6, 7, 8]
+        qc.x(0)
+        for q in [a[0], a[2], b[1], b[2]]:
+            qc.x(q)
+
+        def majority(x, y, z):
+            qc.cx(z, y)
+            qc.cx(z, x)
+            qc.mcx([x, y], z)
+
+        def unmaj(x, y, z):
+            qc.mcx([x, y], z)
+            qc.cx(z, x)
+            qc.cx(x, y)
+
+        majority(0, b[0], a[0])
+        for i in range(3):
+            majority(a[i], b[i + 1], a[i + 1])
+        qc.cx(a[3], 9)
+        for i in range(2, -1, -1):
+            unmaj(a[i], b[i + 1], a[i + 1])
+        unmaj(0, b[0], a[0])
+        qc.measure(b + [9], list(range(5)))
+        res = simulate(qc, shots=10)
+        # 5 + 6 + 1 = 12, sum bits b0..b3 then carry out
+        assert res.count == {"00110": 10}
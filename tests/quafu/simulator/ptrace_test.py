@@ -0,0 +1,66 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import QuantumCircuit, simulate
+from quafu.results.results import SimuResult
+from quafu.simulators.default_simulator import ptrace
+
+
+def random_state(num, seed=0):
+    rng = np.random.default_rng(seed)
+    psi = rng.normal(size=2**num) + 1j * rng.normal(size=2**num)
+    return psi / np.linalg.norm(psi)
+
+
+def reduced(psi, kept, little_endian):
+    num = int(np.log2(len(psi)))
+    tensor = psi.reshape([2] * num)
+    axes = [num - 1 - q if little_endian else q for q in kept]
+    rest = [a for a in range(num) if a not in axes]
+    mat = np.transpose(tensor, axes + rest).reshape(2 ** len(kept), -1)
+    return mat @ mat.conj().T
+
+
+class TestPtrace:
+    def test_blocks(self):
+        psi = random_state(7)
+        for kept in [[0], [5, 2], [6, 0, 3], [1, 4, 0, 6]]:
+            for little_endian in [False, True]:
+                rho = reduced(psi, kept, little_endian)
+                for chunk in [4, 32, 2**10]:
+                    out = ptrace(psi, kept, diag=False, little_endian=little_endian, chunk=chunk)
+                    assert np.allclose(out, rho)
+                    out = ptrace(psi, kept, little_endian=little_endian, chunk=chunk)
+                    assert np.allclose(out, np.diag(rho).real)
+
+    def test_calculate_obs(self):
+        rng = np.random.default_rng(1)
+        probs = rng.random(2**6)
+        res = SimuResult(probs / probs.sum(), "probabilities", {})
+        for pos in [[0], [3, 1], [5, 0, 2]]:
+            parity = [(-1) ** sum(int(bin(i)[2:].zfill(6)[p]) for p in pos) for i in range(2**6)]
+            assert np.isclose(res.calculate_obs(pos), np.dot(res.probabilities, parity))
+
+    def test_simulate(self):
+        qc = QuantumCircuit(5)
+        for q in range(5):
+            qc.rx(q, 0.3 * (q + 1))
+        for q in range(4):
+            qc.cx(q, q + 1)
+        qc.measure([4, 1, 3], [0, 2, 1])
+        psi = simulate(qc, output="state_vector").get_statevector()
+        rho = reduced(psi, [4, 3, 1], True)
+        assert np.allclose(simulate(qc, output="density_matrix").rho, rho)
+        assert np.allclose(simulate(qc).probabilities, np.diag(rho).real)
@@ -0,0 +1,104 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.simulators.qfvm import QasmUnsupportedError, simulate_qasm
+
+HEADER = 'OPENQASM 2.0;\ninclude "qelib1.inc";\n'
+
+GATES = HEADER + """
+qreg q[3];
+qreg r[3];
+creg c[3];
+creg d[3];
+// every gate of the native reader
+h q;
+x q[0]; y q[1]; z q[2]; s r[0]; sdg r[1]; t q[0]; tdg q[1]; sx q[2]; id q[1];
+rx(pi/3) q[0]; ry(-0.7) q[1]; rz(2*pi/5 + 0.1) r[1]; p(sqrt(2)^2 / 4) r[0];
+cx q[0], r[1]; cy q[1], q[0]; cz q[2], r[0]; cp(-pi/7) r[0], q[1];
+swap q[0], r[1]; rxx(cos(0.3)) q[1], q[2]; rzz(0.1) r[1], q[2];
+ccx q[0], q[1], r[0]; cswap q[1], r[0], r[1]; ry(0.2) r[1];
+barrier q, r;
+cx q, r;
+measure q[2] -> d[0];
+measure r -> c;
+measure q[0] -> d[2];
+"""
+
+
+def python_circuit(qasm):
+    qc = QuantumCircuit(0)
+    qc.from_openqasm(qasm)
+    return qc
+
+
+class TestNativeQasm:
+    def test_gates(self):
+        qc = python_circuit(GATES)
+        for output, attr in [("probabilities", "probabilities"), ("density_matrix", "rho"), ("state_vector", "state_vector")]:
+            res = simulate(GATES, simulator="qfvm_qasm", output=output)
+            ref = simulate(qc, output=output, light_cone=False, partition=False, real=False)
+            assert np.allclose(getattr(res, attr), getattr(ref, attr))
+        res = simulate(GATES, simulator="qfvm_qasm", shots=50)
+        assert sum(res.count.values()) == 50
+        assert all(len(key) == 5 for key in res.count)
+
+    def test_reset_and_if(self):
+        qasm = HEADER + """
+        qreg q[2];
+        creg c[1];
+        creg d[1];
+        h q[0];
+        measure q[0] -> c[0];
+        if(c==1) x q[1];
+        reset q[0];
+        measure q[1] -> d[0];
+        """
+        res = simulate(qasm, simulator="qfvm_qasm", shots=40)
+        # q[1] always copies the first outcome of q[0]
+        assert set(res.count) <= {"00", "11"}
+        assert sum(res.count.values()) == 40
+        counts, psi, pairs = simulate_qasm(qasm, shots=1)
+        assert pairs == [(0, 0), (1, 1)]
+        assert np.isclose(np.abs(psi[0b01]), 0)
+
+    def test_no_measure(self):
+        qasm = HEADER + "qreg q[2];\nh q[0];\ncx q[0], q[1];\n"
+        res = simulate(qasm, simulator="qfvm_qasm")
+        assert np.allclose(res.probabilities, [0.5, 0, 0, 0.5])
+
+    def test_fallback(self):
+        # gate definitions and U are left to the Python parser
+        qasm = HEADER + """
+        gate bell a, b { h a; cx a, b; }
+        qreg q[2];
+        creg c[2];
+        bell q[0], q[1];
+        U(pi/2, 0, pi) q[0];
+        measure q -> c;
+        """
+        with pytest.raises(QasmUnsupportedError):
+            simulate_qasm(qasm, shots=1)
+        res = simulate(qasm, simulator="qfvm_qasm")
+        ref = simulate(python_circuit(qasm))
+        assert np.allclose(res.probabilities, ref.probabilities)
+
+    def test_simulation_error(self, monkeypatch):
+        # a program read natively is not parsed again when its simulation fails
+        qasm = HEADER + "qreg q[2];\nh q[0];\ncx q[0], q[1];\n"
+        monkeypatch.setattr(QuantumCircuit, "from_openqasm", None)
+        with pytest.raises(ValueError, match="fewer qubits"):
+            simulate(qasm, psi=np.array([1, 0], dtype=complex), simulator="qfvm_qasm")
@@ -0,0 +1,66 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.exceptions import QuafuError
+from quafu.simulators import qfvm
+
+from builders import random_circuit
+
+# gates with real matrices
+GATES = ("h", "ry", "cx", "cz", "swap", "mcx")
+
+
+class TestRealAmplitudes:
+    def test_state_vector(self):
+        rng = np.random.default_rng(1)
+        qc = random_circuit(6, 36, rng, GATES)
+        res = simulate(qc, output="state_vector", real=True).get_statevector()
+        ref = simulate(qc, output="state_vector", real=False).get_statevector()
+        assert res.dtype == np.float64
+        assert np.allclose(res, ref)
+
+    def test_probabilities(self):
+        rng = np.random.default_rng(2)
+        qc = random_circuit(5, 40, rng, GATES)
+        qc.measure([4, 0, 2], [0, 2, 1])
+        res = simulate(qc, shots=200, seed=3)
+        ref = simulate(qc, real=False)
+        assert np.allclose(res.probabilities, ref.probabilities)
+        assert sum(res.count.values()) == 200
+        assert all(len(key) == 3 for key in res.count)
+
+    def test_all_qubits_without_measure(self):
+        rng = np.random.default_rng(4)
+        qc = random_circuit(4, 16, rng, GATES)
+        qc.permutation(rng.permutation(4), [3, 1])
+        res = simulate(qc, real=True)
+        ref = simulate(qc, real=False)
+        assert np.allclose(res.probabilities, ref.probabilities)
+
+    def test_complex_circuit(self, monkeypatch):
+        qc = QuantumCircuit(2)
+        qc.h(0)
+        qc.t(0)
+        qc.cx(0, 1)
+        qc.measure([0, 1])
+        with pytest.raises(QuafuError):
+            simulate(qc, real=True)
+        # the complex amplitudes are computed by the same qfvm call
+        monkeypatch.setattr(qfvm, "simulate_circuit", None)
+        res = simulate(qc, shots=40, partition=False)
+        assert np.allclose(res.probabilities, [0.5, 0, 0, 0.5])
+        assert sum(res.count.values()) == 40
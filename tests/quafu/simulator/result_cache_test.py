@@ -0,0 +1,112 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import simulate
+from quafu.algorithms.gradients import run_circ
+from quafu.simulators.cache import SimulationCache
+from quafu.simulators.result_cache import ResultCache, circuit_fingerprint, get_result_cache
+
+from builders import layered
+
+
+def ansatz(num, theta):
+    return layered(num, 1, theta + np.arange(num))
+
+
+class TestResultCache:
+    def test_fingerprint(self):
+        key = circuit_fingerprint(ansatz(4, 0.3))
+        assert circuit_fingerprint(ansatz(4, 0.3 + 1e-14)) == key
+        assert circuit_fingerprint(ansatz(4, 0.31)) != key
+        qc = ansatz(4, 0.3)
+        qc.measure([1])
+        assert circuit_fingerprint(qc) != key
+        psi = np.zeros(16)
+        psi[3] = 1
+        assert circuit_fingerprint(ansatz(4, 0.3), psi) != key
+
+    def test_simulate(self):
+        cache = get_result_cache()
+        hits, misses = cache.hits, cache.misses
+        ref = simulate(ansatz(5, 0.2), output="state_vector").get_statevector()
+        res = simulate(ansatz(5, 0.2), output="state_vector")
+        assert np.allclose(res.get_statevector(), ref)
+        assert (cache.hits - hits, cache.misses - misses) == (1, 1)
+        # sampled counts are never reused
+        qc = ansatz(5, 0.2)
+        qc.measure([0, 3])
+        counts = [simulate(qc, shots=20).count for _ in range(2)]
+        assert all(sum(c.values()) == 20 for c in counts)
+        simulate(qc, shots=0)
+        simulate(qc, shots=0, result_cache=False)
+        assert (cache.hits - hits, cache.misses - misses, len(cache)) == (1, 2, 2)
+
+    def test_modified_results(self):
+        ref = simulate(ansatz(4, 0.5), output="state_vector").get_statevector().copy()
+        first = simulate(ansatz(4, 0.5), output="state_vector")
+        first.state_vector[0] = 99
+        second = simulate(ansatz(4, 0.5), output="state_vector")
+        assert np.allclose(second.get_statevector(), ref)
+        qc = ansatz(4, 0.5)
+        qc.measure([0, 2])
+        ref = simulate(qc).probabilities.copy()
+        simulate(qc).probabilities[:] = 0
+        assert np.allclose(simulate(qc).probabilities, ref)
+
+    def test_checkpointed_results(self):
+        # states resumed from prefix checkpoints are never stored under a circuit fingerprint
+        checkpoints = SimulationCache(interval=1)
+        simulate(ansatz(4, 0.3), output="state_vector", cache=checkpoints, result_cache=True)
+        assert len(get_result_cache()) == 0
+        simulate(ansatz(4, 0.3), output="state_vector")
+        assert len(get_result_cache()) == 1
+        simulate(ansatz(4, 0.3), output="state_vector", cache=checkpoints, result_cache=True)
+        assert get_result_cache().hits == 1
+
+    def test_large_results(self):
+        # by default only results within a sixteenth of the budget are kept, explicit calls store any size
+        cache = get_result_cache()
+        cache.memory_budget = 16 * 16 * 2**4
+        simulate(ansatz(4, 0.3), output="state_vector")
+        simulate(ansatz(5, 0.3), output="state_vector")
+        assert len(cache) == 1
+        simulate(ansatz(5, 0.3), output="state_vector", result_cache=True)
+        assert len(cache) == 2
+        assert cache.nbytes == 16 * 2**4 + 16 * 2**5
+
+    def test_eviction(self):
+        cache = ResultCache(memory_budget=2 * 16 * 2**4)
+        for theta in [0.1, 0.2, 0.3]:
+            cache.put(theta, simulate(ansatz(4, theta), output="state_vector", result_cache=False))
+        assert cache.get(0.1) is None
+        assert cache.get(0.3) is not None
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "entries": 2, "nbytes": 2 * 16 * 2**4}
+
+    def test_run_circ(self):
+        cache = get_result_cache()
+        qc = ansatz(6, 0.4)
+        # every qubit ends in the light cone of all the others
+        qc.cx(5, 0)
+        for q in range(5):
+            qc.cx(q, q + 1)
+        for circ in [qc, layered(6, 1)]:
+            misses = cache.misses
+            out = run_circ(circ)
+            psi = simulate(circ, output="state_vector", result_cache=False).get_statevector()
+            probs = np.abs(psi.reshape([2] * 6)) ** 2
+            ref = [probs.sum(axis=tuple(a for a in range(6) if a != i)) @ [1, -1] for i in range(6)]
+            assert np.allclose(out, ref)
+            # one simulation serves the Z observables of all qubits, even if their light cones differ
+            assert cache.misses - misses == 1
@@ -0,0 +1,66 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+from quafu import QuantumCircuit, simulate
+from quafu.results.results import SimuResult
+
+
+def bits(key, positions):
+    return "".join(key[p] for p in positions)
+
+
+class TestSimuResult:
+    def test_count(self):
+        res = SimuResult(np.full(8, 1 / 8), "probabilities", {5: 3, 0: 2, 6: 1})
+        assert res.count == {"101": 3, "000": 2, "110": 1}
+        assert res.bitstrings.tolist() == ["101", "000", "110"]
+        assert SimuResult(None, "probabilities", {"011": 4}).outcomes.tolist() == [3]
+        wide = SimuResult(None, "probabilities", {"1" + "0" * 69: 2, "0" * 69 + "1": 1})
+        assert wide.count == {"1" + "0" * 69: 2, "0" * 69 + "1": 1}
+        assert np.allclose(wide.marginal([0, 69]), [0, 1 / 3, 2 / 3, 0])
+        assert not hasattr(SimuResult(np.ones(2), "probabilities"), "count")
+
+    def test_marginal(self):
+        rng = np.random.default_rng(0)
+        probs = rng.random(2**5)
+        probs /= probs.sum()
+        res = SimuResult(probs, "probabilities")
+        keys = [bin(i)[2:].zfill(5) for i in range(32)]
+        for qubits in [[2], [4, 0], [1, 3, 2]]:
+            ref = np.zeros(2 ** len(qubits))
+            for key, p in zip(keys, probs):
+                ref[int(bits(key, qubits), 2)] += p
+            assert np.allclose(res.marginal(qubits), ref)
+        assert res.probability_dict == dict(zip(keys, probs.tolist()))
+
+    def test_expectation(self):
+        qc = QuantumCircuit(4)
+        for q in range(4):
+            qc.ry(q, 0.4 * (q + 1))
+        qc.cx(0, 2)
+        qc.cx(3, 1)
+        qc.measure([0, 1, 2, 3])
+        res = simulate(qc, shots=500)
+        sampled = SimuResult(None, "probabilities", res.count)
+        shots = sum(res.count.values())
+        for mask in [0b1, 0b0110, 0b1011]:
+            positions = [3 - b for b in range(4) if mask >> b & 1]
+            parity = [bits(bin(i)[2:].zfill(4), positions).count("1") for i in range(16)]
+            exact = np.dot(res.probabilities, (-1.0) ** np.array(parity))
+            assert np.isclose(res.expectation(mask), exact)
+            assert np.isclose(res.expectation(mask), res.calculate_obs(positions))
+            ref = sum(v * (-1) ** bits(key, positions).count("1") for key, v in res.count.items()) / shots
+            assert np.isclose(sampled.expectation(mask), ref)
+            assert np.isclose(sampled.calculate_obs(positions), ref)
@@ -0,0 +1,79 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.algorithms.hamiltonian import Hamiltonian
+from quafu.exceptions import CircuitError, QuafuError
+
+
+def prefix(num):
+    qc = QuantumCircuit(num)
+    qc.h(0)
+    qc.ry(1, 0.3)
+    qc.cx(0, 2)
+    return qc
+
+
+class TestSnapshot:
+    def test_snapshot_kinds(self):
+        ham = Hamiltonian.from_pauli_list([("ZIZ", 0.5), ("IXI", 1.0), ("YIY", 0.2)])
+        qc = prefix(3)
+        qc.snapshot("psi")
+        qc.snapshot("probs", "probabilities", qubits=[2, 1])
+        qc.snapshot("energy", "expval", observable=ham)
+        qc.rx(1, 1.2)
+        qc.cx(1, 2)
+        qc.measure([0, 1], [0, 1])
+        res = simulate(qc)
+
+        ref = simulate(prefix(3), output="state_vector").state_vector
+        assert np.allclose(res.snapshots["psi"], ref)
+        probs = np.abs(ref.reshape(2, 2, 2)) ** 2
+        assert np.allclose(res.snapshots["probs"], probs.sum(axis=2).reshape(-1))
+        psi = ref.reshape([2] * 3).transpose(2, 1, 0).reshape(-1)
+        energy = np.vdot(psi, ham.get_matrix() @ psi).real
+        assert res.snapshots["energy"] == pytest.approx(energy)
+
+        full = prefix(3)
+        full.rx(1, 1.2)
+        full.cx(1, 2)
+        full.measure([0, 1], [0, 1])
+        assert np.allclose(res.probabilities, simulate(full).probabilities)
+
+    def test_mid_circuit_measure(self):
+        qc = QuantumCircuit(2)
+        qc.x(0)
+        qc.measure([0], [0])
+        qc.snapshot("z", "expval", observable=[("IZ", 1.0)])
+        qc.x(1)
+        qc.measure([1], [1])
+        res = simulate(qc, shots=10)
+        assert res.snapshots["z"] == pytest.approx(-1.0)
+        assert res.count == {"11": 10}
+
+    def test_invalid(self):
+        qc = prefix(3)
+        qc.snapshot("psi")
+        with pytest.raises(CircuitError):
+            qc.snapshot("psi")
+        with pytest.raises(CircuitError):
+            qc.snapshot("e", "expval")
+        with pytest.raises(QuafuError):
+            simulate(qc, simulator="mps")
+        qc.measure([0], [0])
+        with pytest.raises(CircuitError):
+            with qc.cif([0], 1):
+                qc.snapshot("cif")
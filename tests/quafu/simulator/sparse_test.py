@@ -0,0 +1,70 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+
+
+class TestSparseSimulator:
+    def test_random_circuit(self):
+        rng = np.random.default_rng(4)
+        for _ in range(20):
+            qc = QuantumCircuit(5)
+            for _ in range(20):
+                a, b, c = (int(q) for q in rng.choice(5, 3, replace=False))
+                name = rng.choice(["h", "rx", "cx", "rzz", "swap", "mcx", "t"])
+                if name in ["h", "t"]:
+                    getattr(qc, name)(a)
+                elif name == "rx":
+                    qc.rx(a, float(rng.normal()))
+                elif name == "rzz":
+                    qc.rzz(a, b, float(rng.normal()))
+                elif name == "mcx":
+                    qc.mcx([a, b], c)
+                else:
+                    getattr(qc, name)(a, b)
+            qc.measure([0, 1, 3], [2, 0, 1])
+            res = simulate(qc, simulator="qfvm_sparse", shots=50, seed=1)
+            ref = simulate(qc, output="density_matrix")
+            assert np.allclose(res.probabilities, ref.probabilities.real)
+            assert sum(res.count.values()) == 50
+
+    def test_wide_reversible(self):
+        num = 64
+        qc = QuantumCircuit(num)
+        for i in range(0, num, 2):
+            qc.x(i)
+        qc.h(1)
+        for i in range(num - 2):
+            qc.mcx([i, i + 1], i + 2)
+        qc.measure()
+        res = simulate(qc, shots=100, seed=2)
+        assert res.probabilities is None
+        assert len(res.count) == 2
+        assert all(len(key) == num for key in res.count)
+        assert sum(res.count.values()) == 100
+
+    def test_mid_circuit(self):
+        qc = QuantumCircuit(3, 3)
+        qc.h(0)
+        qc.measure([0], [0])
+        with qc.cif([0], 1):
+            qc.x(1)
+        qc.reset([0])
+        qc.measure([0, 1], [1, 2])
+        res = simulate(qc, simulator="qfvm_sparse", shots=200, seed=3)
+        assert set(res.count.keys()) <= {"000", "101"}
+        assert sum(res.count.values()) == 200
+        assert res.probabilities.sum() == pytest.approx(1.0)
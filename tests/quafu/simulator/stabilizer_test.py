@@ -0,0 +1,71 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from quafu import QuantumCircuit, simulate
+from quafu.exceptions import QuafuError
+from quafu.simulators.simulator import is_clifford
+
+from builders import random_circuit
+
+CLIFFORD = ("h", "s", "sdg", "x", "y", "z", "cx", "cy", "cz", "swap")
+
+
+class TestStabilizerSimulator:
+    def test_random_clifford(self):
+        rng = np.random.default_rng(7)
+        for _ in range(20):
+            qc = random_circuit(5, 40, rng, CLIFFORD)
+            qc.measure([0, 2, 3, 4], [2, 0, 3, 1])
+            res = simulate(qc, shots=10, seed=1)
+            ref = simulate(qc, output="density_matrix")
+            assert np.allclose(res.probabilities, ref.probabilities.real)
+            assert sum(res.count.values()) == 10
+
+    def test_large_ghz(self):
+        num = 1000
+        qc = QuantumCircuit(num)
+        qc.h(0)
+        for i in range(num - 1):
+            qc.cx(i, i + 1)
+        qc.measure()
+        res = simulate(qc, shots=200, seed=3)
+        assert res.probabilities is None
+        assert set(res.count.keys()) <= {"0" * num, "1" * num}
+        assert sum(res.count.values()) == 200
+        assert abs(res.calculate_obs([0, 999])) == pytest.approx(1.0)
+
+    def test_reset_and_cif(self):
+        qc = QuantumCircuit(3, 3)
+        qc.h(0)
+        qc.measure([0], [0])
+        with qc.cif([0], 1):
+            qc.x(1)
+        qc.reset([0])
+        qc.measure([0, 1], [1, 2])
+        res = simulate(qc, shots=300, seed=5)
+        assert set(res.count.keys()) <= {"000", "101"}
+        assert sum(res.count.values()) == 300
+
+    def test_non_clifford(self):
+        qc = QuantumCircuit(2)
+        qc.h(0)
+        qc.t(0)
+        qc.cx(0, 1)
+        assert not is_clifford(qc.instructions)
+        with pytest.raises(QuafuError):
+            simulate(qc, simulator="qfvm_clifford")
+        res = simulate(qc)
+        assert res.probabilities[0] == pytest.approx(0.5)
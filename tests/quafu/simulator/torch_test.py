@@ -0,0 +1,108 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+import torch
+from quafu import QuantumCircuit, simulate
+from quafu.algorithms.gradients import compute_vjp, jacobian, run_circ
+from quafu.algorithms.interface.torch import execute
+from quafu.elements.element_gates import PermutationGate
+from quafu.exceptions import QuafuError
+from quafu.simulators.torch import torch_simulate
+
+
+def all_gates_circuit(num=5):
+    qc = QuantumCircuit(num)
+    for q in range(num):
+        qc.rx(q, 0.1)
+        qc.rz(q, 0.2)
+        qc.p(q, 0.3)
+    qc.h(0)
+    qc.x(1)
+    qc.y(2)
+    qc.z(3)
+    qc.s(4)
+    qc.sdg(0)
+    qc.t(1)
+    qc.tdg(2)
+    qc.sx(3)
+    qc.sy(4)
+    qc.w(0)
+    qc.sw(1)
+    for q in range(num - 1):
+        qc.cx(q, q + 1)
+    qc.cy(2, 0)
+    qc.cz(4, 1)
+    qc.cs(3, 0)
+    qc.ct(1, 4)
+    qc.cp(0, 4, 0.4)
+    qc.swap(2, 4)
+    qc.iswap(1, 3)
+    qc.rxx(1, 3, 0.5)
+    qc.ryy(4, 2, 0.6)
+    qc.rzz(4, 0, 0.7)
+    qc.toffoli(0, 3, 1)
+    qc.fredkin(3, 0, 2)
+    qc.mcx([4, 1], 2)
+    qc.mcy([0, 2], 4)
+    qc.mcz([1, 2, 3], 0)
+    qc.ry(2, 0.8)
+    qc.add_ins(PermutationGate([2, 0, 3, 1, 5, 7, 4, 6], [3, 0, 2]))
+    return qc
+
+
+class TestTorchSimulate:
+    def test_gates(self):
+        qc = all_gates_circuit()
+        params = np.random.default_rng(0).normal(size=(3, len(qc.parameterized_gates)))
+        states = torch_simulate(qc, torch.tensor(params))
+        assert states.shape == (3, 32)
+        for row, psi in zip(params, states):
+            qc.update_params(list(row))
+            assert np.allclose(psi.numpy(), simulate(qc, output="state_vector").get_statevector())
+        psi = torch_simulate(qc)
+        assert np.allclose(psi.numpy(), states[-1].numpy())
+
+    def test_probabilities(self):
+        qc = all_gates_circuit()
+        qc.measure([3, 1], [1, 0])
+        probs = torch_simulate(qc, output="probabilities")
+        assert np.allclose(probs.numpy(), simulate(qc).probabilities)
+
+    def test_backprop(self):
+        qc = QuantumCircuit(3)
+        for q in range(3):
+            qc.rx(q, 0.1)
+            qc.ry(q, 0.2)
+        qc.cx(0, 1)
+        qc.cx(1, 2)
+        qc.rzz(0, 2, 0.3)
+        rng = np.random.default_rng(1)
+        x = torch.tensor(rng.normal(size=(4, 7)), requires_grad=True)
+        out = execute(qc, x, method="external")
+        assert np.allclose(out.detach().numpy(), [run_circ(qc, list(row)) for row in x.detach().numpy()])
+        dy = rng.normal(size=out.shape)
+        (out * torch.tensor(dy)).sum().backward()
+        vjp = compute_vjp(jacobian(qc, x.detach().numpy()), dy)
+        assert np.allclose(x.grad.numpy(), vjp)
+
+    def test_invalid(self):
+        qc = all_gates_circuit(5)
+        with pytest.raises(ValueError):
+            torch_simulate(qc, torch.zeros(2))
+        qc.measure([0])
+        qc.x(0)
+        with pytest.raises(QuafuError):
+            torch_simulate(qc)
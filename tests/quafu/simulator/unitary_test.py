@@ -0,0 +1,85 @@
+# (C) Copyright 2023 Beijing Academy of Quantum Information Sciences
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from scipy.stats import unitary_group
+from quafu import QuantumCircuit, simulate
+from quafu.simulators.simulator import equivalent
+
+from builders import random_circuit
+
+GATES = ("h", "rx", "cx", "rzz", "swap", "toffoli", "cp")
+
+
+class TestUnitary:
+    def test_unitary_output(self):
+        rng = np.random.default_rng(2)
+        qc = random_circuit(4, 30, rng, GATES)
+        qc.measure([0, 1])
+        unitary = simulate(qc, output="unitary").unitary
+        assert np.allclose(unitary @ unitary.conj().T, np.eye(16))
+        for col in [0, 5, 11]:
+            psi = np.zeros(16, dtype=complex)
+            psi[col] = 1
+            # qfvm statevectors are little endian, unitary is big endian
+            little = psi.reshape([2] * 4).transpose(3, 2, 1, 0).reshape(-1)
+            out = simulate(qc, little, output="state_vector").state_vector
+            out = out.reshape([2] * 4).transpose(3, 2, 1, 0).reshape(-1)
+            assert np.allclose(unitary[:, col], out)
+
+    def test_decomposed_unitary(self):
+        matrix = unitary_group.rvs(8, random_state=3)
+        qc = QuantumCircuit(3)
+        qc.unitary(matrix, [0, 1, 2])
+        unitary = simulate(qc, output="unitary").unitary
+        # the decomposition is exact up to a global phase
+        phase = np.vdot(matrix[:, 0], unitary[:, 0])
+        assert np.allclose(unitary, phase * matrix)
+        assert equivalent(qc, matrix)
+        assert equivalent(qc, unitary, up_to_global_phase=False)
+        assert not equivalent(qc, unitary * 1j, up_to_global_phase=False)
+        assert not equivalent(qc, np.eye(8))
+
+    def test_equivalent_circuits(self):
+        qc = QuantumCircuit(3)
+        qc.toffoli(0, 1, 2)
+        ref = QuantumCircuit(3)
+        ref.h(2)
+        ref.cx(1, 2)
+        ref.tdg(2)
+        ref.cx(0, 2)
+        ref.t(2)
+        ref.cx(1, 2)
+        ref.tdg(2)
+        ref.cx(0, 2)
+        ref.t(1)
+        ref.t(2)
+        ref.h(2)
+        ref.cx(0, 1)
+        ref.t(0)
+        ref.tdg(1)
+        ref.cx(0, 1)
+        assert equivalent(qc, ref)
+        assert equivalent(qc, ref, up_to_global_phase=False)
+        ref.x(0)
+        assert not equivalent(qc, ref)
+
+    def test_invalid(self):
+        qc = QuantumCircuit(2)
+        qc.h(0)
+        qc.measure([0], [0])
+        qc.x(1)
+        with pytest.raises(ValueError):
+            simulate(qc, output="unitary")